@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Async serving mode for the SeeWrite AI local server
+
+The routes of local_server.py as an ASGI app, for a classroom of students at once.
+The event loop holds every connection without a thread of its own. boto3 has no
+async API, so each Rekognition, Textract, Bedrock and Polly call runs on a bounded
+pool and the request awaits it; Pillow work runs on the image worker processes.
+/api/process-image, /api/chat, /health and the frontend are served here; the audio
+and narration routes are local_server.py's Flask views behind a WSGI adapter. Caches, clients and statistics are shared with local_server.py.
+
+Run: python asgi_server.py   (or: uvicorn asgi_server:app --port 5000)
+"""
+
+import os
+import json
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+
+import local_server
+from local_server import (analyze_upload, find_cached_analysis, finish_answer, finish_description,
+                          health_status, overloaded_body, sentence_synthesizer, sse_events, started)
+from admission import Overloaded, retry_after_header
+from audio_cache import AUDIO_DELIVERY
+from request_parsing import (accepts_event_stream, decode_data_url, image_from_multipart, requested_audio_delivery,
+                             requested_audio_format)
+
+# Threads for blocking AWS calls: the most calls in flight at once. Requests beyond it wait
+# on the event loop holding only their connection, where Flask would hold a thread each.
+AWS_WORKERS = int(os.environ.get("ASGI_AWS_WORKERS", "128"))
+
+aws_executor = ThreadPoolExecutor(max_workers=AWS_WORKERS, thread_name_prefix="asgi-aws")
+
+
+async def in_pool(executor, function, *args):
+    """Run a blocking function on executor without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(executor, partial(function, *args))
+
+
+async def iterate_in_pool(executor, iterator):
+    """Async iteration over a blocking iterator (a Bedrock stream, sentence audio), one
+    item per executor call"""
+    loop = asyncio.get_running_loop()
+    done = object()
+    while True:
+        item = await loop.run_in_executor(executor, next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def as_event(request):
+    """The parts of an API Gateway event that request_parsing reads"""
+    return {'queryStringParameters': dict(request.query_params), 'headers': dict(request.headers)}
+
+
+def json_body(request, body):
+    if 'json' not in request.headers.get('content-type', ''):
+        return {}
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def read_uploaded_image(request, body, data):
+    """Image bytes from a raw image/* body, a multipart upload, or the JSON data URL form"""
+    content_type = request.headers.get('content-type', '')
+    if content_type.startswith('image/'):
+        return body
+    if content_type.startswith('multipart/form-data'):
+        return image_from_multipart(content_type, body)[0]
+    image_base64 = data.get('image')
+    return decode_data_url(image_base64) if image_base64 else None
+
+
+def event_stream(chunks, start, finish, delivery, audio, sentence_audio=False):
+    """local_server.event_stream for the event loop: the same events, produced on the AWS pool"""
+    events = sse_events(chunks, start, finish, sentence_synthesizer(delivery, audio), sentence_audio)
+
+    async def body():
+        try:
+            async for event in iterate_in_pool(aws_executor, events):
+                yield event
+        finally:
+            # A client gone before the stream completes abandons it, and the analysis others wait on
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    return StreamingResponse(body(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def process_image(request):
+    """Process uploaded image and generate audio description"""
+    start = time.perf_counter()
+    try:
+        body = await request.body()
+        data = json_body(request, body)
+        image_data = read_uploaded_image(request, body, data)
+
+        if not image_data:
+            return JSONResponse({'error': 'No image provided'}, status_code=400)
+
+        event = as_event(request)
+        try:
+            audio = requested_audio_format(event, data)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        delivery = requested_audio_delivery(event, data, AUDIO_DELIVERY)
+        streaming = accepts_event_stream(event)
+
+        cache_key, image_result, fingerprint = await in_pool(aws_executor, find_cached_analysis, image_data)
+        cached = bool(image_result)
+        if cached:
+            description_chunks = [image_result['description']]
+        else:
+            # Rekognition and Textract (side by side), then Bedrock, on the AWS pool; an
+            # image already being analyzed for another request waits for that analysis
+            image_result, description_chunks = await in_pool(aws_executor, analyze_upload, image_data, cache_key,
+                                                             fingerprint, streaming)
+
+            if description_chunks is None:
+                return JSONResponse({'error': image_result.get('error', 'Image processing failed')}, status_code=500)
+
+        finish = partial(finish_description, image_result, cached, delivery, audio)
+        if streaming:
+            sentence_audio = request.query_params.get('speech') == 'sentences'
+            return event_stream(description_chunks, start, finish, delivery, audio, sentence_audio)
+
+        body, status = await in_pool(aws_executor, finish, ''.join(description_chunks))
+        return JSONResponse(body, status_code=status)
+
+    except Overloaded as e:
+        return JSONResponse(overloaded_body(e), status_code=429, headers=retry_after_header(e))
+    except Exception as e:
+        return JSONResponse({'error': f'Internal server error: {str(e)}'}, status_code=500)
+
+
+async def chat(request):
+    """Handle follow-up questions about the content"""
+    start = time.perf_counter()
+    try:
+        data = json_body(request, await request.body())
+        question = data.get('question')
+        original_description = data.get('original_description', '')
+
+        if not question:
+            return JSONResponse({'error': 'No question provided'}, status_code=400)
+
+        event = as_event(request)
+        try:
+            audio = requested_audio_format(event, data)
+        except ValueError as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+        delivery = requested_audio_delivery(event, data, AUDIO_DELIVERY)
+
+        finish = partial(finish_answer, delivery, audio)
+        if accepts_event_stream(event):
+            answer_chunks = await in_pool(aws_executor, started,
+                                          local_server.bedrock_client.stream_followup_answer(original_description, question))
+            sentence_audio = request.query_params.get('speech') == 'sentences'
+            return event_stream(answer_chunks, start, finish, delivery, audio, sentence_audio)
+
+        answer = await in_pool(aws_executor, local_server.bedrock_client.answer_followup_question, original_description, question)
+        body, status = await in_pool(aws_executor, finish, answer)
+        return JSONResponse(body, status_code=status)
+
+    except Overloaded as e:
+        return JSONResponse(overloaded_body(e), status_code=429, headers=retry_after_header(e))
+    except Exception as e:
+        return JSONResponse({'error': f'Internal server error: {str(e)}'}, status_code=500)
+
+
+async def health(request):
+    """Health check endpoint"""
+    return JSONResponse({
+        **health_status(),
+        'serving': {'mode': 'asgi', 'aws_workers': AWS_WORKERS}
+    })
+
+
+# Audio, streaming audio and narrations stay the Flask views (on a2wsgi's threads)
+flask_routes = WSGIMiddleware(local_server.app, workers=AWS_WORKERS)
+
+app = Starlette(
+    routes=[
+        Route('/api/process-image', process_image, methods=['POST']),
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/health', health, methods=['GET']),
+        Route('/api/generate-audio', flask_routes, methods=['POST']),
+        Route('/api/stream-audio', flask_routes, methods=['GET', 'POST']),
+        Route('/api/narrations', flask_routes, methods=['POST']),
+        Route('/api/narrations/{job_id}', flask_routes, methods=['GET']),
+        Route('/audio/{key}', flask_routes, methods=['GET']),
+        Mount('/', StaticFiles(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend'),
+                               html=True))
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+)
+
+if __name__ == '__main__':
+    print("🚀 Starting SeeWrite AI Local Server (async mode)")
+    print("=" * 50)
+    print("Frontend: http://localhost:5000")
+    print(f"AWS call threads: {AWS_WORKERS}")
+    print("=" * 50)
+
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -75,6 +75,7 @@ EOF
         --role-name $role_name \
         --policy-arn arn:aws:iam::aws:policy/AmazonBedrockFullAccess
     
+    # Polly: SynthesizeSpeech, DescribeVoices (engine fallback policy) and synthesis tasks (narrations)
     aws iam attach-role-policy \
         --role-name $role_name \
         --policy-arn arn:aws:iam::aws:policy/AmazonPollyFullAccess
@@ -174,6 +175,7 @@ create_api_gateway() {
     API_ID=$(aws apigateway create-rest-api \
         --name $api_name \
         --description "SeeWrite AI REST API" \
+        --binary-media-types 'image/*' 'multipart/form-data' \
         --query 'id' --output text 2>/dev/null || \
         aws apigateway get-rest-apis \
         --query "items[?name=='$api_name'].id" --output text)
@@ -201,6 +203,8 @@ create_api_gateway() {
     echo "3. Add POST methods to each resource"
     echo "4. Configure Lambda integration"
     echo "5. Enable CORS"
+    echo "   (Settings > Binary Media Types must list image/* and multipart/form-data"
+    echo "    so raw image uploads reach /process-image intact)"
     echo "6. Deploy API"
 }
 
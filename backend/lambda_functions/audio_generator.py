@@ -1,11 +1,29 @@
 import json
-import boto3
+import sys
+import os
 import base64
+import hashlib
 import logging
 
+# Shared helpers: utils/ is packaged next to the handler (see deploy.sh),
+# ../utils when running from the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from aws_clients import get_client
+from audio_cache import AUDIO_DELIVERY, AudioCache, content_type_for, synthesize_for_response, synthesize_handle
+from audio_formats import content_type
+from http_ranges import byte_range, content_range, etag_matches
+from request_parsing import requested_audio_delivery, requested_audio_format
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Created once per container and reused across warm invocations
+polly = get_client('polly')
+# Synthesized speech by content hash: S3 with AUDIO_CACHE_BUCKET, else /tmp
+audio_cache = AudioCache.from_env()
+
 def lambda_handler(event, context):
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
@@ -20,11 +38,13 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Parse request
-        body = json.loads(event.get('body', '{}'))
+        # Parse request: text to speak, or the audio_id handle a lazy response returned
+        # (POST {"audio_id": ...} or GET ?id=...)
+        body = json.loads(event.get('body') or '{}')
         text = body.get('text')
+        audio_id = (event.get('queryStringParameters') or {}).get('id') or body.get('audio_id')
         
-        if not text:
+        if not text and not audio_id:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -34,20 +54,53 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'No text provided'})
             }
         
-        # Initialize Polly client
-        polly = boto3.client('polly', region_name='us-east-1')
+        # Format and sample rate: "audio_profile" ("low" for mobile data), an explicit
+        # audio_format/audio_sample_rate, or the Accept header; a handle keeps its own
+        try:
+            output_format, sample_rate = requested_audio_format(event, body)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Content-Type': 'application/json'
+                },
+                'body': json.dumps({'error': str(e)})
+            }
+        audio_type = content_type(output_format) if text else content_type_for(audio_id)
         
         # Generate audio using Polly
         try:
-            polly_response = polly.synthesize_speech(
-                Text=text,
-                OutputFormat='mp3',
-                VoiceId='Joanna',
-                Engine='neural'
-            )
-            
-            audio_data = polly_response['AudioStream'].read()
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            # Repeated text (canned fallbacks, "Listen" pressed again) skips Polly
+            # ?audio=url returns a presigned URL (AUDIO_CACHE_BUCKET) instead of base64
+            delivery = requested_audio_delivery(event, body, AUDIO_DELIVERY)
+            if delivery == 'lazy' or event.get('httpMethod') == 'GET' or body.get('speculative'):
+                # This is where lazy handles get their audio; speculative invokes only store it
+                delivery = 'url'
+            if text:
+                resolved = synthesize_for_response(polly, text, audio_cache, delivery,
+                                                   output_format=output_format, sample_rate=sample_rate)
+            else:
+                resolved = synthesize_handle(polly, audio_id, audio_cache, delivery)
+            if resolved is None:
+                # Registered in another container's /tmp (no AUDIO_CACHE_BUCKET) or expired
+                return {
+                    'statusCode': 404,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({'error': 'Unknown audio_id; send the text instead'})
+                }
+            audio_fields, audio_cached = resolved
+            if body.get('speculative'):
+                # Asynchronous invoke from a handler that just returned this text: the audio is
+                # in the cache for the "Listen" request that may follow (hits there are the used
+                # speculations, the rest is wasted)
+                logger.info(f"Speculative audio {'already cached' if audio_cached else 'synthesized'}: "
+                            f"{len(text)} chars")
+                return {'statusCode': 202, 'body': ''}
+            logger.info(f"Audio cache {'hit' if audio_cached else 'miss'}: {audio_cache.stats()}")
             
         except Exception as e:
             logger.error(f"Polly error: {e}")
@@ -60,6 +113,57 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'Audio generation failed'})
             }
         
+        if event.get('httpMethod') == 'GET':
+            # A handle used directly as an <audio> src: send the player to the stored audio
+            # (S3 answers Range and ETag requests itself), or (without AUDIO_CACHE_BUCKET)
+            # the audio itself as a binary response
+            if 'audio_base64' not in audio_fields:
+                return {
+                    'statusCode': 302,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Location': audio_fields['audio_url'],
+                        'Cache-Control': 'no-store'
+                    },
+                    'body': ''
+                }
+            # Players seek with Range requests; the handle's audio can differ by engine,
+            # so it is validated by its content rather than cached as immutable
+            headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+            audio = base64.b64decode(audio_fields['audio_base64'])
+            etag = f'"{hashlib.sha256(audio).hexdigest()[:32]}"'
+            audio_headers = {
+                'Access-Control-Allow-Origin': '*',
+                'Content-Type': audio_type,
+                'Accept-Ranges': 'bytes',
+                'ETag': etag,
+                'Cache-Control': 'no-cache'
+            }
+            if etag_matches(headers.get('if-none-match'), etag):
+                return {'statusCode': 304, 'headers': audio_headers, 'body': ''}
+            try:
+                requested = byte_range(headers.get('range'), len(audio), headers.get('if-range'), etag)
+            except ValueError:
+                return {
+                    'statusCode': 416,
+                    'headers': {**audio_headers, 'Content-Range': f'bytes */{len(audio)}'},
+                    'body': ''
+                }
+            if requested is None:
+                return {
+                    'statusCode': 200,
+                    'headers': audio_headers,
+                    'body': audio_fields['audio_base64'],
+                    'isBase64Encoded': True
+                }
+            start, end = requested
+            return {
+                'statusCode': 206,
+                'headers': {**audio_headers, 'Content-Range': content_range(start, end, len(audio))},
+                'body': base64.b64encode(audio[start:end + 1]).decode('utf-8'),
+                'isBase64Encoded': True
+            }
+        
         return {
             'statusCode': 200,
             'headers': {
@@ -68,8 +172,10 @@ def lambda_handler(event, context):
             },
             'body': json.dumps({
                 'success': True,
-                'audio_base64': audio_base64,
-                'content_type': 'audio/mp3'
+                'content_type': audio_type,
+                'cached': audio_cached,
+                # audio_base64 and/or audio_url, depending on the delivery mode
+                **audio_fields
             })
         }
         
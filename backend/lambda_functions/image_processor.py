@@ -1,11 +1,33 @@
 import json
-import boto3
-import base64
+import sys
+import os
 import logging
 
+# Shared helpers: utils/ is packaged next to the handler (see deploy.sh),
+# ../utils when running from the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from admission import Overloaded, retry_after_header
+from aws_clients import get_client
+from audio_cache import AUDIO_DELIVERY, AudioCache, handler_audio_delivery, lazy_audio_fields, synthesize_for_response
+from description_cache import DescriptionCache
+from image_analysis import describe_image
+from perceptual_hash import NearDuplicateIndex
+from audio_formats import content_type
+from request_parsing import image_from_event, requested_audio_delivery, requested_audio_format
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Created once per container and reused across warm invocations
+bedrock = get_client('bedrock-runtime')
+description_cache = DescriptionCache.from_env()
+near_duplicates = NearDuplicateIndex.for_cache(description_cache)
+polly = get_client('polly')
+# Synthesized speech by content hash: S3 with AUDIO_CACHE_BUCKET, else /tmp
+audio_cache = AudioCache.from_env()
+
 def lambda_handler(event, context):
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
@@ -20,11 +42,17 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Parse request
-        body = json.loads(event.get('body', '{}'))
-        image_base64 = body.get('image')
+        # Parse request: raw image/* body, multipart upload, or JSON data URL
+        try:
+            image_data, _, body = image_from_event(event)
+            # ?audio_profile=low (or audio_format/audio_sample_rate, in the query or the
+            # JSON body) for smaller audio
+            output_format, sample_rate = requested_audio_format(event, body)
+            parse_error = 'No image provided'
+        except ValueError as e:
+            image_data, parse_error = None, str(e)
         
-        if not image_base64:
+        if not image_data:
             return {
                 'statusCode': 400,
                 'headers': {
@@ -33,68 +61,33 @@ def lambda_handler(event, context):
                     'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
                     'Content-Type': 'application/json'
                 },
-                'body': json.dumps({'error': 'No image provided'})
+                'body': json.dumps({'error': parse_error})
             }
         
-        # Initialize AWS clients
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        polly = boto3.client('polly', region_name='us-east-1')
-        
-        # Clean base64 data
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        # Analyze image with Claude 3 Sonnet
-        try:
-            bedrock_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": image_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": "You are an expert educator helping visually impaired students. Analyze this educational image and provide a detailed, comprehensive description that includes: 1) Overall content and context, 2) Key elements and their relationships, 3) Any text, labels, or numbers visible, 4) Educational significance and learning objectives. Make it engaging and accessible for audio consumption."
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            bedrock_response = bedrock.invoke_model(
-                modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(bedrock_body)
-            )
-            
-            bedrock_result = json.loads(bedrock_response.get("body").read())
-            description = bedrock_result["content"][0]["text"]
-            
-        except Exception as e:
-            logger.error(f"Bedrock error: {e}")
-            description = "This appears to be an educational image with visual content that requires detailed analysis. The AI system has received your image and is processing the visual elements to provide comprehensive educational insights."
+        # Analyze image with Claude 3 Sonnet, reusing cached descriptions of identical
+        # or near-duplicate (recompressed, re-photographed) images
+        description, cached = describe_image(
+            bedrock, image_data,
+            cache=description_cache,
+            near_duplicates=near_duplicates
+        )
+        logger.info(f"Description cache {'hit' if cached else 'miss'}: {description_cache.stats()}")
         
         # Generate audio using Polly
         try:
-            polly_response = polly.synthesize_speech(
-                Text=description,
-                OutputFormat='mp3',
-                VoiceId='Joanna',
-                Engine='neural'
-            )
-            
-            audio_data = polly_response['AudioStream'].read()
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            # Repeated text (canned fallbacks, "Listen" pressed again) skips Polly
+            # ?audio=url (or "audio_delivery": "url") returns a presigned URL (AUDIO_CACHE_BUCKET) instead of base64
+            # Lazy handles need the shared store (AUDIO_CACHE_BUCKET) audio_generator reads
+            delivery = handler_audio_delivery(requested_audio_delivery(event, body, AUDIO_DELIVERY), audio_cache)
+            if delivery == 'lazy':
+                # ?audio=lazy answers with the text now and an audio handle; Polly runs
+                # when the handle is first fetched from audio_generator
+                audio_fields, audio_cached = lazy_audio_fields(
+                    description, audio_cache, output_format=output_format, sample_rate=sample_rate), False
+            else:
+                audio_fields, audio_cached = synthesize_for_response(
+                    polly, description, audio_cache, delivery, output_format=output_format, sample_rate=sample_rate)
+                logger.info(f"Audio cache {'hit' if audio_cached else 'miss'}: {audio_cache.stats()}")
             
         except Exception as e:
             logger.error(f"Polly error: {e}")
@@ -120,13 +113,30 @@ def lambda_handler(event, context):
             'body': json.dumps({
                 'success': True,
                 'description': description,
-                'audio_base64': audio_base64,
-                'content_type': 'audio/mp3',
+                'cached': cached,
+                'content_type': content_type(output_format),
+                'audio_cached': audio_cached,
+                # audio_base64 and/or audio_url, or audio_id for lazy delivery
+                **audio_fields,
                 'detected_objects': [],
                 'extracted_text': ''
             })
         }
         
+    except Overloaded as e:
+        # Bedrock is throttling: tell the client when to retry instead of sending a canned answer
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+                'Content-Type': 'application/json',
+                **retry_after_header(e)
+            },
+            'body': json.dumps({'error': 'Too many requests right now, please try again shortly', 'retry_after': e.retry_after})
+        }
+        
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         return {
@@ -1,11 +1,37 @@
 import json
-import boto3
+import sys
+import os
+import time
 import logging
 
+# Shared helpers: utils/ is packaged next to the handler (see deploy.sh),
+# ../utils when running from the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from admission import Overloaded, retry_after_header
+from aws_clients import get_client
+from description_cache import DescriptionCache
+from bedrock_streaming import collect_event_stream, sse_event
+from image_analysis import describe_image, describe_image_stream
+from perceptual_hash import NearDuplicateIndex
+from request_parsing import accepts_event_stream, image_from_event
+from speculative_audio import LambdaSpeculativeAudio
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Created once per container and reused across warm invocations
+bedrock = get_client('bedrock-runtime')
+description_cache = DescriptionCache.from_env()
+near_duplicates = NearDuplicateIndex.for_cache(description_cache)
+# Starts audio_generator on the description before "Listen" is pressed
+# (SPECULATIVE_AUDIO_FUNCTION, SPECULATIVE_AUDIO_RATE); None when not configured
+speculative_audio = LambdaSpeculativeAudio.from_env()
+
 def lambda_handler(event, context):
+    start = time.perf_counter()
+    
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
         return {
@@ -19,68 +45,63 @@ def lambda_handler(event, context):
         }
     
     try:
-        # Parse request
-        body = json.loads(event.get('body', '{}'))
-        image_base64 = body.get('image')
+        # Parse request: raw image/* body, multipart upload, or JSON data URL
+        try:
+            image_data, _, _ = image_from_event(event)
+            parse_error = 'No image provided'
+        except ValueError as e:
+            image_data, parse_error = None, str(e)
         
-        if not image_base64:
+        if not image_data:
             return {
                 'statusCode': 400,
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
                     'Content-Type': 'application/json'
                 },
-                'body': json.dumps({'error': 'No image provided'})
+                'body': json.dumps({'error': parse_error})
             }
         
-        # Initialize Bedrock client only
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        
-        # Clean base64 data
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        # Analyze image with Claude 3 Sonnet - TEXT ONLY
-        try:
-            bedrock_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1000,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": image_base64
-                                }
-                            },
-                            {
-                                "type": "text",
-                                "text": "You are an expert educator helping visually impaired students. Analyze this educational image and provide a detailed, comprehensive description that includes: 1) Overall content and context, 2) Key elements and their relationships, 3) Any text, labels, or numbers visible, 4) Educational significance and learning objectives. Make it engaging and accessible for audio consumption."
-                            }
-                        ]
-                    }
-                ]
-            }
-            
-            bedrock_response = bedrock.invoke_model(
-                modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(bedrock_body)
+        if accepts_event_stream(event):
+            # The Python runtime cannot stream Lambda responses, so token events are
+            # buffered; time to first token is still measured and logged
+            chunks, cached = describe_image_stream(
+                bedrock, image_data,
+                cache=description_cache,
+                near_duplicates=near_duplicates
             )
-            
-            bedrock_result = json.loads(bedrock_response.get("body").read())
-            description = bedrock_result["content"][0]["text"]
-            
-        except Exception as e:
-            logger.error(f"Bedrock error: {e}")
-            description = "This appears to be an educational image with visual content that requires detailed analysis. The AI system has received your image and is processing the visual elements to provide comprehensive educational insights."
+            events, description, metrics = collect_event_stream(chunks, start)
+            logger.info(f"Streamed description ({'hit' if cached else 'miss'}): {metrics}")
+            if speculative_audio:
+                speculative_audio.speculate(description)
+            events.append(sse_event('done', {
+                'success': True,
+                'description': description,
+                'cached': cached,
+                'metrics': metrics
+            }))
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Content-Type': 'text/event-stream',
+                    'Cache-Control': 'no-cache'
+                },
+                'body': ''.join(events)
+            }
+        
+        # Analyze image with Claude 3 Sonnet, reusing cached descriptions of identical
+        # or near-duplicate (recompressed, re-photographed) images
+        description, cached = describe_image(
+            bedrock, image_data,
+            cache=description_cache,
+            near_duplicates=near_duplicates
+        )
+        logger.info(f"Description cache {'hit' if cached else 'miss'}: {description_cache.stats()}")
+        if speculative_audio:
+            speculative_audio.speculate(description)
         
-        # Return text immediately - NO AUDIO GENERATION
+        # Return text immediately - NO AUDIO GENERATION (it may be synthesizing speculatively)
         return {
             'statusCode': 200,
             'headers': {
@@ -89,10 +110,23 @@ def lambda_handler(event, context):
             },
             'body': json.dumps({
                 'success': True,
-                'description': description
+                'description': description,
+                'cached': cached
             })
         }
         
+    except Overloaded as e:
+        # Bedrock is throttling: tell the client when to retry instead of sending a canned answer
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Content-Type': 'application/json',
+                **retry_after_header(e)
+            },
+            'body': json.dumps({'error': 'Too many requests right now, please try again shortly', 'retry_after': e.retry_after})
+        }
+        
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         return {
@@ -0,0 +1,126 @@
+import json
+import sys
+import os
+import logging
+
+# Shared helpers: utils/ is packaged next to the handler (see deploy.sh),
+# ../utils when running from the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from aws_clients import get_client
+from narration_jobs import NarrationJobs
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Created once per container and reused across warm invocations. Tasks write to
+# NARRATION_BUCKET; NARRATION_TABLE deduplicates submissions across containers.
+polly = get_client('polly')
+try:
+    narrations, configuration_error = NarrationJobs.from_env(polly), None
+except RuntimeError as e:
+    # Missing NARRATION_BUCKET/NARRATION_TABLE: every request is answered with a 500 saying so
+    logger.error(str(e))
+    narrations, configuration_error = None, str(e)
+
+def lambda_handler(event, context):
+    """
+    Narrate long documents asynchronously: POST {"text"} starts (or finds) a Polly speech
+    synthesis task and returns its job at once; GET ?job_id=...&wait=20 polls it until the
+    audio is ready. Identical text maps to the same job.
+    """
+    # Handle CORS preflight
+    if event.get('httpMethod') == 'OPTIONS':
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+            },
+            'body': ''
+        }
+    
+    if configuration_error:
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': configuration_error})
+        }
+    
+    try:
+        if event.get('httpMethod') == 'GET':
+            params = event.get('queryStringParameters') or {}
+            job_id = params.get('job_id') or (event.get('pathParameters') or {}).get('job_id')
+            try:
+                wait = float(params.get('wait') or 0)
+            except ValueError:
+                return {
+                    'statusCode': 400,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({'error': 'wait must be a number of seconds'})
+                }
+            job = narrations.status(job_id, wait=wait) if job_id else None
+            
+            if job is None:
+                return {
+                    'statusCode': 404,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json'
+                    },
+                    'body': json.dumps({'error': 'Unknown narration job'})
+                }
+            
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Content-Type': 'application/json'
+                },
+                'body': json.dumps({'success': True, **job})
+            }
+        
+        # Parse request
+        body = json.loads(event.get('body', '{}'))
+        
+        try:
+            job = narrations.submit(body.get('text'), voice_id=body.get('voice_id'))
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Content-Type': 'application/json'
+                },
+                'body': json.dumps({'error': str(e)})
+            }
+        
+        logger.info(f"Narration job {job['job_id']} {job['status']}: {narrations.stats()}")
+        return {
+            # Accepted: the audio is produced in the background
+            'statusCode': 202,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'success': job['status'] != 'failed', **job})
+        }
+        
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Content-Type': 'application/json'
+            },
+            'body': json.dumps({'error': f'Internal server error: {str(e)}'})
+        }
@@ -1,11 +1,29 @@
 import json
-import boto3
-import base64
+import sys
+import os
 import logging
 
+# Shared helpers: utils/ is packaged next to the handler (see deploy.sh),
+# ../utils when running from the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from admission import BEDROCK_ADMISSION, Overloaded, is_throttling, retry_after_header
+from aws_clients import get_client
+from audio_cache import AUDIO_DELIVERY, AudioCache, handler_audio_delivery, lazy_audio_fields, synthesize_for_response
+from hedging import hedged_invoke_model
+from audio_formats import content_type
+from request_parsing import requested_audio_delivery, requested_audio_format
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Created once per container and reused across warm invocations
+bedrock = get_client('bedrock-runtime')
+polly = get_client('polly')
+# Synthesized speech by content hash: S3 with AUDIO_CACHE_BUCKET, else /tmp
+audio_cache = AudioCache.from_env()
+
 def lambda_handler(event, context):
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
@@ -37,9 +55,20 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'No question provided'})
             }
         
-        # Initialize AWS clients
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        polly = boto3.client('polly', region_name='us-east-1')
+        # "audio_profile": "low" (or audio_format/audio_sample_rate) for smaller audio
+        try:
+            output_format, sample_rate = requested_audio_format(event, body)
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+                    'Content-Type': 'application/json'
+                },
+                'body': json.dumps({'error': str(e)})
+            }
         
         # Generate contextual answer using Claude 3 Sonnet
         try:
@@ -67,31 +96,31 @@ Keep your response conversational and supportive."""
                 ]
             }
             
-            bedrock_response = bedrock.invoke_model(
-                modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(bedrock_body)
-            )
-            
-            bedrock_result = json.loads(bedrock_response.get("body").read())
+            # Hedged against slow responses when BEDROCK_HEDGING is on
+            bedrock_result = hedged_invoke_model(bedrock, "anthropic.claude-3-sonnet-20240229-v1:0", bedrock_body)
             answer = bedrock_result["content"][0]["text"]
             
         except Exception as e:
             logger.error(f"Bedrock error: {e}")
+            if is_throttling(e):
+                raise BEDROCK_ADMISSION.throttled()
             answer = f"Thank you for your question about {question}. Based on the educational content we discussed, I can help explain this concept in more detail. Let me provide you with a comprehensive answer that builds on what we've already covered."
         
         # Convert answer to speech using Polly
         try:
-            polly_response = polly.synthesize_speech(
-                Text=answer,
-                OutputFormat='mp3',
-                VoiceId='Joanna',
-                Engine='neural'
-            )
-            
-            audio_data = polly_response['AudioStream'].read()
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+            # Repeated text (canned fallbacks, "Listen" pressed again) skips Polly
+            # ?audio=url returns a presigned URL (AUDIO_CACHE_BUCKET) instead of base64
+            # Lazy handles need the shared store (AUDIO_CACHE_BUCKET) audio_generator reads
+            delivery = handler_audio_delivery(requested_audio_delivery(event, body, AUDIO_DELIVERY), audio_cache)
+            if delivery == 'lazy':
+                # ?audio=lazy answers with the text now and an audio handle; Polly runs
+                # when the handle is first fetched from audio_generator
+                audio_fields, audio_cached = lazy_audio_fields(
+                    answer, audio_cache, output_format=output_format, sample_rate=sample_rate), False
+            else:
+                audio_fields, audio_cached = synthesize_for_response(
+                    polly, answer, audio_cache, delivery, output_format=output_format, sample_rate=sample_rate)
+                logger.info(f"Audio cache {'hit' if audio_cached else 'miss'}: {audio_cache.stats()}")
             
         except Exception as e:
             logger.error(f"Polly error: {e}")
@@ -117,11 +146,27 @@ Keep your response conversational and supportive."""
             'body': json.dumps({
                 'success': True,
                 'answer': answer,
-                'audio_base64': audio_base64,
-                'content_type': 'audio/mp3'
+                'content_type': content_type(output_format),
+                'audio_cached': audio_cached,
+                # audio_base64 and/or audio_url, or audio_id for lazy delivery
+                **audio_fields
             })
         }
         
+    except Overloaded as e:
+        # Bedrock is throttling: tell the client when to retry instead of sending a canned answer
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
+                'Content-Type': 'application/json',
+                **retry_after_header(e)
+            },
+            'body': json.dumps({'error': 'Too many requests right now, please try again shortly', 'retry_after': e.retry_after})
+        }
+        
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         return {
@@ -1,11 +1,31 @@
 import json
-import boto3
+import sys
+import os
+import time
 import logging
 
+# Shared helpers: utils/ is packaged next to the handler (see deploy.sh),
+# ../utils when running from the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from admission import BEDROCK_ADMISSION, Overloaded, is_throttling, retry_after_header
+from aws_clients import get_client
+from bedrock_streaming import collect_event_stream, sse_event, stream_model_text
+from hedging import hedged_invoke_model
+from request_parsing import accepts_event_stream
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Created once per container and reused across warm invocations
+bedrock = get_client('bedrock-runtime')
+
+CHAT_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
 def lambda_handler(event, context):
+    start = time.perf_counter()
+    
     # Handle CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
         return {
@@ -34,18 +54,14 @@ def lambda_handler(event, context):
                 'body': json.dumps({'error': 'No question provided'})
             }
         
-        # Initialize Bedrock client only
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        
-        # Generate contextual answer using Claude 3 Sonnet - TEXT ONLY
-        try:
-            bedrock_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 600,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": f"""You are a helpful educational assistant. Based on this content: {original_description}
+        fallback_answer = f"Thank you for your question about {question}. Based on the educational content we discussed, I can help explain this concept in more detail. Let me provide you with a comprehensive answer that builds on what we've already covered."
+        bedrock_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 600,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": f"""You are a helpful educational assistant. Based on this content: {original_description}
 
 Student asks: {question}
 
@@ -56,23 +72,45 @@ Provide a brief, focused answer (2-3 sentences) that:
 - Encourages curiosity
 
 Be conversational and engaging, not repetitive."""
-                    }
-                ]
-            }
-            
-            bedrock_response = bedrock.invoke_model(
-                modelId="anthropic.claude-3-sonnet-20240229-v1:0",
-                contentType="application/json",
-                accept="application/json",
-                body=json.dumps(bedrock_body)
+                }
+            ]
+        }
+        
+        if accepts_event_stream(event):
+            # The Python runtime cannot stream Lambda responses, so token events are
+            # buffered; time to first token is still measured and logged
+            events, answer, metrics = collect_event_stream(
+                stream_model_text(bedrock, CHAT_MODEL_ID, bedrock_body),
+                start,
+                fallback=fallback_answer
             )
-            
-            bedrock_result = json.loads(bedrock_response.get("body").read())
+            logger.info(f"Streamed answer: {metrics}")
+            events.append(sse_event('done', {
+                'success': True,
+                'answer': answer,
+                'metrics': metrics
+            }))
+            return {
+                'statusCode': 200,
+                'headers': {
+                    'Access-Control-Allow-Origin': '*',
+                    'Content-Type': 'text/event-stream',
+                    'Cache-Control': 'no-cache'
+                },
+                'body': ''.join(events)
+            }
+        
+        # Generate contextual answer using Claude 3 Sonnet - TEXT ONLY
+        try:
+            # Hedged against slow responses when BEDROCK_HEDGING is on
+            bedrock_result = hedged_invoke_model(bedrock, CHAT_MODEL_ID, bedrock_body)
             answer = bedrock_result["content"][0]["text"]
             
         except Exception as e:
             logger.error(f"Bedrock error: {e}")
-            answer = f"Thank you for your question about {question}. Based on the educational content we discussed, I can help explain this concept in more detail. Let me provide you with a comprehensive answer that builds on what we've already covered."
+            if is_throttling(e):
+                raise BEDROCK_ADMISSION.throttled()
+            answer = fallback_answer
         
         # Return text immediately - NO AUDIO GENERATION
         return {
@@ -87,6 +125,18 @@ Be conversational and engaging, not repetitive."""
             })
         }
         
+    except Overloaded as e:
+        # Bedrock is throttling: tell the client when to retry instead of sending a canned answer
+        return {
+            'statusCode': 429,
+            'headers': {
+                'Access-Control-Allow-Origin': '*',
+                'Content-Type': 'application/json',
+                **retry_after_header(e)
+            },
+            'body': json.dumps({'error': 'Too many requests right now, please try again shortly', 'retry_after': e.retry_after})
+        }
+        
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         return {
@@ -0,0 +1,175 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Standard library only: shipped next to the single-file handlers in rebuild/backend too
+
+# Bedrock requests allowed in flight at once in this process. Size it to the account's
+# Bedrock quota for the model (requests per minute / 60 * typical seconds per call),
+# divided by the number of server processes sharing it; 0 disables admission control.
+MAX_CONCURRENCY = int(os.environ.get("BEDROCK_MAX_CONCURRENCY", "8"))
+
+# Requests that may wait for a slot; beyond this they are turned away at once with a 429
+MAX_QUEUE = int(os.environ.get("BEDROCK_MAX_QUEUE", "32"))
+
+# Longest a request waits for a slot (seconds) before it is turned away with a 429
+QUEUE_TIMEOUT = float(os.environ.get("BEDROCK_QUEUE_TIMEOUT", "10"))
+
+# Bedrock errors meaning "over quota, try later" rather than "this request is bad"
+THROTTLING_ERROR_CODES = ("ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException")
+
+# Recent queue waits kept for the percentiles in stats()
+WAIT_WINDOW = 500
+
+# Assumed seconds per Bedrock call until one has been timed
+DEFAULT_SERVICE_SECONDS = 3.0
+
+
+class Overloaded(Exception):
+    """No Bedrock capacity for this request now; answer 429 with Retry-After: retry_after"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_throttling(error):
+    """True for a Bedrock ClientError that reports throttling or an exhausted quota"""
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLING_ERROR_CODES
+
+
+def retry_after_header(error):
+    """Retry-After for an Overloaded 429, readable by the frontend across origins"""
+    return {"Retry-After": str(error.retry_after), "Access-Control-Expose-Headers": "Retry-After"}
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded, deadline-limited wait queue.
+
+    A request takes one of max_concurrency slots for its Bedrock call. Without a free
+    slot it waits in line for up to queue_timeout seconds; when max_queue requests are
+    already waiting it is rejected at once. Both rejections raise Overloaded carrying
+    an estimate of when to retry: the queue ahead of it drained at the measured call
+    time per slot. Waiters are woken in arrival order.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.throttles = 0
+        self.waits_ms = deque(maxlen=WAIT_WINDOW)
+        self.service_seconds = None
+
+    @property
+    def enabled(self):
+        return self.max_concurrency > 0
+
+    def _retry_after(self):
+        """Whole seconds until a request arriving now would likely get a slot"""
+        service = self.service_seconds or DEFAULT_SERVICE_SECONDS
+        return max(1, math.ceil((self.waiting + 1) * service / max(self.max_concurrency, 1)))
+
+    def retry_after(self):
+        with self.condition:
+            return self._retry_after()
+
+    def acquire(self):
+        """Take a slot, waiting in line if need be; raises Overloaded when the queue is
+        full or the wait outlasts queue_timeout"""
+        if not self.enabled:
+            return
+        start = self.clock()
+        with self.condition:
+            if self.in_flight < self.max_concurrency and not self.waiting:
+                self.in_flight += 1
+                self.admitted += 1
+                self.waits_ms.append(0.0)
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"Bedrock admission queue is full ({self.waiting} waiting)", self._retry_after())
+
+            self.waiting += 1
+            self.queued += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            try:
+                while self.in_flight >= self.max_concurrency:
+                    remaining = start + self.queue_timeout - self.clock()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        # Pass on a wakeup this waiter may have taken
+                        self.condition.notify()
+                        raise Overloaded(f"No Bedrock slot within {self.queue_timeout:g}s", self._retry_after())
+                    self.condition.wait(remaining)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            self.waits_ms.append((self.clock() - start) * 1000)
+
+    def release(self, held_seconds):
+        if not self.enabled:
+            return
+        with self.condition:
+            self.in_flight -= 1
+            # Moving average of how long a request holds its slot
+            if self.service_seconds is None:
+                self.service_seconds = held_seconds
+            else:
+                self.service_seconds = 0.8 * self.service_seconds + 0.2 * held_seconds
+            self.condition.notify()
+
+    @contextmanager
+    def admit(self):
+        """Hold a slot for the duration of the block"""
+        self.acquire()
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.release(self.clock() - start)
+
+    def throttled(self, retry_after=None):
+        """Overloaded for a request Bedrock throttled despite admission (the limit is above
+        the account's quota): a 429 to retry later rather than a canned answer"""
+        with self.condition:
+            self.throttles += 1
+            return Overloaded("Bedrock is throttling requests", retry_after or self._retry_after())
+
+    def stats(self):
+        with self.condition:
+            waits = sorted(self.waits_ms)
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "queue_depth": self.waiting,
+                "peak_queue_depth": self.peak_waiting,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "throttled": self.throttles,
+                "wait_p50_ms": round(waits[len(waits) // 2], 1) if waits else None,
+                "wait_p95_ms": round(waits[min(int(len(waits) * 0.95), len(waits) - 1)], 1) if waits else None,
+                "retry_after_s": self._retry_after()
+            }
+
+
+# Shared by every Bedrock call site in the process
+BEDROCK_ADMISSION = AdmissionController()
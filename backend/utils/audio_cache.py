@@ -0,0 +1,534 @@
+import os
+import re
+import json
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+from itertools import chain
+
+from boto3.exceptions import S3UploadFailedError
+from botocore.exceptions import BotoCoreError, ClientError
+
+from aws_clients import get_client
+from audio_formats import FORMATS
+from engine_policy import ENGINE_POLICY
+from long_speech import POLLY_MAX_CHARS, stream_long, synthesize_long
+from single_flight import SingleFlight, lease_table_from_env
+
+logger = logging.getLogger(__name__)
+
+# Presigned URLs for cached audio stay valid this long (seconds)
+AUDIO_URL_TTL = int(os.environ.get("AUDIO_URL_TTL", "3600"))
+
+# How responses carry audio: "base64" inside the JSON body, "url" (the audio is stored
+# and the response holds a presigned or /audio URL the client streams natively), or
+# "lazy" (nothing is synthesized until the returned handle is first fetched).
+# Requests can override it with ?audio=url or "audio_delivery": "url".
+AUDIO_DELIVERY = os.environ.get("AUDIO_DELIVERY", "base64")
+
+# Public URL of audio_generator (the API Gateway generate-audio route); lazy handles are
+# fetched as GET <AUDIO_ENDPOINT_URL>?id=<audio_id>
+AUDIO_ENDPOINT_URL = os.environ.get("AUDIO_ENDPOINT_URL")
+
+# Size of the pieces Polly's AudioStream is read and forwarded in when streaming
+STREAM_CHUNK_BYTES = int(os.environ.get("AUDIO_STREAM_CHUNK_BYTES", "16384"))
+
+# Identical text being synthesized by one request is waited for by the others (and, with
+# SINGLE_FLIGHT_TABLE, by other containers) instead of being sent to Polly again
+AUDIO_SYNTHESES = SingleFlight("audio", lease_table_from_env())
+
+CONTENT_TYPES = {**{name: spec["content_type"] for name, spec in FORMATS.items()}, "json": "application/json"}
+
+
+# What make_audio_key produces; audio IDs from clients must match it
+AUDIO_KEY = re.compile(r"^[0-9a-f]{64}\.\w+$")
+
+
+def make_audio_key(text, voice_id, engine, output_format, sample_rate):
+    """Content address for synthesized audio: identical text and voice settings share one object"""
+    digest = hashlib.sha256(f"{voice_id}\0{engine}\0{output_format}\0{sample_rate}\0{text}".encode()).hexdigest()
+    return f"{digest}.{output_format}"
+
+
+def manifest_key(key):
+    """Where the text behind a lazy audio handle is kept, next to the audio it becomes"""
+    return f"{key.rsplit('.', 1)[0]}.json"
+
+
+def content_type_for(key):
+    return CONTENT_TYPES.get(key.rsplit(".", 1)[-1], "application/octet-stream")
+
+
+class S3AudioStore:
+    """Audio objects in S3, delivered through presigned GET URLs"""
+
+    name = "s3"
+    serves_urls = True
+    # Every container (and audio_generator) reads the same bucket
+    shared = True
+
+    def __init__(self, bucket, prefix="audio-cache/", region_name="us-east-1"):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = get_client("s3", region_name)
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}")
+            return response["Body"].read()
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                logger.warning(f"S3 audio cache read failed: {e}")
+            return None
+        except BotoCoreError as e:
+            # Connection errors and timeouts: an audio cache outage is a miss
+            logger.warning(f"S3 audio cache read failed: {e}")
+            return None
+
+    def size(self, key):
+        """Object size without downloading it, or None when it is not stored"""
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=f"{self.prefix}{key}")
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                logger.warning(f"S3 audio cache lookup failed: {e}")
+            return None
+        except BotoCoreError as e:
+            logger.warning(f"S3 audio cache lookup failed: {e}")
+            return None
+        return response["ContentLength"]
+
+    def put(self, key, audio):
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{key}",
+                Body=audio,
+                ContentType=content_type_for(key),
+                # Content-addressed: an object never changes once written
+                CacheControl="public, max-age=31536000, immutable"
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"S3 audio cache write failed: {e}")
+
+    def put_file(self, key, path):
+        """Store a finished temporary file (removed afterwards); multipart for large audio"""
+        try:
+            self.client.upload_file(path, self.bucket, f"{self.prefix}{key}", ExtraArgs={
+                "ContentType": content_type_for(key),
+                "CacheControl": "public, max-age=31536000, immutable"
+            })
+        except (ClientError, BotoCoreError, S3UploadFailedError) as e:
+            logger.warning(f"S3 audio cache write failed: {e}")
+        finally:
+            os.remove(path)
+
+    def url(self, key):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": f"{self.prefix}{key}"},
+            ExpiresIn=AUDIO_URL_TTL
+        )
+
+
+class LocalAudioStore:
+    """Audio files in a local directory: the S3 stand-in for local_server.py, and a
+    per-container cache under /tmp in Lambda. Bounded by total bytes, oldest evicted first."""
+
+    name = "local"
+    # Only this process (or container) sees the directory
+    shared = False
+
+    def __init__(self, directory="/tmp/seewrite-audio-cache", max_bytes=100 * 1024 * 1024, base_url=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Where the directory is served (local_server.py's /audio route); None when it is not
+        self.base_url = base_url
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def serves_urls(self):
+        return self.base_url is not None
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def size(self, key):
+        try:
+            size = os.path.getsize(self.path(key))
+            os.utime(self.path(key))
+        except OSError:
+            return None
+        return size
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                audio = f.read()
+        except OSError:
+            return None
+        # Touch the file so eviction approximates LRU
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return audio
+
+    def put(self, key, audio):
+        path = self.path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Local audio cache write failed: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def put_file(self, key, path):
+        """Store a finished temporary file, written in this directory, under key"""
+        try:
+            os.replace(path, self.path(key))
+        except OSError as e:
+            logger.warning(f"Local audio cache write failed: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            files = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.evictions += 1
+                total -= size
+
+    def url(self, key):
+        return f"{self.base_url}/{key}" if self.base_url else None
+
+
+class AudioCache:
+    """Content-addressed cache of synthesized speech; a hit skips Polly entirely"""
+
+    def __init__(self, store):
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_synthesized = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        audio = self.store.get(key)
+        with self.lock:
+            if audio is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_served += len(audio)
+        return audio
+
+    def size(self, key):
+        """Like get, for URL delivery: checks the object is stored without reading it"""
+        size = self.store.size(key)
+        with self.lock:
+            if size is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_served += size
+        return size
+
+    def put(self, key, audio):
+        self.store.put(key, audio)
+        with self.lock:
+            self.bytes_synthesized += len(audio)
+
+    def put_file(self, key, path):
+        """Like put, for audio written to a temporary file from temp_file()"""
+        size = os.path.getsize(path)
+        self.store.put_file(key, path)
+        with self.lock:
+            self.bytes_synthesized += size
+
+    def temp_file(self):
+        """(file, path) to write audio to before put_file; in the store's directory when it
+        has one, so storing it is a rename"""
+        fd, path = tempfile.mkstemp(suffix=".tmp", dir=getattr(self.store, "directory", None))
+        return os.fdopen(fd, "wb"), path
+
+    def register(self, text, voice_id="Joanna", engine="neural", output_format="mp3", sample_rate="24000"):
+        """Record text for synthesis on first fetch and return its audio key (the lazy handle)"""
+        key = make_audio_key(text, voice_id, engine, output_format, sample_rate)
+        manifest = {"text": text, "voice_id": voice_id, "engine": engine,
+                    "output_format": output_format, "sample_rate": sample_rate}
+        self.store.put(manifest_key(key), json.dumps(manifest).encode("utf-8"))
+        return key
+
+    def pending(self, key):
+        """The text and voice settings registered for a handle, or None if unknown"""
+        if not AUDIO_KEY.match(key or ""):
+            return None
+        manifest = self.store.get(manifest_key(key))
+        return json.loads(manifest) if manifest is not None else None
+
+    @property
+    def serves_urls(self):
+        return self.store.serves_urls
+
+    @property
+    def shared(self):
+        return self.store.shared
+
+    def url(self, key):
+        """URL the cached object can be fetched from, or None if the store is not served"""
+        return self.store.url(key)
+
+    def stats(self):
+        """Hit ratio and bytes served from cache, for logging and the /health endpoint"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "store": self.store.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "bytes_synthesized": self.bytes_synthesized,
+                "evictions": getattr(self.store, "evictions", 0)
+            }
+
+    @classmethod
+    def from_env(cls, base_url=None):
+        """S3 when AUDIO_CACHE_BUCKET is set, otherwise a local directory"""
+        if os.environ.get("AUDIO_CACHE_BUCKET"):
+            return cls(S3AudioStore(os.environ["AUDIO_CACHE_BUCKET"]))
+        return cls(LocalAudioStore(
+            os.environ.get("AUDIO_CACHE_DIR", "/tmp/seewrite-audio-cache"),
+            int(os.environ.get("AUDIO_CACHE_DISK_BYTES", str(100 * 1024 * 1024))),
+            base_url=base_url or os.environ.get("AUDIO_CACHE_BASE_URL")
+        ))
+
+
+def _engines_and_keys(polly, text, policy, voice_id, engine, output_format, sample_rate):
+    """The engines to try, and the cache keys to look up: the requested engine's and, when
+    the policy starts elsewhere, the first engine's"""
+    engines = policy.engines_for(polly, text, voice_id, engine)
+    keys = {candidate: make_audio_key(text, voice_id, candidate, output_format, sample_rate)
+            for candidate in dict.fromkeys([engine, engines[0]])}
+    return engines, keys
+
+
+def _stream_on(polly, text, engine, voice_id, output_format, sample_rate, chunk_bytes):
+    """Iterator over Polly's audio for text on one engine, read in chunk_bytes pieces"""
+    def open_stream(chunk):
+        response = polly.synthesize_speech(
+            Text=chunk,
+            OutputFormat=output_format,
+            VoiceId=voice_id,
+            Engine=engine,
+            SampleRate=sample_rate
+        )
+        return response["AudioStream"].iter_chunks(chunk_bytes)
+
+    return stream_long(open_stream, text, output_format)
+
+
+def _tee(pieces, cache, key):
+    """Yield the pieces while writing them to a temporary file, cached once the stream
+    completes; an abandoned stream (client gone) is discarded"""
+    if cache is None:
+        yield from pieces
+        return
+    f, path = cache.temp_file()
+    complete = False
+    try:
+        with f:
+            for piece in pieces:
+                f.write(piece)
+                yield piece
+        complete = True
+    finally:
+        if complete:
+            cache.put_file(key, path)
+        else:
+            os.remove(path)
+
+
+def synthesize_cached(polly, text, cache, voice_id="Joanna", engine="neural", output_format="mp3", sample_rate="24000",
+                      load=True, policy=None, flights=None):
+    """Polly synthesize_speech through the audio cache.
+
+    Returns (audio_bytes, key, cached). With load=False a cache hit is only checked, not
+    read, and audio_bytes is None; a miss is then streamed from Polly into the store
+    without holding the whole audio. The engine policy (default: the shared ENGINE_POLICY)
+    may synthesize on another engine than the one asked for (short text, neural
+    throttled); the audio is then cached, and its key returned, under the engine used.
+    Polly errors the policy cannot route around propagate; nothing is cached for them.
+    A miss for text already being synthesized waits for that synthesis (flights, default
+    AUDIO_SYNTHESES) and counts as cached.
+    """
+    policy = policy or ENGINE_POLICY
+    flights = flights or AUDIO_SYNTHESES
+    engines, keys = _engines_and_keys(polly, text, policy, voice_id, engine, output_format, sample_rate)
+    if cache is not None:
+        for key in keys.values():
+            if not load:
+                if cache.size(key) is not None:
+                    return None, key, True
+            else:
+                audio = cache.get(key)
+                if audio is not None:
+                    return audio, key, True
+
+    def key_on(engine_used):
+        return keys.get(engine_used) or make_audio_key(text, voice_id, engine_used, output_format, sample_rate)
+
+    def synthesize():
+        """(audio_bytes or None, key) from Polly, stored in the cache"""
+        if not load and cache is not None and len(text) <= POLLY_MAX_CHARS:
+            def store_on(engine_used):
+                # Straight from Polly's stream to the store; a stream that fails midway is discarded
+                pieces = _stream_on(polly, text, engine_used, voice_id, output_format, sample_rate,
+                                    STREAM_CHUNK_BYTES)
+                for _ in _tee(pieces, cache, key_on(engine_used)):
+                    pass
+
+            _, engine_used = policy.run(store_on, engines)
+            return None, key_on(engine_used)
+
+        def synthesize_on(engine_used):
+            def synthesize_chunk(chunk):
+                response = polly.synthesize_speech(
+                    Text=chunk,
+                    OutputFormat=output_format,
+                    VoiceId=voice_id,
+                    Engine=engine_used,
+                    SampleRate=sample_rate
+                )
+                return response["AudioStream"].read()
+
+            # Text over Polly's limit is synthesized in concurrent chunks and joined
+            return synthesize_long(synthesize_chunk, text, output_format)
+
+        audio, engine_used = policy.run(synthesize_on, engines)
+        key = key_on(engine_used)
+        if cache is not None:
+            cache.put(key, audio)
+        return audio, key
+
+    def stored():
+        # Another container's synthesis, once it has reached the shared store
+        for key in keys.values():
+            if cache.size(key) is not None:
+                return None, key
+        return None
+
+    result, flight = flights.begin(keys[engine], stored if cache is not None else None)
+    if flight is None:
+        audio, key = result
+        if load and audio is None:
+            audio = cache.get(key)
+        if audio is not None or not load:
+            return audio, key, True
+        # Evicted since it was stored: synthesize it again
+        return (*synthesize(), False)
+
+    try:
+        audio, key = synthesize()
+    except BaseException as e:
+        flights.end(keys[engine], flight, error=e)
+        raise
+    flights.end(keys[engine], flight, (audio, key))
+    return audio, key, False
+
+
+def stream_cached(polly, text, cache, voice_id="Joanna", engine="neural", output_format="mp3", sample_rate="24000",
+                  policy=None, chunk_bytes=STREAM_CHUNK_BYTES):
+    """Polly's AudioStream forwarded as it is produced, for chunked HTTP responses.
+
+    Returns (key, pieces): pieces is None on a cache hit (serve the stored object instead),
+    otherwise an iterator over the audio that also stores it in the cache once complete.
+    Playback can start on the first piece and the whole audio is never held in memory.
+    """
+    policy = policy or ENGINE_POLICY
+    engines, keys = _engines_and_keys(polly, text, policy, voice_id, engine, output_format, sample_rate)
+    if cache is not None:
+        for key in keys.values():
+            if cache.size(key) is not None:
+                return key, None
+
+    def start_on(engine_used):
+        # The first piece is awaited here, so a throttled engine falls back before anything is sent
+        pieces = _stream_on(polly, text, engine_used, voice_id, output_format, sample_rate, chunk_bytes)
+        return chain([next(pieces, b"")], pieces)
+
+    pieces, engine_used = policy.run(start_on, engines)
+    key = keys.get(engine_used) or make_audio_key(text, voice_id, engine_used, output_format, sample_rate)
+    return key, _tee(pieces, cache, key)
+
+
+def synthesize_for_response(polly, text, cache, delivery=AUDIO_DELIVERY, **voice):
+    """Synthesize text (through the cache) and return (fields, cached), fields being the audio
+    part of a response: {"audio_url"} for URL delivery, {"audio_base64", "audio_url"} otherwise.
+
+    URL delivery needs a store that serves URLs (S3, or local_server.py's /audio route);
+    without one the audio is sent as base64.
+    """
+    by_url = delivery == "url" and cache is not None and cache.serves_urls
+    audio, key, cached = synthesize_cached(polly, text, cache, load=not by_url, **voice)
+    audio_url = cache.url(key) if cache is not None else None
+    if by_url:
+        return {"audio_url": audio_url}, cached
+    return {"audio_base64": base64.b64encode(audio).decode("utf-8"), "audio_url": audio_url}, cached
+
+
+def handler_audio_delivery(delivery, cache):
+    """The delivery a Lambda handler can honour: a lazy handle is resolved by audio_generator,
+    another function, so it needs a store both read (S3). With a container's own /tmp the
+    handle could never be found; "url" is used instead (base64 when the store serves no URLs)."""
+    if delivery == "lazy" and (cache is None or not cache.shared):
+        return "url"
+    return delivery
+
+
+def lazy_audio_fields(text, cache, url_for=None, **voice):
+    """Lazy delivery: register text without calling Polly and return the response fields,
+    {"audio_id", "audio_url"}; audio_url fetches (and on first fetch synthesizes) the audio"""
+    key = cache.register(text, **voice)
+    if url_for is None and AUDIO_ENDPOINT_URL:
+        url_for = lambda audio_id: f"{AUDIO_ENDPOINT_URL}?id={audio_id}"
+    return {"audio_id": key, "audio_url": url_for(key) if url_for else None}
+
+
+def synthesize_handle(polly, key, cache, delivery=AUDIO_DELIVERY):
+    """Resolve a lazy handle: (fields, cached) like synthesize_for_response, or None when
+    the handle is unknown (expired, or registered in another container's /tmp)"""
+    manifest = cache.pending(key)
+    if manifest is None:
+        return None
+    text = manifest.pop("text")
+    return synthesize_for_response(polly, text, cache, delivery, **manifest)
@@ -0,0 +1,87 @@
+import os
+
+# Standard library only: the single-file rebuild/ handlers ship this module next to them
+
+# Polly output formats: the content type served and the sample rates synthesize_speech
+# accepts for it (neural voices)
+FORMATS = {
+    "mp3": {"content_type": "audio/mpeg", "sample_rates": ("8000", "16000", "22050", "24000")},
+    "ogg_vorbis": {"content_type": "audio/ogg", "sample_rates": ("8000", "16000", "22050", "24000")},
+    "pcm": {"content_type": "audio/pcm", "sample_rates": ("8000", "16000")}
+}
+
+# Media types in an Accept header (or "audio_accept" field) and the format they name
+MEDIA_TYPES = {"audio/mpeg": "mp3", "audio/mp3": "mp3", "audio/ogg": "ogg_vorbis", "audio/pcm": "pcm", "audio/l16": "pcm"}
+
+# Named tiers clients pick with "audio_profile". Speech carries little above 8 kHz, so
+# "low" (Vorbis at 16 kHz) keeps it clear for school Wi-Fi and mobile data; "pcm" is
+# uncompressed 16-bit mono for native clients that play it locally without decoding.
+PROFILES = {
+    "standard": ("mp3", "24000"),
+    "low": ("ogg_vorbis", "16000"),
+    "minimal": ("mp3", "8000"),
+    "pcm": ("pcm", "16000")
+}
+
+# Profile for requests that do not choose one
+AUDIO_PROFILE = os.environ.get("AUDIO_PROFILE", "standard")
+
+
+def content_type(output_format):
+    return FORMATS.get(output_format, {}).get("content_type", "application/octet-stream")
+
+
+def accepted_formats(accept):
+    """Formats named by an Accept header, most preferred first; empty when it names no
+    specific audio type (absent, */*, audio/*, or only non-audio types)"""
+    ranked = []
+    for position, entry in enumerate((accept or "").split(",")):
+        media_type, _, params = entry.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        output_format = MEDIA_TYPES.get(media_type.strip().lower())
+        if output_format and quality > 0:
+            ranked.append((-quality, position, output_format))
+    formats = []
+    for _, _, output_format in sorted(ranked):
+        if output_format not in formats:
+            formats.append(output_format)
+    return formats
+
+
+def _supported_rate(output_format, sample_rate):
+    """The highest rate output_format supports that is not above sample_rate"""
+    rates = FORMATS[output_format]["sample_rates"]
+    below = [rate for rate in rates if int(rate) <= int(sample_rate)]
+    return below[-1] if below else rates[0]
+
+
+def negotiate(accept=None, profile=None, output_format=None, sample_rate=None):
+    """(output_format, sample_rate) for a request.
+
+    An explicit format and sample rate win; otherwise the profile (default AUDIO_PROFILE)
+    applies, moved to the client's preferred format when the Accept header rules its codec
+    out. Raises ValueError for unknown profiles and formats and unsupported sample rates.
+    """
+    if profile and profile not in PROFILES:
+        raise ValueError(f"Unknown audio profile '{profile}'; use one of {', '.join(PROFILES)}")
+    if output_format and output_format not in FORMATS:
+        raise ValueError(f"Unknown audio format '{output_format}'; use one of {', '.join(FORMATS)}")
+    chosen_format, rate = PROFILES[profile or AUDIO_PROFILE]
+    accepted = accepted_formats(accept)
+    if output_format:
+        chosen_format = output_format
+    elif accepted and chosen_format not in accepted:
+        # The client cannot play the profile's codec: same sample rate, a format it can play
+        chosen_format = accepted[0]
+    if sample_rate:
+        if str(sample_rate) not in FORMATS[chosen_format]["sample_rates"]:
+            raise ValueError(f"{chosen_format} supports sample rates {', '.join(FORMATS[chosen_format]['sample_rates'])}")
+        return chosen_format, str(sample_rate)
+    return chosen_format, _supported_rate(chosen_format, rate)
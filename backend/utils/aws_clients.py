@@ -0,0 +1,68 @@
+import os
+import threading
+import logging
+
+import boto3
+from botocore.config import Config
+
+from rate_limiter import RATE_LIMITER, RATE_LIMITING_ENABLED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGION = "us-east-1"
+
+# Shared settings for every client: a connection pool large enough for the
+# thread pools in local_server.py, TCP keep-alive so warm Lambda containers
+# reuse their TLS connections, and standard retry mode with a small budget.
+BASE_CONFIG = Config(
+    max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True,
+    connect_timeout=float(os.environ.get("AWS_CONNECT_TIMEOUT", "3")),
+    read_timeout=float(os.environ.get("AWS_READ_TIMEOUT", "30")),
+    retries={"max_attempts": 3, "mode": "standard"}
+)
+
+# Per-service overrides merged on top of BASE_CONFIG. Bedrock generations can
+# run close to the Lambda timeout, the other services answer in seconds.
+SERVICE_CONFIGS = {
+    "bedrock-runtime": Config(read_timeout=55),
+    "polly": Config(read_timeout=15),
+    "rekognition": Config(read_timeout=10),
+    "textract": Config(read_timeout=15)
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def client_config(service_name):
+    """Return the botocore Config used for a service"""
+    override = SERVICE_CONFIGS.get(service_name)
+    return BASE_CONFIG.merge(override) if override else BASE_CONFIG
+
+
+def get_client(service_name, region_name=DEFAULT_REGION):
+    """Return the process-wide client for a service, creating it on first use"""
+    key = (service_name, region_name)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                logger.info(f"Creating {service_name} client for {region_name}")
+                client = boto3.client(
+                    service_name,
+                    region_name=region_name,
+                    config=client_config(service_name)
+                )
+                if RATE_LIMITING_ENABLED:
+                    # Bedrock and Polly calls wait for the shared adaptive budget
+                    RATE_LIMITER.attach(client)
+                _clients[key] = client
+    return client
+
+
+def reset_clients():
+    """Drop all cached clients (used by benchmarks and after credential changes)"""
+    with _lock:
+        _clients.clear()
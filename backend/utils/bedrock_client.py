@@ -1,104 +1,219 @@
-import boto3
 import json
 import logging
+from functools import partial
+
+from admission import BEDROCK_ADMISSION, is_throttling
+from aws_clients import get_client
+from bedrock_streaming import stream_model_text
+from hedging import backup_client, get_hedger
+from model_health import ModelHealth
 
 logger = logging.getLogger(__name__)
 
+MODELS_UNAVAILABLE_MESSAGE = "I apologize, but I'm unable to access the AI models right now. Please ensure Bedrock model access is enabled in your AWS account."
+
+# Try different models in order of preference (ON_DEMAND models first)
+MODEL_OPTIONS = [
+    "meta.llama3-8b-instruct-v1:0",
+    "meta.llama3-70b-instruct-v1:0",
+    "mistral.mistral-7b-instruct-v0:2",
+    "mistral.mixtral-8x7b-instruct-v0:1",
+    "cohere.command-text-v14",
+    "cohere.command-r-v1:0",
+    "anthropic.claude-3-haiku-20240307-v1:0",
+    "anthropic.claude-v2:1",
+    "anthropic.claude-v2"
+]
+
+# Shared by every BedrockClient in the process, so what one request learns about
+# unavailable or failing models spares the next one the round trips
+MODEL_HEALTH = ModelHealth(MODEL_OPTIONS)
+
+class TextStream:
+    """Text chunks of a streamed model response. complete turns True once the model has
+    finished; it stays False for a stream that broke midway, so the text joined from it
+    is known to be truncated."""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.complete = False
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        try:
+            return next(self.chunks)
+        except StopIteration as stop:
+            self.complete = stop.value is True
+            raise
+    
+    def close(self):
+        self.chunks.close()
+
 class BedrockClient:
     def __init__(self, region_name="us-east-1"):
-        self.client = boto3.client("bedrock-runtime", region_name=region_name)
-        # Try different models in order of preference (ON_DEMAND models first)
-        self.model_options = [
-            "meta.llama3-8b-instruct-v1:0",
-            "meta.llama3-70b-instruct-v1:0",
-            "mistral.mistral-7b-instruct-v0:2",
-            "mistral.mixtral-8x7b-instruct-v0:1",
-            "cohere.command-text-v14",
-            "cohere.command-r-v1:0",
-            "anthropic.claude-3-haiku-20240307-v1:0",
-            "anthropic.claude-v2:1",
-            "anthropic.claude-v2"
-        ]
+        self.client = get_client("bedrock-runtime", region_name)
+        self.model_options = list(MODEL_OPTIONS)
         self.model_id = self.model_options[0]
+        self.health = MODEL_HEALTH
+        self.hedger = get_hedger()
+        # Bounds the Bedrock calls in flight across the process; requests beyond it queue or get a 429
+        self.admission = BEDROCK_ADMISSION
+    
+    def _build_body(self, model_id, prompt_text):
+        """Request body in the format each model family expects"""
+        # Create appropriate body format for each model type
+        if model_id.startswith("anthropic.claude-3"):
+            body = {
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": 1000,
+                "messages": [{"role": "user", "content": prompt_text}]
+            }
+        elif model_id.startswith("anthropic.claude"):
+            body = {
+                "prompt": f"\n\nHuman: {prompt_text}\n\nAssistant:",
+                "max_tokens_to_sample": 1000,
+                "temperature": 0.5,
+                "stop_sequences": ["\n\nHuman:"]
+            }
+        elif model_id.startswith("meta.llama"):
+            body = {
+                "prompt": prompt_text,
+                "max_gen_len": 1000,
+                "temperature": 0.5,
+                "top_p": 0.9
+            }
+        elif model_id.startswith("mistral"):
+            body = {
+                "prompt": prompt_text,
+                "max_tokens": 1000,
+                "temperature": 0.5,
+                "top_p": 0.9
+            }
+        elif model_id.startswith("cohere"):
+            body = {
+                "prompt": prompt_text,
+                "max_tokens": 1000,
+                "temperature": 0.5,
+                "return_likelihoods": "NONE"
+            }
+        else:
+            body = {
+                "prompt": prompt_text,
+                "max_tokens": 1000,
+                "temperature": 0.5
+            }
+        return body
+    
+    def _invoke(self, model_id, prompt_text, client=None):
+        """One invoke_model call, recorded in the health table; raises on failure"""
+        start = self.health.clock()
+        try:
+            body = self._build_body(model_id, prompt_text)
+            
+            response = (client or self.client).invoke_model(
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+            response_body = json.loads(response.get("body").read())
+            text = self._response_text(model_id, response_body)
+        except Exception as e:
+            self.health.record_failure(model_id, e)
+            logger.warning(f"Model {model_id} failed: {e}")
+            raise
+        
+        self.health.record_success(model_id, (self.health.clock() - start) * 1000)
+        return text
+    
+    def _hedge_backup(self, model_id, remaining, prompt_text):
+        """Backup call for a hedged request: the same model in the hedge region if one is
+        configured, otherwise the next candidate model"""
+        if not self.hedger.enabled:
+            return None
+        other_region = backup_client()
+        if other_region:
+            return partial(self._invoke, model_id, prompt_text, client=other_region)
+        if remaining:
+            return partial(self._invoke, remaining[0], prompt_text)
+        return None
     
     def _try_model(self, prompt_text):
-        """Try different models until one works"""
-        for model_id in self.model_options:
-            try:
-                # Create appropriate body format for each model type
-                if model_id.startswith("anthropic.claude-3"):
-                    body = {
-                        "anthropic_version": "bedrock-2023-05-31",
-                        "max_tokens": 1000,
-                        "messages": [{"role": "user", "content": prompt_text}]
-                    }
-                elif model_id.startswith("anthropic.claude"):
-                    body = {
-                        "prompt": f"\n\nHuman: {prompt_text}\n\nAssistant:",
-                        "max_tokens_to_sample": 1000,
-                        "temperature": 0.5,
-                        "stop_sequences": ["\n\nHuman:"]
-                    }
-                elif model_id.startswith("meta.llama"):
-                    body = {
-                        "prompt": prompt_text,
-                        "max_gen_len": 1000,
-                        "temperature": 0.5,
-                        "top_p": 0.9
-                    }
-                elif model_id.startswith("mistral"):
-                    body = {
-                        "prompt": prompt_text,
-                        "max_tokens": 1000,
-                        "temperature": 0.5,
-                        "top_p": 0.9
-                    }
-                elif model_id.startswith("cohere"):
-                    body = {
-                        "prompt": prompt_text,
-                        "max_tokens": 1000,
-                        "temperature": 0.5,
-                        "return_likelihoods": "NONE"
-                    }
-                else:
-                    body = {
-                        "prompt": prompt_text,
-                        "max_tokens": 1000,
-                        "temperature": 0.5
-                    }
-                
-                response = self.client.invoke_model(
-                    modelId=model_id,
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(body)
-                )
-                response_body = json.loads(response.get("body").read())
+        """Try models in the order the health table suggests until one works, holding an
+        admission slot throughout; raises Overloaded when none is free or Bedrock throttles"""
+        throttled = False
+        with self.admission.admit():
+            candidates = self.health.candidates()
+            for i, model_id in enumerate(candidates):
+                try:
+                    return self.hedger.call(
+                        partial(self._invoke, model_id, prompt_text),
+                        self._hedge_backup(model_id, candidates[i + 1:], prompt_text),
+                        key=model_id
+                    )
+                except Exception as e:
+                    throttled = throttled or is_throttling(e)
+                    continue
+        
+        if throttled or (not candidates and self.health.throttled_retry_after()):
+            raise self.admission.throttled(self.health.throttled_retry_after())
+        return MODELS_UNAVAILABLE_MESSAGE
+    
+    def _response_text(self, model_id, response_body):
+        # Handle different response formats
+        if "content" in response_body and isinstance(response_body["content"], list):
+            return response_body["content"][0]["text"]
+        elif "completion" in response_body:
+            return response_body["completion"]
+        elif "generation" in response_body:
+            return response_body["generation"]
+        elif "generations" in response_body:
+            return response_body["generations"][0]["text"]
+        elif "text" in response_body:
+            return response_body["text"]
+        else:
+            logger.info(f"Model {model_id} succeeded! Response: {response_body}")
+            return str(response_body)
+    
+    def _stream_model(self, prompt_text):
+        """Like _try_model, but yields text as it is generated.
+
+        Falls through to the next model only while nothing has been yielded yet; a
+        stream that breaks midway ends with the text generated so far, and returns False
+        where a completed one returns True (TextStream.complete). The admission slot
+        is taken at the first next() (which raises Overloaded like _try_model) and held
+        until the stream ends or is closed.
+        """
+        throttled = False
+        with self.admission.admit():
+            candidates = self.health.candidates()
+            for model_id in candidates:
+                start = self.health.clock()
+                started = False
+                try:
+                    for text in stream_model_text(self.client, model_id, self._build_body(model_id, prompt_text)):
+                        started = True
+                        yield text
+                except Exception as e:
+                    self.health.record_failure(model_id, e)
+                    if started:
+                        logger.error(f"Model {model_id} failed mid-stream: {e}")
+                        return False
+                    logger.warning(f"Model {model_id} failed: {e}")
+                    throttled = throttled or is_throttling(e)
+                    continue
                 
-                # Handle different response formats
-                if "content" in response_body and isinstance(response_body["content"], list):
-                    return response_body["content"][0]["text"]
-                elif "completion" in response_body:
-                    return response_body["completion"]
-                elif "generation" in response_body:
-                    return response_body["generation"]
-                elif "generations" in response_body:
-                    return response_body["generations"][0]["text"]
-                elif "text" in response_body:
-                    return response_body["text"]
-                else:
-                    logger.info(f"Model {model_id} succeeded! Response: {response_body}")
-                    return str(response_body)
-                    
-            except Exception as e:
-                logger.warning(f"Model {model_id} failed: {e}")
-                continue
+                self.health.record_success(model_id, (self.health.clock() - start) * 1000)
+                return True
         
-        return "I apologize, but I'm unable to access the AI models right now. Please ensure Bedrock model access is enabled in your AWS account."
+        if throttled or (not candidates and self.health.throttled_retry_after()):
+            raise self.admission.throttled(self.health.throttled_retry_after())
+        yield MODELS_UNAVAILABLE_MESSAGE
     
-    def generate_educational_description(self, content_description):
-        """Generate detailed educational description from visual content"""
-        prompt = f"""You are an expert educator specializing in describing visual content for visually impaired students. 
+    def _description_prompt(self, content_description):
+        return f"""You are an expert educator specializing in describing visual content for visually impaired students. 
         
 Your task is to create a detailed, engaging audio description that:
 - Explains what is shown in clear, descriptive language
@@ -110,12 +225,9 @@ Your task is to create a detailed, engaging audio description that:
 Content to describe: {content_description}
 
 Provide a comprehensive description suitable for a visually impaired student:"""
-
-        return self._try_model(prompt)
     
-    def answer_followup_question(self, original_description, question):
-        """Answer follow-up questions about the content"""
-        prompt = f"""You are an expert educator helping a visually impaired student understand visual content.
+    def _followup_prompt(self, original_description, question):
+        return f"""You are an expert educator helping a visually impaired student understand visual content.
 
 Original content description: {original_description}
 
@@ -129,5 +241,19 @@ Provide a clear, detailed answer that:
 - Is optimized for audio delivery
 
 Answer:"""
-
-        return self._try_model(prompt)
\ No newline at end of file
+    
+    def generate_educational_description(self, content_description):
+        """Generate detailed educational description from visual content"""
+        return self._try_model(self._description_prompt(content_description))
+    
+    def stream_educational_description(self, content_description):
+        """TextStream of the educational description as it is generated"""
+        return TextStream(self._stream_model(self._description_prompt(content_description)))
+    
+    def answer_followup_question(self, original_description, question):
+        """Answer follow-up questions about the content"""
+        return self._try_model(self._followup_prompt(original_description, question))
+    
+    def stream_followup_answer(self, original_description, question):
+        """TextStream of the answer to a follow-up question as it is generated"""
+        return TextStream(self._stream_model(self._followup_prompt(original_description, question)))
\ No newline at end of file
@@ -0,0 +1,100 @@
+import json
+import time
+import logging
+
+from admission import BEDROCK_ADMISSION, Overloaded, is_throttling
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_text(payload):
+    """Text delta carried by one decoded response-stream chunk, for each supported model family"""
+    if "type" in payload:
+        # Claude 3 messages API: only content_block_delta events carry text
+        return payload.get("delta", {}).get("text", "") if payload["type"] == "content_block_delta" else ""
+    if "completion" in payload:
+        return payload["completion"]
+    if "generation" in payload:
+        return payload["generation"] or ""
+    if "outputs" in payload:
+        return "".join(output.get("text", "") for output in payload["outputs"])
+    if "text" in payload and not payload.get("is_finished"):
+        return payload["text"]
+    return ""
+
+
+def stream_model_text(bedrock, model_id, body):
+    """Yield text as the model generates it (invoke_model_with_response_stream); raises on Bedrock errors"""
+    response = bedrock.invoke_model_with_response_stream(
+        modelId=model_id,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(body)
+    )
+    for event in response["body"]:
+        chunk = event.get("chunk")
+        if chunk:
+            text = chunk_text(json.loads(chunk["bytes"]))
+            if text:
+                yield text
+
+
+class TimedStream:
+    """Iterate text chunks, recording time to first token separately from total latency"""
+
+    def __init__(self, chunks, start=None):
+        self.chunks = chunks
+        self.start = start if start is not None else time.perf_counter()
+        self.parts = []
+        self.first_token_ms = None
+        self.total_ms = None
+
+    def __iter__(self):
+        for text in self.chunks:
+            if self.first_token_ms is None:
+                self.first_token_ms = self._elapsed_ms()
+            self.parts.append(text)
+            yield text
+        self.total_ms = self._elapsed_ms()
+
+    def _elapsed_ms(self):
+        return round((time.perf_counter() - self.start) * 1000, 1)
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def metrics(self):
+        return {
+            "ttft_ms": self.first_token_ms,
+            "total_ms": self.total_ms if self.total_ms is not None else self._elapsed_ms(),
+            "chunks": len(self.parts)
+        }
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def collect_event_stream(chunks, start=None, fallback=None):
+    """Drain text chunks into SSE token events for a buffered Lambda response.
+
+    Returns (events, text, metrics). A stream that fails before its first token is
+    replaced by `fallback`, or raises Overloaded when Bedrock throttled it; one that
+    fails midway keeps what was generated.
+    """
+    timed = TimedStream(chunks, start)
+    events = []
+    try:
+        for text in timed:
+            events.append(sse_event("token", {"text": text}))
+    except Exception as e:
+        logger.error(f"Bedrock stream error: {e}")
+        if not timed.parts and (isinstance(e, Overloaded) or is_throttling(e)):
+            # Nothing generated yet: a 429 the client retries beats a canned answer
+            raise e if isinstance(e, Overloaded) else BEDROCK_ADMISSION.throttled()
+        if not timed.parts and fallback:
+            timed.parts.append(fallback)
+            events.append(sse_event("token", {"text": fallback}))
+    return events, timed.text, timed.metrics()
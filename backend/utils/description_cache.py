@@ -0,0 +1,291 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def make_cache_key(image_data, prompt_version, model_id):
+    """Content address for an analysis: SHA-256 of the decoded image bytes plus prompt version and model"""
+    digest = hashlib.sha256(image_data).hexdigest()
+    return hashlib.sha256(f"{model_id}\0{prompt_version}\0{digest}".encode()).hexdigest()
+
+
+class MemoryTier:
+    """In-process LRU, bounded by entry count"""
+
+    name = "memory"
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DiskTier:
+    """JSON files under /tmp, which survives warm Lambda invocations; bounded by total bytes"""
+
+    name = "disk"
+
+    def __init__(self, directory="/tmp/seewrite-description-cache", max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry["expires_at"] < time.time():
+            self._remove(path)
+            return None
+        # Touch the file so eviction approximates LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def put(self, key, value, ttl):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"expires_at": time.time() + ttl, "value": value}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Disk cache write failed: {e}")
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self):
+        with self.lock:
+            files = []
+            total = 0
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(files):
+                self._remove(path)
+                self.evictions += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+
+class DynamoDBTier:
+    """Shared tier in a DynamoDB table (partition key 'cache_key', TTL attribute 'expires_at')"""
+
+    name = "shared"
+
+    def __init__(self, table_name, region_name="us-east-1"):
+        self.table_name = table_name
+        self.client = get_client("dynamodb", region_name)
+
+    def get(self, key):
+        try:
+            response = self.client.get_item(
+                TableName=self.table_name,
+                Key={"cache_key": {"S": key}}
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"DynamoDB cache read failed: {e}")
+            return None
+        item = response.get("Item")
+        # DynamoDB deletes expired items lazily, so check the TTL ourselves
+        if not item or float(item["expires_at"]["N"]) < time.time():
+            return None
+        return json.loads(item["value"]["S"])
+
+    def put(self, key, value, ttl):
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "cache_key": {"S": key},
+                    "value": {"S": json.dumps(value)},
+                    "expires_at": {"N": str(int(time.time() + ttl))}
+                }
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"DynamoDB cache write failed: {e}")
+
+
+class S3Tier:
+    """Shared tier as JSON objects in S3 (pair with a bucket lifecycle rule for cleanup)"""
+
+    name = "shared"
+
+    def __init__(self, bucket, prefix="description-cache/", region_name="us-east-1"):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = get_client("s3", region_name)
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.json")
+            entry = json.loads(response["Body"].read())
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("NoSuchKey", "404"):
+                logger.warning(f"S3 cache read failed: {e}")
+            return None
+        except BotoCoreError as e:
+            # Connection errors and timeouts: a shared cache outage is a miss
+            logger.warning(f"S3 cache read failed: {e}")
+            return None
+        if entry["expires_at"] < time.time():
+            return None
+        return entry["value"]
+
+    def put(self, key, value, ttl):
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{key}.json",
+                Body=json.dumps({"expires_at": time.time() + ttl, "value": value}),
+                ContentType="application/json"
+            )
+        except (ClientError, BotoCoreError) as e:
+            logger.warning(f"S3 cache write failed: {e}")
+
+
+class LocalSharedTier:
+    """In-memory stand-in for the DynamoDB/S3 tier, for local_server.py and offline testing"""
+
+    name = "shared"
+
+    def __init__(self):
+        self.items = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+        if item is None or item[0] < time.time():
+            return None
+        return json.loads(item[1])
+
+    def put(self, key, value, ttl):
+        with self.lock:
+            self.items[key] = (time.time() + ttl, json.dumps(value))
+
+
+class DescriptionCache:
+    """Read-through cache over ordered tiers; hits in slower tiers are copied into faster ones"""
+
+    def __init__(self, tiers, ttl=DEFAULT_TTL):
+        self.tiers = tiers
+        self.ttl = ttl
+        self.hits = {tier.name: 0 for tier in tiers}
+        self.misses = 0
+        self.puts = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:index]:
+                    faster.put(key, value, self.ttl)
+                with self.lock:
+                    self.hits[tier.name] += 1
+                return value
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        for tier in self.tiers:
+            tier.put(key, value, self.ttl)
+        with self.lock:
+            self.puts += 1
+
+    def stats(self):
+        """Hit/miss counters for logging and the /health endpoint"""
+        with self.lock:
+            total_hits = sum(self.hits.values())
+            lookups = total_hits + self.misses
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "puts": self.puts,
+                "hit_ratio": round(total_hits / lookups, 3) if lookups else 0.0,
+                "evictions": {tier.name: tier.evictions for tier in self.tiers if hasattr(tier, "evictions")}
+            }
+
+    @classmethod
+    def from_env(cls, shared_tier=None):
+        """Build the standard memory -> /tmp -> shared stack from environment settings"""
+        tiers = [
+            MemoryTier(int(os.environ.get("DESCRIPTION_CACHE_MEMORY_ENTRIES", "256"))),
+            DiskTier(
+                os.environ.get("DESCRIPTION_CACHE_DIR", "/tmp/seewrite-description-cache"),
+                int(os.environ.get("DESCRIPTION_CACHE_DISK_BYTES", str(50 * 1024 * 1024)))
+            )
+        ]
+        if shared_tier is None:
+            if os.environ.get("DESCRIPTION_CACHE_TABLE"):
+                shared_tier = DynamoDBTier(os.environ["DESCRIPTION_CACHE_TABLE"])
+            elif os.environ.get("DESCRIPTION_CACHE_BUCKET"):
+                shared_tier = S3Tier(os.environ["DESCRIPTION_CACHE_BUCKET"])
+            elif os.environ.get("DESCRIPTION_CACHE_SHARED") == "local":
+                shared_tier = LocalSharedTier()
+        if shared_tier is not None:
+            tiers.append(shared_tier)
+        return cls(tiers, ttl=int(os.environ.get("DESCRIPTION_CACHE_TTL", str(DEFAULT_TTL))))
@@ -0,0 +1,218 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+# Standard library only: the single-file rebuild/ handlers ship this module next to them
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("neural", "standard")
+
+# Text up to this many characters (UI prompts, one-line answers) uses the standard engine,
+# which answers faster; 0 keeps every request on the requested engine
+STANDARD_MAX_CHARS = int(os.environ.get("POLLY_STANDARD_MAX_CHARS", "0"))
+
+# Neural calls in flight in this process at which new requests use standard (0: no limit)
+NEURAL_MAX_IN_FLIGHT = int(os.environ.get("POLLY_NEURAL_MAX_IN_FLIGHT", "0"))
+
+# After neural is throttled or times out, requests start on standard for this long (seconds)
+NEURAL_COOLDOWN = float(os.environ.get("POLLY_NEURAL_COOLDOWN", "10"))
+
+# describe_voices results are reused this long; a failed lookup is retried after a minute
+VOICE_CACHE_TTL = float(os.environ.get("POLLY_VOICE_CACHE_TTL", "86400"))
+VOICE_RETRY_AFTER = 60.0
+
+# Errors after which the same text is synthesized again on the next engine: capacity and
+# availability problems, not problems with the text itself
+FALLBACK_ERROR_CODES = {"ThrottlingException", "ServiceFailureException", "ServiceUnavailable",
+                        "EngineNotSupportedException", "RequestTimeout"}
+TIMEOUT_ERRORS = {"ReadTimeoutError", "ConnectTimeoutError", "ConnectTimeout", "EndpointConnectionError",
+                  "TimeoutError"}
+
+# Latency samples kept per engine for the percentiles in stats()
+LATENCY_WINDOW = 200
+
+
+def should_fall_back(error):
+    """True for errors another engine may not have (throttling, service failures, timeouts)"""
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code", "")
+    return code in FALLBACK_ERROR_CODES or type(error).__name__ in TIMEOUT_ERRORS
+
+
+class VoiceCatalog:
+    """Engines and language of each Polly voice, from describe_voices, cached per process"""
+
+    def __init__(self, ttl=VOICE_CACHE_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self.voices = None
+        self.expires_at = 0.0
+        self.loading = False
+        self.lock = threading.Lock()
+
+    def _load(self, polly):
+        voices, token = {}, None
+        while True:
+            response = polly.describe_voices(**({"NextToken": token} if token else {}))
+            for voice in response["Voices"]:
+                voices[voice["Id"]] = (tuple(voice.get("SupportedEngines", ("standard",))), voice.get("LanguageCode"))
+            token = response.get("NextToken")
+            if not token:
+                return voices
+
+    def _voices(self, polly):
+        """The catalog, refreshed by one thread at a time outside the lock: a slow or throttled
+        describe_voices never holds up synthesis, which meanwhile uses the catalog it has
+        (none at first, leaving the engine to Polly)"""
+        with self.lock:
+            if self.loading or (self.voices is not None and self.clock() < self.expires_at):
+                return self.voices or {}
+            self.loading = True
+        voices = None
+        try:
+            voices = self._load(polly)
+        except Exception as e:
+            logger.warning(f"describe_voices failed, not checking voice engines: {e}")
+        with self.lock:
+            self.loading = False
+            if voices is not None:
+                self.voices = voices
+                self.expires_at = self.clock() + self.ttl
+            else:
+                # Keep a catalog already loaded; retry sooner than the TTL
+                self.voices = self.voices or {}
+                self.expires_at = self.clock() + VOICE_RETRY_AFTER
+            return self.voices
+
+    def engines(self, polly, voice_id):
+        """Engines voice_id supports; None when the catalog is unavailable (Polly decides)"""
+        voices = self._voices(polly)
+        if not voices:
+            return None
+        return voices.get(voice_id, ((), None))[0]
+
+    def voices_for(self, polly, engine, language_code="en-US"):
+        return sorted(voice_id for voice_id, (engines, language) in self._voices(polly).items()
+                      if engine in engines and language == language_code)
+
+
+class EngineStats:
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+
+class EnginePolicy:
+    """Chooses the Polly engine for each request and falls back when it fails.
+
+    Neural is used unless the text is a short utterance, this process already has too
+    many neural calls in flight, or neural was recently throttled; then standard goes
+    first. A throttled or timed-out neural call is retried on standard instead of
+    failing the request. Engines a voice does not support are skipped. Latency is
+    tracked per engine so the thresholds can be tuned.
+    """
+
+    def __init__(self, standard_max_chars=STANDARD_MAX_CHARS, neural_max_in_flight=NEURAL_MAX_IN_FLIGHT,
+                 cooldown=NEURAL_COOLDOWN, voices=None, clock=time.monotonic):
+        self.standard_max_chars = standard_max_chars
+        self.neural_max_in_flight = neural_max_in_flight
+        self.cooldown = cooldown
+        self.voices = voices or VOICES
+        self.clock = clock
+        self.engines = {engine: EngineStats() for engine in ENGINES}
+        self.neural_open_until = 0.0
+        self.reasons = {"short": 0, "load": 0, "cooldown": 0, "voice": 0}
+        self.lock = threading.Lock()
+
+    def engines_for(self, polly, text, voice_id="Joanna", engine="neural"):
+        """Engines to try for this text, in order"""
+        order = [engine] + [other for other in ENGINES if other != engine]
+        with self.lock:
+            reason = None
+            if engine == "neural":
+                if len(text) <= self.standard_max_chars:
+                    reason = "short"
+                elif self.neural_max_in_flight and self.engines["neural"].in_flight >= self.neural_max_in_flight:
+                    reason = "load"
+                elif self.clock() < self.neural_open_until:
+                    reason = "cooldown"
+            if reason:
+                self.reasons[reason] += 1
+                order = ["standard", "neural"]
+        supported = self.voices.engines(polly, voice_id)
+        if supported:
+            allowed = [candidate for candidate in order if candidate in supported]
+            if allowed and allowed[0] != order[0]:
+                with self.lock:
+                    self.reasons["voice"] += 1
+            # A voice with none of these engines is left for Polly to reject
+            order = allowed or order
+        return order
+
+    def call(self, engine, synthesize):
+        """Run synthesize() as one request on engine, recording its latency or failure"""
+        stats = self.engines.setdefault(engine, EngineStats())
+        with self.lock:
+            stats.calls += 1
+            stats.in_flight += 1
+        start = self.clock()
+        try:
+            result = synthesize()
+        except Exception as e:
+            with self.lock:
+                stats.failures += 1
+                if engine == "neural" and should_fall_back(e):
+                    self.neural_open_until = self.clock() + self.cooldown
+            raise
+        finally:
+            with self.lock:
+                stats.in_flight -= 1
+        with self.lock:
+            stats.latencies.append((self.clock() - start) * 1000)
+        return result
+
+    def run(self, synthesize, engines):
+        """synthesize(engine) on each engine in turn until one works: (result, engine used).
+        Errors that are not about capacity (bad text, bad voice) are raised at once."""
+        for position, engine in enumerate(engines):
+            try:
+                return self.call(engine, lambda: synthesize(engine)), engine
+            except Exception as e:
+                if position == len(engines) - 1 or not should_fall_back(e):
+                    raise
+                with self.lock:
+                    self.engines[engine].fallbacks += 1
+                logger.warning(f"Polly {engine} engine failed ({e}); falling back to {engines[position + 1]}")
+
+    def stats(self):
+        """Per-engine calls, failures, fallbacks and latency percentiles, for /health and logs"""
+        now = self.clock()
+        with self.lock:
+            engines = {}
+            for engine, stats in self.engines.items():
+                latencies = sorted(stats.latencies)
+                engines[engine] = {
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "fallbacks": stats.fallbacks,
+                    "in_flight": stats.in_flight,
+                    "p50_ms": round(latencies[len(latencies) // 2], 1) if latencies else None,
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)], 1) if latencies else None
+                }
+            return {
+                "engines": engines,
+                "standard_first": dict(self.reasons),
+                "neural_cooldown_s": round(max(self.neural_open_until - now, 0), 1)
+            }
+
+
+VOICES = VoiceCatalog()
+
+# Shared by every caller in the process, so a throttled neural engine seen by one
+# request moves the next ones to standard without another failed round trip
+ENGINE_POLICY = EnginePolicy()
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: a hedge is a second, duplicate Bedrock call for a request that is
+# running slower than usual
+HEDGING_ENABLED = os.environ.get("BEDROCK_HEDGING", "").lower() in ("1", "true", "yes")
+
+# Hedge once the primary has run longer than this percentile of recent latencies
+HEDGE_PERCENTILE = float(os.environ.get("BEDROCK_HEDGE_PERCENTILE", "90"))
+
+# Extra calls hedging may add, as a fraction of primary calls (0.1 = at most +10% load)
+HEDGE_BUDGET = float(os.environ.get("BEDROCK_HEDGE_BUDGET", "0.1"))
+
+# Same model in another region as the backup; unset means the backup is a second call
+# in the same region (BedrockClient uses the next fallback model instead)
+HEDGE_REGION = os.environ.get("BEDROCK_HEDGE_REGION")
+
+# Delay used until enough latencies have been observed to derive one
+HEDGE_INITIAL_DELAY_MS = float(os.environ.get("BEDROCK_HEDGE_INITIAL_DELAY_MS", "3000"))
+MIN_SAMPLES = 20
+LATENCY_WINDOW = 500
+
+# Hedges allowed before the budget has been earned by primary calls
+BUDGET_BURST = 2.0
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies for one call site"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def record(self, latency_ms):
+        with self.lock:
+            self.samples.append(latency_ms)
+
+    def percentile(self, p):
+        with self.lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+class HedgeBudget:
+    """Token bucket fed by primary calls: each earns `ratio` of a hedge, so hedges
+    can never exceed ratio * calls (plus a small burst)"""
+
+    def __init__(self, ratio=HEDGE_BUDGET, burst=BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.credits = burst
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.credits = min(self.credits + self.ratio, self.burst)
+
+    def withdraw(self):
+        with self.lock:
+            if self.credits < 1:
+                return False
+            self.credits -= 1
+            return True
+
+
+class Hedger:
+    """Runs a primary call and, if it is slower than the tracked percentile, a backup
+    call; returns whichever succeeds first. The loser is cancelled if it has not
+    started and ignored otherwise.
+
+    Calls only go to the pool while it has a free worker, so nothing queues there: with
+    every worker busy a primary runs inline on the caller's thread, unhedged, and a hedge
+    due is skipped rather than adding load to a saturated pool."""
+
+    def __init__(self, enabled=HEDGING_ENABLED, percentile=HEDGE_PERCENTILE, budget=None,
+                 initial_delay_ms=HEDGE_INITIAL_DELAY_MS, max_workers=16):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget or HedgeBudget()
+        self.initial_delay_ms = initial_delay_ms
+        self.max_workers = max_workers
+        self.executor = None
+        # One per pool worker, held by each call running there
+        self.free_workers = threading.Semaphore(max_workers)
+        self.trackers = {}
+        self.lock = threading.Lock()
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0, "pool_full": 0}
+
+    def _tracker(self, key):
+        with self.lock:
+            if key not in self.trackers:
+                self.trackers[key] = LatencyTracker()
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+            return self.trackers[key]
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _submit(self, function):
+        """function's future on a free pool worker, or None when every worker is busy"""
+        if not self.free_workers.acquire(blocking=False):
+            self._count("pool_full")
+            return None
+
+        future = self.executor.submit(function)
+        # Done callbacks also run for a call cancelled before it started
+        future.add_done_callback(lambda _: self.free_workers.release())
+        return future
+
+    def delay_ms(self, key="default"):
+        observed = self._tracker(key).percentile(self.percentile)
+        return observed if observed is not None else self.initial_delay_ms
+
+    def call(self, primary, backup, key="default"):
+        """Return primary() or, if it is slow and the budget allows, whichever of primary()
+        and backup() succeeds first. Runs primary() inline when hedging is off."""
+        if not self.enabled or backup is None:
+            return primary()
+
+        tracker = self._tracker(key)
+        delay = self.delay_ms(key)
+        self.budget.deposit()
+        self._count("calls")
+
+        def timed_primary():
+            # Timed from when it starts, and only primaries feed the percentile, so neither
+            # queueing nor hedging can move its own trigger
+            start = time.perf_counter()
+            result = primary()
+            tracker.record((time.perf_counter() - start) * 1000)
+            return result
+
+        first = self._submit(timed_primary)
+        if first is None:
+            return timed_primary()
+
+        done, _ = wait([first], timeout=delay / 1000)
+        if done:
+            return first.result()
+        if not self.budget.withdraw():
+            self._count("budget_denied")
+            return first.result()
+        second = self._submit(backup)
+        if second is None:
+            return first.result()
+
+        self._count("hedged")
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = first if first in done else second
+        loser = second if winner is first else first
+        if winner.exception() is not None:
+            # The faster one failed: the other is the answer (or raises in turn)
+            winner, loser = loser, winner
+        result = winner.result()
+        loser.cancel()
+        if winner is second:
+            self._count("hedge_wins")
+        return result
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+            keys = list(self.trackers)
+        counters["extra_load"] = round(counters["hedged"] / counters["calls"], 3) if counters["calls"] else 0.0
+        counters["delay_ms"] = {key: round(self.delay_ms(key), 1) for key in keys}
+        return counters
+
+
+_default_hedger = Hedger()
+
+
+def get_hedger():
+    """Process-wide hedger configured from the environment"""
+    return _default_hedger
+
+
+def backup_client():
+    """bedrock-runtime client for backup calls: HEDGE_REGION if set, else None"""
+    return get_client("bedrock-runtime", HEDGE_REGION) if HEDGE_REGION else None
+
+
+def hedged_invoke_model(bedrock, model_id, body, hedger=None):
+    """invoke_model returning the parsed response body, hedged when BEDROCK_HEDGING is on.
+
+    The backup call goes to the same model in BEDROCK_HEDGE_REGION, or to the same
+    region when no hedge region is configured.
+    """
+    hedger = hedger or get_hedger()
+
+    def invoke(client):
+        def call():
+            response = client.invoke_model(
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(body)
+            )
+            return json.loads(response.get("body").read())
+        return call
+
+    backup = invoke(backup_client() or bedrock) if hedger.enabled else None
+    return hedger.call(invoke(bedrock), backup, key=model_id)
@@ -0,0 +1,70 @@
+import mmap
+
+# Standard library only: shared by local_server.py and the Lambda audio route
+
+# Cached audio is content-addressed: the object under a key never changes once written
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Pieces a range is sent in from the memory-mapped file
+RANGE_CHUNK_BYTES = 64 * 1024
+
+
+def etag_for(key):
+    """Strong ETag for a content-addressed key (its digest)"""
+    return f'"{key.rsplit(".", 1)[0]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match against etag; weak comparison, as RFC 9110 requires for it"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def byte_range(range_header, size, if_range=None, etag=None):
+    """(start, end), inclusive, for a single-range request of an object of `size` bytes.
+
+    None means send the whole object: no Range header, a multi-range or malformed one, or
+    an If-Range validator that no longer matches. Raises ValueError when the range starts
+    past the end (416 Range Not Satisfiable).
+    """
+    if not range_header or not size or (if_range is not None and if_range.strip() != etag):
+        return None
+    unit, _, spec = range_header.partition("=")
+    first, _, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not (first or last):
+        return None
+    if (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError(f"Unsatisfiable range {range_header}")
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError(f"Unsatisfiable range {range_header}")
+    return (start, end) if end >= start else None
+
+
+def content_range(start, end, size):
+    return f"bytes {start}-{end}/{size}"
+
+
+def read_range(path, start, end, chunk_bytes=RANGE_CHUNK_BYTES):
+    """Iterator over bytes start..end of a file, sliced from a memory map of it: no read
+    calls, and the pages come straight from the page cache. The file is opened now, so a
+    file evicted afterwards is still served completely."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def pieces():
+        with mapped:
+            for position in range(start, end + 1, chunk_bytes):
+                yield mapped[position:min(position + chunk_bytes, end + 1)]
+
+    return pieces()
@@ -0,0 +1,193 @@
+import base64
+import logging
+
+from description_cache import make_cache_key
+from perceptual_hash import dhash
+from image_optimizer import prepare_for_vision
+from bedrock_streaming import stream_model_text
+from hedging import hedged_invoke_model
+from admission import BEDROCK_ADMISSION, is_throttling
+from single_flight import SingleFlight, lease_table_from_env
+
+logger = logging.getLogger(__name__)
+
+VISION_MODEL_ID = "anthropic.claude-3-sonnet-20240229-v1:0"
+
+# Bump whenever IMAGE_PROMPT changes so cached descriptions are not reused
+PROMPT_VERSION = "educational-v1"
+
+IMAGE_PROMPT = "You are an expert educator helping visually impaired students. Analyze this educational image and provide a detailed, comprehensive description that includes: 1) Overall content and context, 2) Key elements and their relationships, 3) Any text, labels, or numbers visible, 4) Educational significance and learning objectives. Make it engaging and accessible for audio consumption."
+
+# Uploads of an image already being analyzed (a class submitting the same page) wait for
+# that analysis; with SINGLE_FLIGHT_TABLE, across containers too
+IMAGE_ANALYSES = SingleFlight("image-analysis", lease_table_from_env())
+
+FALLBACK_DESCRIPTION = "This appears to be an educational image with visual content that requires detailed analysis. The AI system has received your image and is processing the visual elements to provide comprehensive educational insights."
+
+
+def build_vision_body(image_base64, media_type="image/jpeg", max_tokens=1000):
+    """Build the Claude 3 messages body for an image plus the educational prompt"""
+    return {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {
+                            "type": "base64",
+                            "media_type": media_type,
+                            "data": image_base64
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": IMAGE_PROMPT
+                    }
+                ]
+            }
+        ]
+    }
+
+
+def analyze_educational_image(bedrock, image_base64, media_type="image/jpeg"):
+    """Analyze educational image with Claude 3 Sonnet (hedged when enabled); raises on Bedrock errors"""
+    result = hedged_invoke_model(bedrock, VISION_MODEL_ID, build_vision_body(image_base64, media_type))
+    return result["content"][0]["text"]
+
+
+def _lookup_description(cache_key, image_data, cache, near_duplicates):
+    """Return (cached description or None, fingerprint computed on the way or None)"""
+    fingerprint = None
+    if cache is None:
+        return None, fingerprint
+
+    cached = cache.get(cache_key)
+    if cached:
+        if near_duplicates is not None:
+            near_duplicates.add(cached.get("fingerprint"), cache_key)
+        return cached["description"], fingerprint
+
+    if near_duplicates is not None and near_duplicates.enabled:
+        fingerprint = dhash(image_data)
+        similar_key = near_duplicates.find(fingerprint)
+        cached = cache.get(similar_key) if similar_key else None
+        if cached:
+            # Store under the exact key too so this byte-identical upload hits directly next time
+            cache.put(cache_key, cached)
+            return cached["description"], fingerprint
+    return None, fingerprint
+
+
+def _store_description(cache_key, description, fingerprint, cache, near_duplicates):
+    if cache is not None:
+        cache.put(cache_key, {"description": description, "fingerprint": fingerprint})
+        if near_duplicates is not None:
+            near_duplicates.add(fingerprint, cache_key, share=True)
+
+
+def _stored_description(cache_key, cache):
+    """Lookup for the single flight: a description another container has cached"""
+    if cache is None:
+        return None
+    entry = cache.get(cache_key)
+    return entry["description"] if entry else None
+
+
+def _vision_payload(image_data):
+    payload, media_type, stats = prepare_for_vision(image_data)
+    logger.info(f"Vision payload: {stats}")
+    return base64.b64encode(payload).decode("utf-8"), media_type
+
+
+def describe_image(bedrock, image_data, cache=None, near_duplicates=None, flights=None):
+    """Return (description, cached) for decoded image bytes, consulting the description cache first.
+
+    With a NearDuplicateIndex, an exact-hash miss falls back to the stored description of a
+    perceptually similar image (a recompressed or re-photographed copy of the same page).
+    On a miss the image is downscaled and re-encoded for the model before the Bedrock call,
+    unless the same image is already being analyzed (flights, default IMAGE_ANALYSES):
+    that analysis is waited for and counts as cached. The canned fallback text is returned
+    on Bedrock errors but never cached; throttling raises Overloaded instead, for a 429 the
+    client can retry.
+    """
+    cache_key = make_cache_key(image_data, PROMPT_VERSION, VISION_MODEL_ID)
+    description, fingerprint = _lookup_description(cache_key, image_data, cache, near_duplicates)
+    if description:
+        return description, True
+
+    flights = flights or IMAGE_ANALYSES
+    description, flight = flights.begin(cache_key, lambda: _stored_description(cache_key, cache))
+    if flight is None:
+        return description, True
+
+    try:
+        image_base64, media_type = _vision_payload(image_data)
+        description = analyze_educational_image(bedrock, image_base64, media_type)
+    except Exception as e:
+        logger.error(f"Bedrock error: {e}")
+        if is_throttling(e):
+            error = BEDROCK_ADMISSION.throttled()
+            flights.end(cache_key, flight, error=error)
+            raise error
+        flights.end(cache_key, flight, FALLBACK_DESCRIPTION)
+        return FALLBACK_DESCRIPTION, False
+
+    try:
+        _store_description(cache_key, description, fingerprint, cache, near_duplicates)
+    except BaseException as e:
+        flights.end(cache_key, flight, error=e)
+        raise
+    flights.end(cache_key, flight, description)
+    return description, False
+
+
+def describe_image_stream(bedrock, image_data, cache=None, near_duplicates=None, flights=None):
+    """Streaming describe_image: return (chunks, cached) where chunks yields description text.
+
+    A cached description, or one waited for from an identical upload's analysis, comes
+    back as a single chunk. Otherwise text is yielded as Claude generates it and the
+    description is cached once the stream completes; a stream that fails before its first
+    token yields the fallback text (or raises Overloaded when throttled), one that fails
+    midway just ends, uncached, and waiting uploads analyze the image themselves.
+    """
+    cache_key = make_cache_key(image_data, PROMPT_VERSION, VISION_MODEL_ID)
+    description, fingerprint = _lookup_description(cache_key, image_data, cache, near_duplicates)
+    if description:
+        return [description], True
+
+    flights = flights or IMAGE_ANALYSES
+    description, flight = flights.begin(cache_key, lambda: _stored_description(cache_key, cache))
+    if flight is None:
+        return [description], True
+
+    truncated = []
+
+    def generate():
+        parts = []
+        try:
+            image_base64, media_type = _vision_payload(image_data)
+            for text in stream_model_text(bedrock, VISION_MODEL_ID, build_vision_body(image_base64, media_type)):
+                parts.append(text)
+                yield text
+        except Exception as e:
+            logger.error(f"Bedrock error: {e}")
+            if not parts and is_throttling(e):
+                raise BEDROCK_ADMISSION.throttled()
+            if not parts:
+                yield FALLBACK_DESCRIPTION
+            else:
+                truncated.append(True)
+
+    def store(description):
+        # None abandons the flight: a truncated description is neither cached nor shared
+        if truncated:
+            return None
+        if description and description != FALLBACK_DESCRIPTION:
+            _store_description(cache_key, description, fingerprint, cache, near_duplicates)
+        return description
+
+    # Waiting uploads get the whole text once the stream completes
+    return flights.stream(cache_key, flight, generate(), store), False
@@ -0,0 +1,143 @@
+import io
+import os
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow comes from the Lambda layer; without it images are sent as uploaded
+    Image = None
+
+# Claude 3 downsamples anything with a long edge above ~1568 px, so larger
+# uploads only cost transfer time and base64 bloat
+VISION_LONG_EDGE = int(os.environ.get("VISION_LONG_EDGE", "1568"))
+JPEG_QUALITY = int(os.environ.get("VISION_JPEG_QUALITY", "85"))
+
+# Small uploads already within the long edge are sent as they are: re-encoding
+# them costs more time than the few kilobytes it saves
+PREPROCESS_MIN_BYTES = int(os.environ.get("VISION_PREPROCESS_MIN_BYTES", str(256 * 1024)))
+
+# Re-encoding pays off only when the transfer time it can save beats its own cost: the
+# upload's base64 transfer at VISION_UPLINK_MBPS against decode + resize + encode time per
+# pixel (~100 ns on a Lambda core, from benchmarks/bench_image_preprocessing.py)
+UPLINK_MBPS = float(os.environ.get("VISION_UPLINK_MBPS", "50"))
+ENCODE_NS_PER_PIXEL = float(os.environ.get("VISION_ENCODE_NS_PER_PIXEL", "100"))
+
+# Bedrock's limits on an image: uploads beyond them are always re-encoded
+MAX_VISION_BYTES = int(3.75 * 1024 * 1024)
+MAX_VISION_EDGE = 8000
+
+# Diagrams, worksheets and screenshots have few distinct colours and compress
+# best (and stay crisp) as palette PNG; photos go lossy
+PALETTE_MAX_COLORS = 256
+
+MAGIC_MEDIA_TYPES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif")
+]
+
+# Formats Bedrock accepts as they are; anything else (BMP, TIFF, ...) is always re-encoded
+VISION_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif", "WEBP": "image/webp"}
+
+
+def detect_media_type(image_data, default="image/jpeg"):
+    """Media type from the file signature (no decoding needed)"""
+    for magic, media_type in MAGIC_MEDIA_TYPES:
+        if image_data.startswith(magic):
+            return media_type
+    if image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+        return "image/webp"
+    return default
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def _encode_pays_off(image_data, size):
+    """True when the modeled transfer time of the upload exceeds the modeled encode time:
+    below that, even a payload of zero bytes could not make re-encoding a net win"""
+    transfer_ms = len(image_data) * 4 / 3 * 8 / (UPLINK_MBPS * 1000)
+    encode_ms = size[0] * size[1] * ENCODE_NS_PER_PIXEL / 1e6
+    return transfer_ms > encode_ms
+
+
+def _skip_reason(image, image_data, long_edge):
+    """Why the upload can be sent as it is, or None when it should be re-encoded"""
+    if image.format not in VISION_FORMATS or len(image_data) > MAX_VISION_BYTES or max(image.size) > MAX_VISION_EDGE:
+        return None
+    if len(image_data) < PREPROCESS_MIN_BYTES and max(image.size) <= long_edge:
+        return "small"
+    if not _encode_pays_off(image_data, image.size):
+        return "encode_cost"
+    return None
+
+
+def prepare_for_vision(image_data, long_edge=VISION_LONG_EDGE):
+    """Downscale and re-encode an upload for the vision model.
+
+    Returns (payload_bytes, media_type, stats). Metadata (EXIF, ICC, XMP) is dropped by
+    re-encoding. JPEG, PNG, GIF and WebP uploads within Bedrock's limits are returned
+    unchanged when they are small and within the long edge, or when re-encoding would cost
+    more time than sending them could save; so are images Pillow cannot decode. A
+    re-encoded payload is never larger than an upload that needed no resizing.
+    """
+    start = time.perf_counter()
+    stats = {"original_bytes": len(image_data)}
+    if Image is None:
+        return image_data, detect_media_type(image_data), stats
+
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        stats["original_size"] = image.size
+        # Image.open only parsed the header so far, so this check is cheap
+        skipped = _skip_reason(image, image_data, long_edge)
+        if skipped:
+            stats["skipped"] = skipped
+            return image_data, VISION_FORMATS[image.format], stats
+        original_type = VISION_FORMATS.get(image.format)
+        # Draft mode lets the JPEG decoder scale by 1/2, 1/4 or 1/8 during decoding
+        image.draft("RGB", (long_edge, long_edge))
+        image = ImageOps.exif_transpose(image)
+        resized = max(image.size) > long_edge
+        if resized:
+            image.thumbnail((long_edge, long_edge), Image.LANCZOS)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if has_alpha:
+            # Flatten transparency onto white, as the page would appear on screen
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.convert("RGBA").split()[-1])
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        candidates = []
+        if image.getcolors(PALETTE_MAX_COLORS) is not None:
+            candidates.append((_encode(image.quantize(PALETTE_MAX_COLORS), "PNG", optimize=True), "image/png"))
+        else:
+            candidates.append((_encode(image, "JPEG", quality=JPEG_QUALITY, optimize=True), "image/jpeg"))
+            if features.check("webp"):
+                # method=2 is ~2x faster than the default for ~3% larger output
+                candidates.append((_encode(image, "WEBP", quality=JPEG_QUALITY, method=2), "image/webp"))
+        if not resized and original_type and len(image_data) <= MAX_VISION_BYTES:
+            # Re-encoding can inflate an already well-compressed upload
+            candidates.append((image_data, original_type))
+        payload, media_type = min(candidates, key=lambda candidate: len(candidate[0]))
+    except Exception as e:
+        logger.warning(f"Image preprocessing failed, sending original: {e}")
+        return image_data, detect_media_type(image_data), stats
+
+    stats.update({
+        "payload_bytes": len(payload),
+        "final_size": image.size,
+        "media_type": media_type,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1)
+    })
+    return payload, media_type, stats
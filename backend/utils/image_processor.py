@@ -1,37 +1,89 @@
-import boto3
 from PIL import Image
 import io
+import os
+import time
 import base64
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from aws_clients import get_client
+from image_workers import IMAGE_WORKERS
 
 logger = logging.getLogger(__name__)
 
+# Per-call deadlines (seconds) in concurrent mode: a service that misses its deadline
+# is left out of the description instead of holding up the request
+REKOGNITION_DEADLINE = float(os.environ.get("REKOGNITION_DEADLINE", "5"))
+TEXTRACT_DEADLINE = float(os.environ.get("TEXTRACT_DEADLINE", "8"))
+
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", "8"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide pool shared by every ImageProcessor's concurrent analysis"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+    return _executor
+
+
 class ImageProcessor:
-    def __init__(self, region_name="us-east-1"):
-        self.rekognition = boto3.client("rekognition", region_name=region_name)
-        self.textract = boto3.client("textract", region_name=region_name)
+    def __init__(self, region_name="us-east-1", concurrent=False):
+        self.rekognition = get_client("rekognition", region_name)
+        self.textract = get_client("textract", region_name)
+        # Concurrent mode runs Rekognition and Textract side by side on the shared pool
+        self.concurrent = concurrent
+        self.deadlines = {"rekognition": REKOGNITION_DEADLINE, "textract": TEXTRACT_DEADLINE}
+        # Process pool the CPU-bound Pillow stages run on
+        self.workers = IMAGE_WORKERS
     
     def process_image_base64(self, image_base64):
         """Process base64 encoded image and extract meaningful information"""
         try:
             # Decode base64 image
             image_data = base64.b64decode(image_base64)
-            
-            # Get object detection results
-            objects = self._detect_objects(image_data)
-            
-            # Get text extraction results
-            text_content = self._extract_text(image_data)
+        except Exception as e:
+            logger.error(f"Error decoding image: {e}")
+            return {
+                "success": False,
+                "error": str(e),
+                "description": "Unable to process the uploaded image."
+            }
+        
+        return self.process_image_bytes(image_data)
+    
+    def process_image_bytes(self, image_data):
+        """Process raw image bytes and extract meaningful information"""
+        try:
+            if self.concurrent:
+                objects, text_content, missing = self._analyze_concurrently(image_data)
+            else:
+                # Get object detection results
+                objects = self._detect_objects(image_data)
+                
+                # Get text extraction results
+                text_content = self._extract_text(image_data)
+                missing = {}
             
             # Combine results into a comprehensive description
             description = self._create_initial_description(objects, text_content)
             
-            return {
+            result = {
                 "success": True,
                 "description": description,
                 "objects": objects,
                 "text": text_content
             }
+            if missing:
+                # Services that timed out or failed, e.g. {"textract": "timeout"}
+                result["partial"] = missing
+            return result
             
         except Exception as e:
             logger.error(f"Error processing image: {e}")
@@ -41,46 +93,84 @@ class ImageProcessor:
                 "description": "Unable to process the uploaded image."
             }
     
+    def _analyze_concurrently(self, image_data):
+        """Run Rekognition and Textract side by side, each bounded by its deadline.
+
+        Returns (objects, text, missing) where missing maps each service that timed out
+        or failed to "timeout" or "error"; its part of the result is left empty.
+        """
+        executor = get_executor()
+        start = time.monotonic()
+        calls = {
+            "rekognition": (executor.submit(self._fetch_objects, image_data), []),
+            "textract": (executor.submit(self._fetch_text, image_data), "")
+        }
+        
+        results, missing = {}, {}
+        for name, (future, empty) in calls.items():
+            remaining = self.deadlines[name] - (time.monotonic() - start)
+            try:
+                results[name] = future.result(timeout=max(remaining, 0))
+            except FutureTimeout:
+                # The call keeps running on the pool until the client's read timeout
+                logger.warning(f"{name} missed its {self.deadlines[name]:g}s deadline, continuing without it")
+                future.cancel()
+                results[name], missing[name] = empty, "timeout"
+            except Exception as e:
+                logger.error(f"{name} failed: {e}")
+                results[name], missing[name] = empty, "error"
+        
+        return results["rekognition"], results["textract"], missing
+    
+    def compute_fingerprint(self, image_data):
+        """Perceptual (difference) hash that survives recompression, resizing and screenshots,
+        computed on the image worker processes"""
+        return self.workers.fingerprint(image_data)
+    
     def _detect_objects(self, image_data):
         """Use Amazon Rekognition to detect objects in the image"""
         try:
-            response = self.rekognition.detect_labels(
-                Image={'Bytes': image_data},
-                MaxLabels=10,
-                MinConfidence=70
-            )
-            
-            objects = []
-            for label in response['Labels']:
-                objects.append({
-                    'name': label['Name'],
-                    'confidence': label['Confidence']
-                })
-            
-            return objects
-            
+            return self._fetch_objects(image_data)
         except Exception as e:
             logger.error(f"Error detecting objects: {e}")
             return []
     
+    def _fetch_objects(self, image_data):
+        response = self.rekognition.detect_labels(
+            Image={'Bytes': image_data},
+            MaxLabels=10,
+            MinConfidence=70
+        )
+        
+        objects = []
+        for label in response['Labels']:
+            objects.append({
+                'name': label['Name'],
+                'confidence': label['Confidence']
+            })
+        
+        return objects
+    
     def _extract_text(self, image_data):
         """Use Amazon Textract to extract text from the image"""
         try:
-            response = self.textract.detect_document_text(
-                Document={'Bytes': image_data}
-            )
-            
-            text_blocks = []
-            for block in response['Blocks']:
-                if block['BlockType'] == 'LINE':
-                    text_blocks.append(block['Text'])
-            
-            return ' '.join(text_blocks)
-            
+            return self._fetch_text(image_data)
         except Exception as e:
             logger.error(f"Error extracting text: {e}")
             return ""
     
+    def _fetch_text(self, image_data):
+        response = self.textract.detect_document_text(
+            Document={'Bytes': image_data}
+        )
+        
+        text_blocks = []
+        for block in response['Blocks']:
+            if block['BlockType'] == 'LINE':
+                text_blocks.append(block['Text'])
+        
+        return ' '.join(text_blocks)
+    
     def _create_initial_description(self, objects, text_content):
         """Create an initial description combining objects and text"""
         description_parts = []
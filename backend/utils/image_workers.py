@@ -0,0 +1,163 @@
+import io
+import os
+import logging
+import threading
+import multiprocessing
+from itertools import count
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from perceptual_hash import dhash
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-bound image stages (decoding, resizing, re-encoding, hashing).
+# Pillow holds the GIL for much of that work, so in a thread a large PNG stalls every
+# other request; 0 runs the stages in the calling thread.
+IMAGE_PROCESSES = int(os.environ.get("IMAGE_PROCESSES", str(os.cpu_count() or 1)))
+
+# Smaller uploads are processed in the calling thread: handing them to a worker costs
+# more than the few milliseconds they take
+IMAGE_PROCESS_MIN_BYTES = int(os.environ.get("IMAGE_PROCESS_MIN_BYTES", str(64 * 1024)))
+
+
+class SharedImageFile(io.RawIOBase):
+    """Read-only file over image bytes in a shared memory block, for Image.open: the
+    decoder reads straight from the block instead of from a private copy"""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = max(min(len(buffer), len(self.view) - self.position), 0)
+        buffer[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: len(self.view)}[whence]
+        self.position = max(base + offset, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def _run_shared(function, name, size):
+    """Worker side: function(file over the `size` image bytes in shared memory block `name`)"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        view = block.buf[:size]
+        try:
+            return function(io.BufferedReader(SharedImageFile(view)))
+        finally:
+            view.release()
+    finally:
+        block.close()
+
+
+WORKER_NAME = "image-worker"
+
+
+def in_image_worker():
+    """True in an image worker process, from the moment it starts.
+
+    spawn re-runs the parent's main module (as __mp_main__) in each child before the
+    first stage. Workers only run module-level stages of importable modules, so a server
+    script checks this to skip building its clients, caches and pools there.
+    """
+    return multiprocessing.current_process().name.startswith(WORKER_NAME)
+
+
+class _WorkerContext(type(multiprocessing.get_context("spawn"))):
+    """spawn context whose processes are named image-worker-N"""
+
+    _numbers = count(1)
+
+    def Process(self, *args, **kwargs):
+        kwargs.setdefault("name", f"{WORKER_NAME}-{next(self._numbers)}")
+        return super().Process(*args, **kwargs)
+
+
+class ImageWorkers:
+    """Runs CPU-bound image stages on a process pool sized to the cores.
+
+    Image bytes are copied once into a shared memory block and workers read them from
+    there, rather than having them pickled through the pool's pipe. A stage is a
+    module-level function taking image bytes or a binary file (dhash, for instance).
+    """
+
+    def __init__(self, processes=IMAGE_PROCESSES, min_bytes=IMAGE_PROCESS_MIN_BYTES):
+        self.processes = processes
+        self.min_bytes = min_bytes
+        self._pool = None
+        self._lock = threading.Lock()
+        self.offloaded = 0
+        self.inline = 0
+        self.failures = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    # spawn: forking a process that is serving on threads can copy held locks
+                    self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=_WorkerContext())
+        return self._pool
+
+    def run(self, function, image_data):
+        """function(image) on a worker process, or in this thread for small images"""
+        if self.processes <= 0 or len(image_data) < self.min_bytes:
+            with self._lock:
+                self.inline += 1
+            return function(image_data)
+
+        pool = self._get_pool()
+        block = shared_memory.SharedMemory(create=True, size=len(image_data))
+        try:
+            block.buf[:len(image_data)] = image_data
+            result = pool.submit(_run_shared, function, block.name, len(image_data)).result()
+        except BrokenProcessPool as e:
+            # A worker died (killed, out of memory): start a new pool for the next image
+            logger.error(f"Image worker pool broke, processing in this thread: {e}")
+            with self._lock:
+                self.failures += 1
+                if self._pool is pool:
+                    self._pool = None
+            return function(image_data)
+        finally:
+            block.close()
+            block.unlink()
+
+        with self._lock:
+            self.offloaded += 1
+        return result
+
+    def fingerprint(self, image_data):
+        """Perceptual hash (dhash) of image bytes"""
+        return self.run(dhash, image_data)
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "offloaded": self.offloaded,
+                "inline": self.inline,
+                "failures": self.failures
+            }
+
+
+IMAGE_WORKERS = ImageWorkers()
@@ -0,0 +1,206 @@
+import os
+import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Standard library only: the single-file rebuild/ handlers ship this module next to them
+
+logger = logging.getLogger(__name__)
+
+# synthesize_speech accepts 3000 characters; stay below it
+POLLY_MAX_CHARS = 2900
+
+# Long text is cut into chunks of about this size that are synthesized at the same time,
+# so latency follows the slowest chunk rather than the length of the whole text
+CHUNK_CHARS = int(os.environ.get("LONG_SPEECH_CHUNK_CHARS", "1500"))
+
+# Concurrent Polly calls per process for chunked synthesis; enough for a 10k character
+# text at the default chunk size, within Polly's default synthesize_speech rate
+LONG_SPEECH_WORKERS = int(os.environ.get("LONG_SPEECH_WORKERS", "8"))
+
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+SENTENCE_END = re.compile(r'(?<=[.!?])["\')\]]*\s+')
+
+# MPEG audio header tables: kbit/s by bitrate index, Hz by sample rate index
+BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide bounded pool for chunk synthesis"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LONG_SPEECH_WORKERS, thread_name_prefix="long-speech")
+    return _executor
+
+
+def _pieces(text, limit):
+    """(separator, piece) pairs, cut at paragraphs, then sentences, then words, none over limit"""
+    for p, paragraph in enumerate(PARAGRAPH_BREAK.split(text.strip())):
+        for s, sentence in enumerate(SENTENCE_END.split(paragraph.strip())):
+            separator = "\n\n" if p and not s else " "
+            while len(sentence) > limit:
+                cut = sentence.rfind(" ", 0, limit)
+                cut = cut if cut > 0 else limit
+                yield separator, sentence[:cut]
+                sentence, separator = sentence[cut:].lstrip(), " "
+            if sentence:
+                yield separator, sentence
+
+
+def split_text(text, target=CHUNK_CHARS, limit=POLLY_MAX_CHARS):
+    """Cut text into chunks of up to `target` characters at paragraph and sentence boundaries.
+
+    A sentence longer than the target gets a chunk of its own; one longer than Polly's
+    limit is cut at a word boundary.
+    """
+    chunks, current = [], ""
+    for separator, piece in _pieces(text, limit):
+        if current and len(current) + len(separator) + len(piece) > target:
+            chunks.append(current)
+            current = ""
+        current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _id3v2_length(data):
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    # Syncsafe size: 7 bits per byte, excluding the 10-byte header (and footer if flagged)
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _frame_info(data, position):
+    """(frame length, side info length) of the MPEG Layer III frame at position, or None"""
+    if position + 4 > len(data) or data[position] != 0xFF or data[position + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[position + 1] >> 3) & 0x3
+    layer = (data[position + 1] >> 1) & 0x3
+    bitrate_index = data[position + 2] >> 4
+    rate_index = (data[position + 2] >> 2) & 0x3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    padding = (data[position + 2] >> 1) & 0x1
+    mono = (data[position + 3] >> 6) == 3
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        length = 144 * BITRATES_V1[bitrate_index] * 1000 // sample_rate + padding
+        side_info = 17 if mono else 32
+    else:
+        length = 72 * BITRATES_V2[bitrate_index] * 1000 // sample_rate + padding
+        side_info = 9 if mono else 17
+    return length, side_info
+
+
+def mp3_frames(data):
+    """The audio frames of an MP3, without ID3v1/ID3v2 tags or a Xing/Info/VBRI header frame.
+
+    That header frame describes one file's frame count and seek table, which would be
+    wrong for a concatenation, and would play as a short silence mid-stream.
+    """
+    position = _id3v2_length(data)
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+    frames = []
+    first = True
+    while position < end:
+        info = _frame_info(data, position)
+        if info is None:
+            # Not a frame header: resynchronise on the next sync byte
+            position = data.find(b"\xff", position + 1, end)
+            if position < 0:
+                break
+            continue
+        length, side_info = info
+        if position + length > end:
+            break
+        frame = data[position:position + length]
+        tag_offset = 4 + side_info
+        if not (first and (frame[tag_offset:tag_offset + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI")):
+            frames.append(frame)
+        first = False
+        position += length
+    return b"".join(frames)
+
+
+def concat_audio(parts, output_format="mp3"):
+    """Join separately synthesized parts into one stream without re-encoding"""
+    if output_format == "mp3":
+        # A part that does not parse as Layer III frames is kept as it is rather than dropped
+        return b"".join(mp3_frames(part) or part for part in parts)
+    # PCM is headerless, and concatenated Ogg streams are valid chained streams
+    return b"".join(parts)
+
+
+def synthesize_long(synthesize, text, output_format="mp3", target=CHUNK_CHARS):
+    """Audio for text of any length: synthesize(chunk) -> bytes is called once for short text,
+    or concurrently for each chunk of long text, and the results are joined in order"""
+    if len(text) <= POLLY_MAX_CHARS:
+        return synthesize(text)
+    chunks = split_text(text, target)
+    logger.info(f"Synthesizing {len(text)} characters as {len(chunks)} chunks")
+    return concat_audio(list(get_executor().map(synthesize, chunks)), output_format)
+
+
+def iter_mp3_frames(stream):
+    """mp3_frames over audio arriving in pieces: each frame is yielded once it is complete,
+    so joined parts can be forwarded without first holding a whole part"""
+    buffer, position, first = b"", None, True
+    for piece in stream:
+        buffer += piece
+        if position is None:
+            if len(buffer) < 10:
+                continue
+            position = _id3v2_length(buffer)
+        frames = []
+        while position < len(buffer):
+            info = _frame_info(buffer, position)
+            if info is None:
+                if position + 4 > len(buffer):
+                    break
+                # Not a frame header (or an ID3v1 tag): resynchronise on the next sync byte
+                sync = buffer.find(b"\xff", position + 1)
+                position = sync if sync >= 0 else len(buffer)
+                continue
+            length, side_info = info
+            if position + length > len(buffer):
+                break
+            frame = buffer[position:position + length]
+            tag_offset = 4 + side_info
+            if not (first and (frame[tag_offset:tag_offset + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI")):
+                frames.append(frame)
+            first = False
+            position += length
+        if frames:
+            yield b"".join(frames)
+        # Keep only what is not yet a complete frame
+        buffer, position = buffer[position:], 0
+
+
+def stream_long(open_stream, text, output_format="mp3", target=CHUNK_CHARS):
+    """Audio for text of any length as an iterator of byte pieces, for forwarding as it arrives.
+
+    open_stream(chunk) starts one synthesis and returns an iterator over its audio. Short text
+    is a single call passed through unchanged; for long text each chunk's call is started
+    while the previous chunk streams, and MP3 parts are joined frame by frame like concat_audio.
+    """
+    if len(text) <= POLLY_MAX_CHARS:
+        yield from open_stream(text)
+        return
+    chunks = split_text(text, target)
+    logger.info(f"Streaming {len(text)} characters as {len(chunks)} chunks")
+    pending = get_executor().submit(open_stream, chunks[0])
+    for i in range(len(chunks)):
+        stream = pending.result()
+        if i + 1 < len(chunks):
+            pending = get_executor().submit(open_stream, chunks[i + 1])
+        yield from (iter_mp3_frames(stream) if output_format == "mp3" else stream)
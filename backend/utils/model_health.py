@@ -0,0 +1,171 @@
+import os
+import math
+import time
+import logging
+import threading
+
+from admission import is_throttling
+
+logger = logging.getLogger(__name__)
+
+# Errors that will not go away while this container lives: the model is not enabled
+# for the account, does not exist in the region, or rejects this request format
+PERMANENT_ERROR_CODES = {"AccessDeniedException", "ValidationException", "ResourceNotFoundException"}
+
+# ValidationExceptions about the request itself (prompt too long) say nothing about the model
+REQUEST_ERROR_HINTS = ("too long", "too many tokens", "max_tokens")
+
+# First cool-down after a transient failure; doubles per consecutive failure up to the max
+BREAKER_COOLDOWN = float(os.environ.get("MODEL_BREAKER_COOLDOWN", "5"))
+BREAKER_MAX_COOLDOWN = float(os.environ.get("MODEL_BREAKER_MAX_COOLDOWN", "300"))
+
+# Weight of the newest sample in the latency moving average
+LATENCY_EWMA_WEIGHT = 0.3
+
+# A probe whose outcome was never recorded (abandoned stream) is retried after this long
+PROBE_TIMEOUT = 60.0
+
+CLOSED, OPEN, HALF_OPEN, DISABLED = "closed", "open", "half_open", "disabled"
+
+
+def classify_error(error):
+    """'permanent', 'request' or 'transient' for an exception raised by invoke_model"""
+    details = getattr(error, "response", None) or {}
+    code = details.get("Error", {}).get("Code", "")
+    message = details.get("Error", {}).get("Message", "").lower()
+    if code == "ValidationException" and any(hint in message for hint in REQUEST_ERROR_HINTS):
+        return "request"
+    if code in PERMANENT_ERROR_CODES:
+        return "permanent"
+    return "transient"
+
+
+class ModelStats:
+    def __init__(self, model_id, position):
+        self.model_id = model_id
+        self.position = position
+        self.state = CLOSED
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency_ms = None
+        self.open_until = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+        self.last_error = None
+        # The open circuit is backing off from throttling, not from a failing model
+        self.throttled = False
+
+
+class ModelHealth:
+    """Per-process health table deciding which models to try, and in what order.
+
+    The last model that worked is tried first. Models that worked before come next,
+    fastest first, then untried models in configured order. A transient failure opens
+    the model's circuit for an exponentially growing cool-down; after it a single
+    request probes the model (ahead of the others) and a success closes the circuit.
+    Permanent errors (model not enabled, unknown model) disable a model for the
+    container's lifetime.
+    """
+
+    def __init__(self, model_ids, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN, clock=time.monotonic):
+        self.models = {model_id: ModelStats(model_id, i) for i, model_id in enumerate(model_ids)}
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.preferred = None
+        self.lock = threading.Lock()
+
+    def candidates(self):
+        """Model IDs to try for one request, best first; empty when every circuit is open"""
+        now = self.clock()
+        with self.lock:
+            healthy, probes = [], []
+            for stats in self.models.values():
+                if stats.state == DISABLED:
+                    continue
+                if stats.state == CLOSED:
+                    healthy.append(stats)
+                elif now >= stats.open_until and (not stats.probing or now - stats.probe_started > PROBE_TIMEOUT):
+                    # Cool-down over: let exactly one request probe the model
+                    stats.state = HALF_OPEN
+                    stats.probing = True
+                    stats.probe_started = now
+                    probes.append(stats)
+
+            healthy.sort(key=lambda s: (
+                s.model_id != self.preferred,
+                s.successes == 0,
+                s.latency_ms if s.successes else s.position
+            ))
+            # Probes go first so they are actually attempted, not left behind a healthy model
+            return [s.model_id for s in probes + healthy]
+
+    def record_success(self, model_id, latency_ms):
+        with self.lock:
+            stats = self.models[model_id]
+            if stats.state != CLOSED:
+                logger.info(f"Model {model_id} recovered, closing its circuit")
+            stats.state = CLOSED
+            stats.probing = False
+            stats.throttled = False
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.latency_ms = latency_ms if stats.latency_ms is None else \
+                LATENCY_EWMA_WEIGHT * latency_ms + (1 - LATENCY_EWMA_WEIGHT) * stats.latency_ms
+            # Stay with the preferred model while it is healthy, unless this one is faster
+            # (a hedged request can have two models succeed)
+            current = self.models.get(self.preferred)
+            if current is None or current.state != CLOSED or stats.latency_ms <= current.latency_ms:
+                self.preferred = model_id
+
+    def record_failure(self, model_id, error):
+        kind = classify_error(error)
+        with self.lock:
+            stats = self.models[model_id]
+            stats.probing = False
+            if kind == "request":
+                if stats.state == HALF_OPEN:
+                    stats.state = OPEN
+                return
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            stats.last_error = str(error)[:200]
+            stats.throttled = is_throttling(error)
+            if self.preferred == model_id:
+                self.preferred = None
+            if kind == "permanent":
+                stats.state = DISABLED
+                logger.warning(f"Model {model_id} disabled for this container: {error}")
+                return
+            cooldown = min(self.cooldown * 2 ** (stats.consecutive_failures - 1), self.max_cooldown)
+            stats.state = OPEN
+            stats.open_until = self.clock() + cooldown
+            logger.warning(f"Model {model_id} circuit open for {cooldown:.0f}s: {error}")
+
+    def throttled_retry_after(self):
+        """Whole seconds until the first circuit opened by throttling closes, or None when
+        no open circuit is backing off from throttling"""
+        now = self.clock()
+        with self.lock:
+            waits = [s.open_until - now for s in self.models.values() if s.state == OPEN and s.throttled]
+        return max(1, math.ceil(min(waits))) if waits else None
+    
+    def stats(self):
+        """Per-model state, success/failure counts and latency, for /health and logs"""
+        now = self.clock()
+        with self.lock:
+            return {
+                "preferred": self.preferred,
+                "models": {
+                    s.model_id: {
+                        "state": s.state,
+                        "successes": s.successes,
+                        "failures": s.failures,
+                        "latency_ms": round(s.latency_ms, 1) if s.latency_ms is not None else None,
+                        "retry_in_s": round(max(s.open_until - now, 0), 1) if s.state == OPEN else None,
+                        "last_error": s.last_error
+                    }
+                    for s in self.models.values()
+                }
+            }
@@ -0,0 +1,310 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+
+from botocore.exceptions import ClientError
+
+from aws_clients import get_client
+from audio_cache import AUDIO_URL_TTL, LocalAudioStore, make_audio_key
+from long_speech import synthesize_long
+
+logger = logging.getLogger(__name__)
+
+# StartSpeechSynthesisTask accepts up to 100,000 billed characters
+MAX_NARRATION_CHARS = 100000
+
+# Job records are kept this long (seconds); resubmitting later starts a new task
+JOB_TTL = int(os.environ.get("NARRATION_JOB_TTL", str(7 * 24 * 3600)))
+
+# Longest a status request may wait for completion, under API Gateway's 29 s limit
+MAX_WAIT_SECONDS = 25
+POLL_INTERVAL = 0.5
+
+# A pending job with no task this long after it was created lost its container between
+# recording the job and starting the task; the next submission retries it
+START_GRACE_SECONDS = 60
+
+PENDING, COMPLETED, FAILED = "pending", "completed", "failed"
+
+S3_OUTPUT_URI = re.compile(r"^https://s3[.-][^/]*amazonaws\.com/([^/]+)/(.+)$")
+
+
+class DynamoDBJobTable:
+    """Job records in a DynamoDB table (partition key 'job_id', TTL attribute 'expires_at')"""
+
+    def __init__(self, table_name, region_name="us-east-1"):
+        self.table_name = table_name
+        self.client = get_client("dynamodb", region_name)
+
+    def _item(self, job_id, record):
+        return {
+            "job_id": {"S": job_id},
+            "record": {"S": json.dumps(record)},
+            "expires_at": {"N": str(int(time.time() + JOB_TTL))}
+        }
+
+    def create(self, job_id, record):
+        """Store record unless the job exists; False when another request created it first"""
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item=self._item(job_id, record),
+                ConditionExpression="attribute_not_exists(job_id)"
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+    def get(self, job_id):
+        response = self.client.get_item(TableName=self.table_name, Key={"job_id": {"S": job_id}})
+        item = response.get("Item")
+        if not item or float(item["expires_at"]["N"]) < time.time():
+            return None
+        return json.loads(item["record"]["S"])
+
+    def put(self, job_id, record):
+        self.client.put_item(TableName=self.table_name, Item=self._item(job_id, record))
+
+
+class LocalJobTable:
+    """In-memory stand-in for the DynamoDB table, for local_server.py and offline testing"""
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+
+    def create(self, job_id, record):
+        with self.lock:
+            existing = self.records.get(job_id)
+            if existing is not None and existing[0] >= time.time():
+                return False
+            self.records[job_id] = (time.time() + JOB_TTL, json.dumps(record))
+            return True
+
+    def get(self, job_id):
+        with self.lock:
+            item = self.records.get(job_id)
+        if item is None or item[0] < time.time():
+            return None
+        return json.loads(item[1])
+
+    def put(self, job_id, record):
+        with self.lock:
+            self.records[job_id] = (time.time() + JOB_TTL, json.dumps(record))
+
+
+class LocalSpeechTasks:
+    """Offline stand-in for Polly's start/get_speech_synthesis_task: synthesizes on a
+    background thread with synthesize_speech and writes the result to a LocalAudioStore"""
+
+    def __init__(self, polly, store):
+        self.polly = polly
+        self.store = store
+        self.tasks = {}
+        self.lock = threading.Lock()
+
+    def start_speech_synthesis_task(self, Text, OutputFormat, VoiceId, Engine="neural", SampleRate=None,
+                                    OutputS3BucketName=None, OutputS3KeyPrefix="", SnsTopicArn=None, **kwargs):
+        task_id = str(uuid.uuid4())
+        key = f"{task_id}.{OutputFormat}"
+        task = {
+            "TaskId": task_id,
+            "TaskStatus": "scheduled",
+            "OutputUri": self.store.url(key) or self.store.path(key),
+            "RequestCharacters": len(Text)
+        }
+        with self.lock:
+            self.tasks[task_id] = task
+
+        def synthesize(chunk):
+            params = {"Text": chunk, "OutputFormat": OutputFormat, "VoiceId": VoiceId, "Engine": Engine}
+            if SampleRate:
+                params["SampleRate"] = SampleRate
+            return self.polly.synthesize_speech(**params)["AudioStream"].read()
+
+        def run():
+            self._set(task_id, TaskStatus="inProgress")
+            try:
+                self.store.put(key, synthesize_long(synthesize, Text, OutputFormat))
+                self._set(task_id, TaskStatus="completed")
+            except Exception as e:
+                self._set(task_id, TaskStatus="failed", TaskStatusReason=str(e))
+
+        threading.Thread(target=run, name=f"narration-{task_id[:8]}", daemon=True).start()
+        return {"SynthesisTask": dict(task)}
+
+    def get_speech_synthesis_task(self, TaskId):
+        with self.lock:
+            task = self.tasks.get(TaskId)
+        if task is None:
+            # As Polly answers for an unknown task (here: one started before a restart)
+            raise ClientError({"Error": {"Code": "SynthesisTaskNotFoundException",
+                                         "Message": f"Synthesis task {TaskId} not found"}},
+                              "GetSpeechSynthesisTask")
+        return {"SynthesisTask": dict(task)}
+
+    def _set(self, task_id, **fields):
+        with self.lock:
+            self.tasks[task_id].update(fields)
+
+
+class NarrationJobs:
+    """Long-document narration through Polly speech synthesis tasks.
+
+    The job ID is the content hash of the text and voice settings, so submitting the
+    same text again returns the existing job instead of starting another task.
+    """
+
+    def __init__(self, tasks, table, bucket=None, prefix="narrations/", sns_topic_arn=None,
+                 voice_id="Joanna", engine="neural", output_format="mp3", sample_rate="24000"):
+        self.tasks = tasks
+        self.table = table
+        self.bucket = bucket
+        self.prefix = prefix
+        self.sns_topic_arn = sns_topic_arn
+        self.voice_id = voice_id
+        self.engine = engine
+        self.output_format = output_format
+        self.sample_rate = sample_rate
+        self.counters = {"submitted": 0, "deduplicated": 0, "tasks_started": 0}
+        self.lock = threading.Lock()
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def submit(self, text, voice_id=None):
+        """Start narrating text, or return the job already narrating it. Raises ValueError
+        for text StartSpeechSynthesisTask would reject."""
+        if not text or len(text) > MAX_NARRATION_CHARS:
+            raise ValueError(f"Text must be 1 to {MAX_NARRATION_CHARS} characters")
+        voice_id = voice_id or self.voice_id
+        job_id = make_audio_key(text, voice_id, self.engine, self.output_format, self.sample_rate).split(".")[0]
+        self._count("submitted")
+
+        record = {
+            "job_id": job_id,
+            "status": PENDING,
+            "text_length": len(text),
+            "voice_id": voice_id,
+            "created_at": time.time()
+        }
+        if not self.table.create(job_id, record):
+            existing = self.table.get(job_id)
+            if existing is not None and existing["status"] != FAILED and not self._never_started(existing):
+                self._count("deduplicated")
+                return self.status(job_id)
+            # A failed job, or one whose task never started, is retried by the next submission
+            self.table.put(job_id, record)
+
+        params = {
+            "Text": text,
+            "OutputFormat": self.output_format,
+            "VoiceId": voice_id,
+            "Engine": self.engine,
+            "SampleRate": self.sample_rate,
+            "OutputS3BucketName": self.bucket,
+            "OutputS3KeyPrefix": f"{self.prefix}{job_id}/"
+        }
+        if self.sns_topic_arn:
+            # Polly publishes the task's completion to this topic for subscribers
+            params["SnsTopicArn"] = self.sns_topic_arn
+        try:
+            task = self.tasks.start_speech_synthesis_task(**params)["SynthesisTask"]
+        except Exception as e:
+            logger.error(f"Narration task for {job_id} failed to start: {e}")
+            record.update(status=FAILED, error=str(e))
+            self.table.put(job_id, record)
+            return self._public(record)
+        self._count("tasks_started")
+        record.update(task_id=task["TaskId"], output_uri=task.get("OutputUri"))
+        self.table.put(job_id, record)
+        logger.info(f"Narration job {job_id}: task {task['TaskId']} for {len(text)} characters")
+        return self._public(record)
+
+    def status(self, job_id, wait=0):
+        """The job's current state, refreshed from Polly; with wait, poll up to that many
+        seconds (capped at MAX_WAIT_SECONDS) for it to finish. None for unknown jobs."""
+        # `not wait > 0` also turns a NaN into no wait
+        deadline = time.monotonic() + (min(wait, MAX_WAIT_SECONDS) if wait > 0 else 0)
+        while True:
+            record = self.table.get(job_id)
+            if record is None:
+                return None
+            if self._never_started(record):
+                # Reported as failed so that the client submits the text again
+                return self._public(dict(record, status=FAILED, error="Narration task never started"))
+            if record["status"] not in (COMPLETED, FAILED) and record.get("task_id"):
+                record = self._refresh(record)
+            if record["status"] in (COMPLETED, FAILED) or time.monotonic() >= deadline:
+                return self._public(record)
+            time.sleep(POLL_INTERVAL)
+
+    @staticmethod
+    def _never_started(record):
+        return (record["status"] == PENDING and not record.get("task_id")
+                and time.time() - record.get("created_at", 0) > START_GRACE_SECONDS)
+
+    def _refresh(self, record):
+        try:
+            task = self.tasks.get_speech_synthesis_task(TaskId=record["task_id"])["SynthesisTask"]
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "SynthesisTaskNotFoundException":
+                raise
+            # Failed, so that the client submits the text again
+            task = {"TaskStatus": "failed", "TaskStatusReason": "Narration task not found"}
+        status = {"completed": COMPLETED, "failed": FAILED}.get(task["TaskStatus"], PENDING)
+        if status != record["status"]:
+            record.update(status=status, output_uri=task.get("OutputUri"))
+            if status == FAILED:
+                record["error"] = task.get("TaskStatusReason")
+            self.table.put(record["job_id"], record)
+        return record
+
+    def _public(self, record):
+        """The job as returned to clients: a fetchable audio_url once completed"""
+        job = {name: record.get(name) for name in ("job_id", "status", "text_length", "voice_id", "error")}
+        if record["status"] == COMPLETED:
+            job["audio_url"] = self._audio_url(record.get("output_uri"))
+        return job
+
+    def _audio_url(self, output_uri):
+        match = S3_OUTPUT_URI.match(output_uri or "")
+        if not match:
+            return output_uri
+        # Polly's output URI is not public: hand out a presigned GET instead
+        return get_client("s3").generate_presigned_url(
+            "get_object",
+            Params={"Bucket": match.group(1), "Key": match.group(2)},
+            ExpiresIn=AUDIO_URL_TTL
+        )
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    @classmethod
+    def from_env(cls, polly, local_store=None):
+        """Polly tasks writing to NARRATION_BUCKET, with records in NARRATION_TABLE; without a
+        bucket, the local stand-in writing to local_store (for local_server.py).
+
+        Raises RuntimeError in Lambda without both: the stand-in's thread is frozen between
+        invocations, and other containers would not know its jobs.
+        """
+        bucket = os.environ.get("NARRATION_BUCKET")
+        table_name = os.environ.get("NARRATION_TABLE")
+        if os.environ.get("AWS_LAMBDA_FUNCTION_NAME") and not (bucket and table_name):
+            raise RuntimeError("Narration is not configured: set NARRATION_BUCKET and NARRATION_TABLE")
+        table = DynamoDBJobTable(table_name) if table_name else LocalJobTable()
+        if bucket:
+            if not table_name:
+                logger.warning("NARRATION_TABLE is not set: duplicate submissions are only detected per container")
+            return cls(polly, table, bucket=bucket, sns_topic_arn=os.environ.get("NARRATION_SNS_TOPIC"))
+        store = local_store or LocalAudioStore(os.environ.get("NARRATION_DIR", "/tmp/seewrite-narrations"))
+        return cls(LocalSpeechTasks(polly, store), table)
@@ -0,0 +1,200 @@
+import io
+import os
+import time
+import logging
+import threading
+from itertools import combinations
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow comes from the Lambda layer; without it near-duplicate lookup is skipped
+    Image = None
+
+HASH_BITS = 64
+
+# Maximum Hamming distance (out of 64 bits) for two images to count as the same page.
+# Recompressed JPEGs, resized copies and lightly cropped screenshots of the same page
+# land within about 0-8 bits; unrelated images sit around 25-35.
+DEFAULT_THRESHOLD = int(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "8"))
+
+# Fingerprints of fresh analyses are also written to the description cache's shared tier
+# (DynamoDB/S3) under this key, so other containers match near-duplicates of them. The
+# newest SHARED_ENTRIES are kept (about 100 bytes each, within a DynamoDB item).
+SHARED_KEY = "near-duplicate-fingerprints"
+SHARED_ENTRIES = int(os.environ.get("NEAR_DUPLICATE_SHARED_ENTRIES", "2000"))
+
+# A lookup missing locally re-reads the shared fingerprints at most this often (seconds)
+SHARED_SYNC_SECONDS = float(os.environ.get("NEAR_DUPLICATE_SYNC_SECONDS", "5"))
+
+
+def dhash(image_data, hash_size=8):
+    """64-bit difference hash of image bytes (or a binary file), or None if the image cannot be decoded"""
+    if Image is None:
+        return None
+    try:
+        image = Image.open(image_data if hasattr(image_data, "read") else io.BytesIO(image_data))
+        # JPEG draft mode decodes at reduced scale, far cheaper than a full decode
+        image.draft("L", (hash_size * 4, hash_size * 4))
+        image = ImageOps.exif_transpose(image).convert("L")
+        pixels = list(image.resize((hash_size + 1, hash_size), Image.LANCZOS).getdata())
+    except Exception as e:
+        logger.warning(f"Could not fingerprint image: {e}")
+        return None
+
+    fingerprint = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            fingerprint = (fingerprint << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class MultiIndexHashIndex:
+    """Hamming-distance index using multi-index hashing.
+
+    Each 64-bit fingerprint is split into `bands` substrings with one hash table per band.
+    Three bands of ~21 bits keep buckets nearly empty up to a few million images.
+    By the pigeonhole principle, two fingerprints within distance d agree to within
+    d // bands bits on at least one band, so a query only probes the band values within
+    that radius and verifies the (few) candidates it finds.
+    """
+
+    def __init__(self, bands=3):
+        self.bands = bands
+        # Split 64 bits as evenly as possible, e.g. 22/21/21 for three bands
+        self.widths = [HASH_BITS // bands + (1 if i < HASH_BITS % bands else 0) for i in range(bands)]
+        self.shifts = [sum(self.widths[:i]) for i in range(bands)]
+        self.tables = [{} for _ in range(bands)]
+        self.size = 0
+        self._flip_masks = {}
+
+    def _split(self, fingerprint):
+        return [(fingerprint >> shift) & ((1 << width) - 1) for shift, width in zip(self.shifts, self.widths)]
+
+    def _masks(self, width, radius):
+        """XOR masks for every band value within `radius` bits, computed once per band width"""
+        masks = self._flip_masks.get((width, radius))
+        if masks is None:
+            masks = [0]
+            for r in range(1, radius + 1):
+                for bits in combinations(range(width), r):
+                    masks.append(sum(1 << bit for bit in bits))
+            self._flip_masks[(width, radius)] = masks
+        return masks
+
+    def add(self, fingerprint, value):
+        for table, band in zip(self.tables, self._split(fingerprint)):
+            table.setdefault(band, []).append((fingerprint, value))
+        self.size += 1
+
+    def nearest(self, fingerprint, max_distance):
+        """Return (distance, value) of the closest entry within max_distance, or None"""
+        radius = max_distance // self.bands
+        best = None
+        seen = set()
+        for table, width, band in zip(self.tables, self.widths, self._split(fingerprint)):
+            for mask in self._masks(width, radius):
+                for candidate, value in table.get(band ^ mask, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = hamming_distance(fingerprint, candidate)
+                    if distance <= max_distance and (best is None or distance < best[0]):
+                        best = (distance, value)
+                        if distance == 0:
+                            return best
+        return best
+
+    def __len__(self):
+        return self.size
+
+
+class NearDuplicateIndex:
+    """Maps perceptual fingerprints of analyzed images to their description cache keys.
+
+    With a shared tier, fingerprints added with share=True are appended to one bounded
+    record there, and a lookup that misses locally first adds the record's entries (at
+    most every SHARED_SYNC_SECONDS). Concurrent appends can drop an entry: a later
+    near-duplicate of that image is then analyzed again.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, shared=None, ttl=7 * 24 * 3600):
+        self.threshold = threshold
+        self.shared = shared
+        self.ttl = ttl
+        self.index = MultiIndexHashIndex()
+        self.known = set()
+        self.lookups = 0
+        self.matches = 0
+        self.synced_at = None
+        self.syncs = 0
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threshold >= 0 and Image is not None
+
+    def add(self, fingerprint, cache_key, share=False):
+        """Index a fingerprint; share=True (a fresh analysis) also writes it to the shared tier"""
+        if fingerprint is None:
+            return
+        with self.lock:
+            if fingerprint not in self.known:
+                self.known.add(fingerprint)
+                self.index.add(fingerprint, cache_key)
+        if share and self.shared is not None:
+            entries = self.shared.get(SHARED_KEY) or []
+            if all(entry[0] != fingerprint for entry in entries):
+                entries.append([fingerprint, cache_key])
+                self.shared.put(SHARED_KEY, entries[-SHARED_ENTRIES:], self.ttl)
+
+    def _sync(self):
+        """Index the fingerprints other processes shared; False when synced too recently"""
+        with self.lock:
+            now = time.monotonic()
+            if self.shared is None or (self.synced_at is not None and now - self.synced_at < SHARED_SYNC_SECONDS):
+                return False
+            self.synced_at = now
+            self.syncs += 1
+        for fingerprint, cache_key in self.shared.get(SHARED_KEY) or []:
+            self.add(fingerprint, cache_key)
+        return True
+
+    def find(self, fingerprint):
+        """Cache key of the closest previously analyzed image within the threshold, or None"""
+        if fingerprint is None or not self.enabled:
+            return None
+        with self.lock:
+            self.lookups += 1
+            match = self.index.nearest(fingerprint, self.threshold)
+        if match is None and self._sync():
+            with self.lock:
+                match = self.index.nearest(fingerprint, self.threshold)
+        if match is None:
+            return None
+        with self.lock:
+            self.matches += 1
+        logger.info(f"Near-duplicate image found at distance {match[0]}")
+        return match[1]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "indexed": len(self.index),
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "shared_syncs": self.syncs,
+                "threshold": self.threshold
+            }
+
+    @classmethod
+    def for_cache(cls, cache, threshold=DEFAULT_THRESHOLD):
+        """An index sharing fingerprints through cache's shared tier, when it has one"""
+        shared = next((tier for tier in cache.tiers if tier.name == "shared"), None)
+        return cls(threshold, shared=shared, ttl=cache.ttl)
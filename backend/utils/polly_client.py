@@ -1,50 +1,82 @@
-import boto3
-import base64
 import logging
 
+from aws_clients import get_client
+from audio_cache import (AUDIO_DELIVERY, content_type_for, lazy_audio_fields, stream_cached, synthesize_for_response,
+                         synthesize_handle)
+from audio_formats import content_type
+from engine_policy import VOICES
+
 logger = logging.getLogger(__name__)
 
 class PollyClient:
-    def __init__(self, region_name="us-east-1"):
-        self.client = boto3.client("polly", region_name=region_name)
+    def __init__(self, region_name="us-east-1", cache=None, handle_url=None):
+        self.client = get_client("polly", region_name)
         self.voice_id = "Joanna"  # Clear, professional female voice
+        self.engine = "neural"  # Higher quality neural voices
         self.output_format = "mp3"
+        self.sample_rate = "24000"  # Polly's default for neural MP3
+        # Optional AudioCache: repeated text is served from it without calling Polly
+        self.cache = cache
+        # handle_url(audio_id) -> URL that synthesizes a lazy handle on first fetch
+        self.handle_url = handle_url
+    
+    def _voice(self, audio_format=None):
+        """Synthesis settings; audio_format is a negotiated (output_format, sample_rate)"""
+        output_format, sample_rate = audio_format or (self.output_format, self.sample_rate)
+        return {
+            "voice_id": self.voice_id,
+            "engine": self.engine,
+            "output_format": output_format,
+            "sample_rate": sample_rate
+        }
+    
+    def _result(self, fields, cached, audio_type):
+        result = {
+            "success": True,
+            "content_type": audio_type,
+            "cached": cached
+        }
+        result.update((name, value) for name, value in fields.items() if value is not None)
+        return result
     
-    def synthesize_speech(self, text):
-        """Convert text to speech and return base64 encoded audio"""
+    def synthesize_speech(self, text, delivery=None, audio_format=None):
+        """Convert text to speech and return base64 encoded audio, or its URL with delivery="url"
+        (when the cache serves URLs); delivery="lazy" returns an audio_id handle without
+        calling Polly"""
+        delivery = delivery or AUDIO_DELIVERY
+        voice = self._voice(audio_format)
+        audio_type = content_type(voice["output_format"])
         try:
-            response = self.client.synthesize_speech(
-                Text=text,
-                OutputFormat=self.output_format,
-                VoiceId=self.voice_id,
-                Engine="neural"  # Higher quality neural voices
-            )
-            
-            if "AudioStream" in response:
-                audio_data = response["AudioStream"].read()
-                # Return base64 encoded audio for web delivery
-                audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-                return {
-                    "success": True,
-                    "audio_base64": audio_base64,
-                    "content_type": f"audio/{self.output_format}"
-                }
-            else:
-                logger.error("No AudioStream in Polly response")
-                return {"success": False, "error": "No audio stream generated"}
+            if delivery == "lazy" and self.cache is not None:
+                return self._result(lazy_audio_fields(text, self.cache, self.handle_url, **voice), False, audio_type)
+            fields, cached = synthesize_for_response(self.client, text, self.cache, delivery, **voice)
+            return self._result(fields, cached, audio_type)
                 
         except Exception as e:
             logger.error(f"Error synthesizing speech: {e}")
             return {"success": False, "error": str(e)}
     
-    def get_available_voices(self):
-        """Get list of available voices for customization"""
+    def synthesize_handle(self, audio_id, delivery=None):
+        """Audio for a lazy handle, synthesized now unless cached; None for unknown handles"""
+        if self.cache is None:
+            return None
         try:
-            response = self.client.describe_voices(
-                Engine="neural",
-                LanguageCode="en-US"
-            )
-            return [voice["Id"] for voice in response["Voices"]]
+            resolved = synthesize_handle(self.client, audio_id, self.cache, delivery or AUDIO_DELIVERY)
+            return self._result(*resolved, content_type_for(audio_id)) if resolved is not None else None
         except Exception as e:
-            logger.error(f"Error getting voices: {e}")
-            return ["Joanna"]  # Default fallback
\ No newline at end of file
+            logger.error(f"Error synthesizing speech: {e}")
+            return {"success": False, "error": str(e)}
+    
+    def stream_speech(self, text, audio_format=None):
+        """(audio_id, pieces): Polly's audio for text as it is synthesized, for a chunked
+        response; pieces is None when the audio is cached under audio_id. Polly errors propagate."""
+        return stream_cached(self.client, text, self.cache, **self._voice(audio_format))
+    
+    def get_available_voices(self):
+        """Get list of available voices for customization"""
+        # describe_voices is read once per process (VOICES caches it, paginated)
+        voices = VOICES.voices_for(self.client, self.engine)
+        if not voices:
+            logger.error("Error getting voices: voice catalog unavailable")
+            return ["Joanna"]  # Default fallback
+        return voices
@@ -0,0 +1,300 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import namedtuple
+from urllib.parse import unquote
+
+from botocore.exceptions import ClientError
+
+from admission import THROTTLING_ERROR_CODES
+
+try:
+    import redis
+except ImportError:  # Only needed for a budget shared across processes (AWS_RATE_LIMIT_REDIS_URL)
+    redis = None
+
+# Standard library and botocore only: shipped next to the single-file handlers in rebuild/backend too
+
+logger = logging.getLogger(__name__)
+
+# Client-side rate limiting of Bedrock and Polly calls, on unless set to 0
+RATE_LIMITING_ENABLED = os.environ.get("AWS_RATE_LIMITING", "1").lower() not in ("0", "false", "no")
+
+# Services whose calls are paced; each model (Bedrock) or operation (Polly) has its own budget
+RATE_LIMITED_SERVICES = ("bedrock-runtime", "polly")
+
+# Redis holding one budget for every process and container using it; unset keeps the
+# budget in this process
+REDIS_URL = os.environ.get("AWS_RATE_LIMIT_REDIS_URL")
+
+# Longest a call waits for its turn (seconds) before failing as throttled without being sent
+MAX_WAIT = float(os.environ.get("AWS_RATE_LIMIT_MAX_WAIT", "10"))
+
+# AIMD: the rate starts at `initial` calls/s, is halved (decrease) on a ThrottlingException
+# at most once per decrease_interval, and grows by `increase` calls/s for every second of
+# successful calls that had to wait for a token. burst_seconds of calls may go at once.
+RateSettings = namedtuple("RateSettings", "initial min max burst_seconds increase decrease decrease_interval")
+RATE_SETTINGS = RateSettings(
+    initial=float(os.environ.get("AWS_RATE_LIMIT_INITIAL", "10")),
+    min=float(os.environ.get("AWS_RATE_LIMIT_MIN", "0.5")),
+    max=float(os.environ.get("AWS_RATE_LIMIT_MAX", "200")),
+    burst_seconds=float(os.environ.get("AWS_RATE_LIMIT_BURST_SECONDS", "2")),
+    increase=1.0,
+    decrease=0.5,
+    decrease_interval=1.0
+)
+
+# Shortest wait before trying for a token again, so rounding cannot spin a caller
+MIN_WAIT = 0.001
+
+# Idle budgets are forgotten (Redis) after this many seconds
+IDLE_TTL = 3600
+
+# Bedrock quotas are per model: /model/<model id>/invoke...
+MODEL_PATH = re.compile(r"/model/([^/]+)/")
+
+
+class RateLimited(ClientError):
+    """A call not sent because its budget had no token within the wait allowed. It carries
+    the ThrottlingException code, so callers treat it exactly like Bedrock or Polly throttling."""
+
+    def __init__(self, key, operation_name, max_wait):
+        super().__init__({"Error": {"Code": "ThrottlingException",
+                                    "Message": f"Client-side rate limit for {key}: no slot within {max_wait:g}s"}},
+                         operation_name)
+
+
+def _burst(rate, settings):
+    return max(1.0, rate * settings.burst_seconds)
+
+
+class LocalRateStore:
+    """Budgets kept in this process: every limiter using the store shares them"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.budgets = {}
+        self.lock = threading.Lock()
+
+    def _refilled(self, key, now, settings):
+        budget = self.budgets.get(key)
+        if budget is None:
+            budget = self.budgets[key] = {"rate": settings.initial, "tokens": _burst(settings.initial, settings),
+                                          "stamp": now, "decreased": float("-inf")}
+        budget["tokens"] = min(_burst(budget["rate"], settings),
+                               budget["tokens"] + (now - budget["stamp"]) * budget["rate"])
+        budget["stamp"] = now
+        return budget
+
+    def take(self, key, settings):
+        """Take a token: 0 when one was taken, else the seconds until the next one is due.
+        Nothing is reserved ahead, so a rate cut applies to callers already waiting."""
+        with self.lock:
+            budget = self._refilled(key, self.clock(), settings)
+            if budget["tokens"] >= 1:
+                budget["tokens"] -= 1
+                return 0.0
+            return max(MIN_WAIT, (1 - budget["tokens"]) / budget["rate"])
+
+    def feedback(self, key, settings, throttled, waited):
+        """Adjust the rate after a call; returns the new rate"""
+        with self.lock:
+            now = self.clock()
+            budget = self._refilled(key, now, settings)
+            if throttled:
+                if now - budget["decreased"] >= settings.decrease_interval:
+                    budget["rate"] = max(settings.min, budget["rate"] * settings.decrease)
+                    budget["decreased"] = now
+                    # No burst straight after throttling
+                    budget["tokens"] = min(budget["tokens"], 0.0)
+            elif waited:
+                budget["rate"] = min(settings.max, budget["rate"] + settings.increase / budget["rate"])
+            return budget["rate"]
+
+    def rate(self, key):
+        with self.lock:
+            budget = self.budgets.get(key)
+            return budget["rate"] if budget else None
+
+
+# The LocalRateStore arithmetic as Redis scripts, each run atomically on a hash per budget.
+# Time comes from the Redis server, so the hosts' clocks need not agree.
+_REDIS_REFILL = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local initial, burst_seconds = tonumber(ARGV[1]), tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'rate', 'tokens', 'stamp', 'decreased')
+local rate = tonumber(state[1]) or initial
+local tokens = tonumber(state[2]) or math.max(1, initial * burst_seconds)
+local stamp = tonumber(state[3]) or now
+local decreased = tonumber(state[4]) or -1e18
+tokens = math.min(math.max(1, rate * burst_seconds), tokens + math.max(0, now - stamp) * rate)
+"""
+
+_REDIS_SAVE = """
+redis.call('HSET', KEYS[1], 'rate', tostring(rate), 'tokens', tostring(tokens), 'stamp', tostring(now),
+           'decreased', tostring(decreased))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+"""
+
+_REDIS_TAKE = _REDIS_REFILL + """
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.max(tonumber(ARGV[4]), (1 - tokens) / rate)
+end
+""" + _REDIS_SAVE + """
+return tostring(wait)
+"""
+
+_REDIS_FEEDBACK = _REDIS_REFILL + """
+if ARGV[4] == '1' then
+    if now - decreased >= tonumber(ARGV[9]) then
+        rate = math.max(tonumber(ARGV[6]), rate * tonumber(ARGV[8]))
+        decreased = now
+        tokens = math.min(tokens, 0)
+    end
+elseif ARGV[5] == '1' then
+    rate = math.min(tonumber(ARGV[7]), rate + tonumber(ARGV[10]) / rate)
+end
+""" + _REDIS_SAVE + """
+return tostring(rate)
+"""
+
+
+class RedisRateStore:
+    """Budgets in Redis, shared by every process and container pointed at it. `client` needs
+    only register_script and hget, as in redis-py."""
+
+    def __init__(self, client, prefix="seewrite:rate:"):
+        self.client = client
+        self.prefix = prefix
+        self._take = client.register_script(_REDIS_TAKE)
+        self._feedback = client.register_script(_REDIS_FEEDBACK)
+
+    @classmethod
+    def from_url(cls, url):
+        return cls(redis.Redis.from_url(url))
+
+    def take(self, key, settings):
+        return float(self._take(keys=[self.prefix + key], args=[settings.initial, settings.burst_seconds, IDLE_TTL,
+                                                                   MIN_WAIT]))
+
+    def feedback(self, key, settings, throttled, waited):
+        return float(self._feedback(keys=[self.prefix + key], args=[
+            settings.initial, settings.burst_seconds, IDLE_TTL, int(throttled), int(waited),
+            settings.min, settings.max, settings.decrease, settings.decrease_interval, settings.increase
+        ]))
+
+    def rate(self, key):
+        rate = self.client.hget(self.prefix + key, "rate")
+        return float(rate) if rate is not None else None
+
+
+def default_store():
+    """RedisRateStore when AWS_RATE_LIMIT_REDIS_URL is set (and redis is installed), else local"""
+    if REDIS_URL:
+        if redis is not None:
+            return RedisRateStore.from_url(REDIS_URL)
+        logger.error("AWS_RATE_LIMIT_REDIS_URL is set but redis is not installed; rate limits are per process")
+    return LocalRateStore()
+
+
+class AdaptiveRateLimiter:
+    """Paces calls to a token bucket per budget whose rate adapts to throttling (AIMD).
+
+    attach(client) hooks a boto3 client's events, so every Bedrock or Polly call made with
+    it waits for a token before each attempt (botocore's retries included) and reports
+    whether it was throttled. The rate only grows while callers are waiting for tokens,
+    so a quiet budget does not drift up to the maximum.
+    """
+
+    def __init__(self, store=None, settings=RATE_SETTINGS, max_wait=MAX_WAIT):
+        self.store = store if store is not None else LocalRateStore()
+        self.settings = settings
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.counts = {}
+        # Whether this thread's call in flight had to wait for its token
+        self.local = threading.local()
+
+    def _count(self, key, name):
+        with self.lock:
+            counts = self.counts.setdefault(key, {"calls": 0, "waited": 0, "rejected": 0, "throttled": 0})
+            counts[name] += 1
+
+    def try_acquire(self, key, operation_name="call", waited_for=0.0):
+        """Take a token: 0 when the call may be sent, else seconds to wait before trying
+        again. Raises RateLimited once waited_for plus that wait exceeds max_wait."""
+        wait = self.store.take(key, self.settings)
+        if wait == 0:
+            self._count(key, "calls")
+            if waited_for:
+                self._count(key, "waited")
+        elif waited_for + wait > self.max_wait:
+            self._count(key, "rejected")
+            raise RateLimited(key, operation_name, self.max_wait)
+        return wait
+
+    def acquire(self, key, operation_name="call"):
+        """Block until a token is taken; returns whether the call had to wait"""
+        waited_for = 0.0
+        while True:
+            wait = self.try_acquire(key, operation_name, waited_for)
+            if wait == 0:
+                return waited_for > 0
+            time.sleep(wait)
+            waited_for += wait
+
+    def record(self, key, throttled, waited=False):
+        """Feed a call's outcome back into its budget's rate"""
+        if throttled:
+            self._count(key, "throttled")
+        return self.store.feedback(key, self.settings, throttled, waited)
+
+    @staticmethod
+    def budget_key(service, region, operation_name, path):
+        model = MODEL_PATH.search(path)
+        return f"{service}:{region}:{unquote(model.group(1)) if model else operation_name}"
+
+    def attach(self, client):
+        """Pace every call made with a Bedrock or Polly boto3 client; returns the client"""
+        service = client.meta.service_model.service_name
+        if service not in RATE_LIMITED_SERVICES:
+            return client
+        region = client.meta.region_name
+
+        def before_send(request, event_name, **kwargs):
+            operation_name = event_name.rsplit(".", 1)[-1]
+            key = self.budget_key(service, region, operation_name, request.url.split("?", 1)[0])
+            self.local.waited = self.acquire(key, operation_name)
+
+        def needs_retry(response, operation, request_dict, **kwargs):
+            # Called once per attempt that got an answer; connection errors say nothing about the quota
+            if response is None:
+                return None
+            http_response, parsed = response
+            code = parsed.get("Error", {}).get("Code") if isinstance(parsed, dict) else None
+            key = self.budget_key(service, region, operation.name, request_dict.get("url_path", ""))
+            self.record(key, code in THROTTLING_ERROR_CODES or http_response.status_code == 429,
+                        getattr(self.local, "waited", False))
+            return None
+
+        client.meta.events.register("before-send", before_send)
+        client.meta.events.register("needs-retry", needs_retry)
+        return client
+
+    def stats(self):
+        with self.lock:
+            counts = {key: dict(value) for key, value in self.counts.items()}
+        for key, value in counts.items():
+            rate = self.store.rate(key)
+            value["rate_per_s"] = round(rate, 2) if rate is not None else None
+        return counts
+
+
+# Shared by every Bedrock and Polly client in the process (aws_clients.get_client attaches it)
+RATE_LIMITER = AdaptiveRateLimiter(default_store())
@@ -0,0 +1,120 @@
+import re
+import json
+import base64
+import logging
+
+from audio_formats import negotiate
+
+logger = logging.getLogger(__name__)
+
+
+def decode_data_url(value):
+    """Decode a base64 image string, with or without a data:image/...;base64, prefix"""
+    if ',' in value:
+        value = value.split(',', 1)[1]
+    return base64.b64decode(value)
+
+
+def get_header(event, name):
+    """Case-insensitive header lookup on an API Gateway proxy event"""
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return ''
+
+
+def accepts_event_stream(event):
+    """True when the client asked for a text/event-stream (token streaming) response"""
+    return 'text/event-stream' in get_header(event, 'accept')
+
+
+def requested_audio_delivery(event, body, default):
+    """'url', 'lazy' or 'base64': the ?audio= query parameter, else the JSON body's audio_delivery, else default"""
+    params = event.get('queryStringParameters') or {}
+    delivery = params.get('audio') or (body or {}).get('audio_delivery') or default
+    return delivery if delivery in ('url', 'lazy') else 'base64'
+
+
+def requested_audio_format(event, body):
+    """(output_format, sample_rate) from ?audio_profile= or "audio_profile", explicit
+    audio_format/audio_sample_rate, and the Accept header (or "audio_accept" for JSON
+    requests). Raises ValueError for unsupported choices."""
+    params = event.get('queryStringParameters') or {}
+    body = body or {}
+    return negotiate(
+        accept=body.get('audio_accept') or get_header(event, 'accept'),
+        profile=params.get('audio_profile') or body.get('audio_profile'),
+        output_format=params.get('audio_format') or body.get('audio_format'),
+        sample_rate=params.get('audio_sample_rate') or body.get('audio_sample_rate')
+    )
+
+
+def _header_param(value, param):
+    match = re.search(param + r'="?([^";]*)"?', value, re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+def image_from_multipart(content_type, body, field='image'):
+    """Return (bytes, media_type) of the `field` part (or the first image part) of a multipart body.
+
+    Splits on the boundary directly instead of going through email.parser, which
+    copies every part line by line (~10x slower and ~5x the memory on a 10 MB upload).
+    """
+    boundary = _header_param(content_type, 'boundary')
+    if not boundary:
+        raise ValueError('multipart/form-data upload without a boundary')
+    delimiter = b'\r\n--' + boundary.encode('latin-1')
+
+    fallback = None
+    # Prefixing CRLF lets the first delimiter match like the others
+    position = (b'\r\n' + body[:len(delimiter)]).find(delimiter)
+    if position != 0:
+        return None, None
+    position = len(delimiter) - 2
+    while body[position:position + 2] != b'--':
+        header_end = body.find(b'\r\n\r\n', position)
+        part_end = body.find(delimiter, header_end)
+        if header_end < 0 or part_end < 0:
+            break
+        headers = {}
+        for line in body[position:header_end].decode('latin-1').split('\r\n'):
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        media_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        if _header_param(headers.get('content-disposition', ''), 'name') == field:
+            return body[header_end + 4:part_end], media_type or None
+        if fallback is None and media_type.startswith('image/'):
+            fallback = (body[header_end + 4:part_end], media_type)
+        position = part_end + len(delimiter)
+    return fallback or (None, None)
+
+
+def image_from_event(event):
+    """Extract (image_bytes, media_type, body) from an API Gateway proxy event.
+
+    Accepts a raw image/* body or a multipart/form-data upload (both delivered base64
+    encoded with isBase64Encoded once the API has image/* and multipart/form-data as
+    binary media types), or the JSON {"image": "<data URL>"} compatibility form.
+    body is the parsed JSON body, for its audio options ({} for image and multipart
+    uploads). Returns (None, None, body) when the request carries no image.
+    """
+    content_type = get_header(event, 'content-type')
+    mimetype = content_type.split(';')[0].strip().lower()
+    body = event.get('body') or ''
+
+    if mimetype.startswith('image/') or mimetype == 'multipart/form-data':
+        if not event.get('isBase64Encoded'):
+            # Without binary media types API Gateway hands over the body as mangled text
+            raise ValueError(f'{mimetype} uploads require API Gateway binary media types')
+        raw = base64.b64decode(body)
+        if mimetype == 'multipart/form-data':
+            return (*image_from_multipart(content_type, raw), {})
+        return raw, mimetype, {}
+
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    data = json.loads(body or '{}')
+    image_base64 = data.get('image')
+    if not image_base64:
+        return None, None, data
+    return decode_data_url(image_base64), None, data
@@ -0,0 +1,315 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from aws_clients import get_client
+
+logger = logging.getLogger(__name__)
+
+# Longest a request waits for an identical call already in flight (in this process or,
+# with a lease table, in another container) before making the call itself. Above the
+# Bedrock read timeout, so a follower only gives up on a leader that is stuck.
+WAIT_SECONDS = float(os.environ.get("SINGLE_FLIGHT_WAIT_SECONDS", "60"))
+
+# A lease expires after this long, so a container that died mid-call does not block the key
+LEASE_SECONDS = float(os.environ.get("SINGLE_FLIGHT_LEASE_SECONDS", "60"))
+
+# How often a container waiting on another's lease checks the shared cache for the result
+POLL_SECONDS = float(os.environ.get("SINGLE_FLIGHT_POLL_SECONDS", "0.25"))
+
+
+class FlightAbandoned(Exception):
+    """The leader stopped without a result (its streaming client went away, or the
+    upload could not be processed); followers make the call themselves"""
+
+
+class DynamoDBLeaseTable:
+    """Leases in a DynamoDB table (partition key 'lease_key', TTL attribute 'expires_at'):
+    one container per key makes the call while the others wait for its result"""
+
+    def __init__(self, table_name, region_name="us-east-1"):
+        self.table_name = table_name
+        self.client = get_client("dynamodb", region_name)
+
+    def acquire(self, key, owner, seconds):
+        """True when owner now holds key's lease (it was free or expired)"""
+        now = time.time()
+        try:
+            self.client.put_item(
+                TableName=self.table_name,
+                Item={
+                    "lease_key": {"S": key},
+                    "owner": {"S": owner},
+                    "expires_at": {"N": str(now + seconds)}
+                },
+                ConditionExpression="attribute_not_exists(lease_key) OR expires_at < :now",
+                ExpressionAttributeValues={":now": {"N": str(now)}}
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            # Without the table, every container makes its own call as before
+            logger.warning(f"Lease table unavailable: {e}")
+            return True
+        except BotoCoreError as e:
+            logger.warning(f"Lease table unavailable: {e}")
+            return True
+
+    def release(self, key, owner):
+        try:
+            self.client.delete_item(
+                TableName=self.table_name,
+                Key={"lease_key": {"S": key}},
+                ConditionExpression="#owner = :owner",
+                ExpressionAttributeNames={"#owner": "owner"},
+                ExpressionAttributeValues={":owner": {"S": owner}}
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.warning(f"Lease release failed: {e}")
+        except BotoCoreError as e:
+            logger.warning(f"Lease release failed: {e}")
+
+
+class LocalLeaseTable:
+    """In-memory stand-in for the DynamoDB lease table, for offline testing of the lease path.
+    It lives in one process, so it does not coordinate server processes or containers."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.leases = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key, owner, seconds):
+        now = self.clock()
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is not None and lease[1] >= now:
+                return False
+            self.leases[key] = (owner, now + seconds)
+            return True
+
+    def release(self, key, owner):
+        with self.lock:
+            lease = self.leases.get(key)
+            if lease is not None and lease[0] == owner:
+                del self.leases[key]
+
+
+def lease_table_from_env():
+    """DynamoDB when SINGLE_FLIGHT_TABLE is set, the in-memory stand-in with
+    SINGLE_FLIGHT_SHARED=local, otherwise None (coalescing within the process only)"""
+    if os.environ.get("SINGLE_FLIGHT_TABLE"):
+        return DynamoDBLeaseTable(os.environ["SINGLE_FLIGHT_TABLE"])
+    if os.environ.get("SINGLE_FLIGHT_SHARED") == "local":
+        return LocalLeaseTable()
+    return None
+
+
+class Flight:
+    """One call in flight: its leader ends it, its followers wait on the future"""
+
+    def __init__(self):
+        self.future = Future()
+        self.leased = False
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls: the first caller for a key leads and makes the
+    call, the others wait for its result instead of repeating it.
+
+    begin(key) returns (result, None) to a follower and (None, flight) to the leader, which
+    must end() the flight with its result or error. Followers receive the leader's error
+    too (a 429 for all when Bedrock throttles), except FlightAbandoned, after which one of
+    them leads again.
+
+    With a lease table the leader first takes the key's lease, so one container calls for
+    everyone; a container that finds the lease held polls lookup() (the shared cache the
+    leader writes to before ending) until the result appears or the lease is released.
+    """
+
+    def __init__(self, namespace, leases=None, wait_seconds=WAIT_SECONDS, lease_seconds=LEASE_SECONDS,
+                 poll_seconds=POLL_SECONDS):
+        self.namespace = namespace
+        self.leases = leases
+        self.wait_seconds = wait_seconds
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        # This process in the lease table
+        self.owner = uuid.uuid4().hex
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.counters = {"led": 0, "joined": 0, "joined_remote": 0, "abandoned": 0, "wait_timeouts": 0}
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def begin(self, key, lookup=None):
+        """(result, None) when an identical call in flight has produced the result, else
+        (None, flight): the caller makes the call and ends the flight"""
+        while True:
+            with self.lock:
+                flight = self.flights.get(key)
+                leading = flight is None
+                if leading:
+                    flight = self.flights[key] = Flight()
+                    self.counters["led"] += 1
+                else:
+                    self.counters["joined"] += 1
+            if leading:
+                break
+            try:
+                return flight.future.result(self.wait_seconds), None
+            except FlightAbandoned:
+                continue
+            except FutureTimeout:
+                # A leader this slow is stuck: call without coalescing, and let the next
+                # caller lead instead of joining it too
+                with self.lock:
+                    if self.flights.get(key) is flight:
+                        del self.flights[key]
+                    self.counters["wait_timeouts"] += 1
+                return None, Flight()
+
+        if self.leases is not None and lookup is not None:
+            try:
+                result = self._wait_for_lease(key, flight, lookup)
+            except BaseException as e:
+                # The lease table or shared cache failed: followers call for themselves
+                self.end(key, flight, error=FlightAbandoned(f"Lease wait failed: {e}"))
+                raise
+            if result is not None:
+                self.end(key, flight, result)
+                return result, None
+        return None, flight
+
+    def _wait_for_lease(self, key, flight, lookup):
+        """Take key's lease, or the result of the container holding it; None once the lease
+        is ours (or the wait ran out)"""
+        lease_key = f"{self.namespace}:{key}"
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            if self.leases.acquire(lease_key, self.owner, self.lease_seconds):
+                flight.leased = True
+                # The last holder may have stored the result just before releasing
+                result = lookup()
+                if result is not None:
+                    self._count("joined_remote")
+                return result
+            result = lookup()
+            if result is not None:
+                self._count("joined_remote")
+                return result
+            if time.monotonic() >= deadline:
+                self._count("wait_timeouts")
+                return None
+            time.sleep(self.poll_seconds)
+
+    def end(self, key, flight, result=None, error=None):
+        """Hand the leader's result (or error) to the followers; store it in the shared cache
+        first, so that requests arriving afterwards find it there"""
+        with self.lock:
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+            if isinstance(error, FlightAbandoned):
+                self.counters["abandoned"] += 1
+        if flight.leased:
+            self.leases.release(f"{self.namespace}:{key}", self.owner)
+            flight.leased = False
+        if flight.future.done():
+            return
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+
+    def do(self, key, function, lookup=None):
+        """(function() or the result of an identical call in flight, joined)"""
+        result, flight = self.begin(key, lookup)
+        if flight is None:
+            return result, True
+        try:
+            result = function()
+        except BaseException as e:
+            self.end(key, flight, error=e)
+            raise
+        self.end(key, flight, result)
+        return result, False
+
+    def stream(self, key, flight, chunks, result_of):
+        """A FlightStream passing a leading stream's chunks through; it ends the flight"""
+        return FlightStream(self, key, flight, chunks, result_of)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, in_flight=len(self.flights), shared=self.leases is not None)
+
+
+class FlightStream:
+    """A leading stream's chunks, ending its flight exactly once: with result_of(whole text)
+    when the stream completes, or with FlightAbandoned when result_of returns None (the text
+    is incomplete) or the stream is closed, or dropped, before it completes.
+
+    result_of typically stores the result in the shared cache; its errors end the flight too.
+    """
+
+    def __init__(self, flights, key, flight, chunks, result_of):
+        self.flights = flights
+        self.key = key
+        self.flight = flight
+        self.chunks = iter(chunks)
+        self.result_of = result_of
+        self.parts = []
+        self.ended = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.ended:
+            raise StopIteration
+        try:
+            chunk = next(self.chunks)
+        except StopIteration:
+            self._complete()
+            raise
+        except BaseException as e:
+            self._end(error=e)
+            raise
+        self.parts.append(chunk)
+        return chunk
+
+    def _complete(self):
+        try:
+            result = self.result_of("".join(self.parts))
+        except BaseException as e:
+            self._end(error=e)
+            raise
+        if result is None:
+            self._end(error=FlightAbandoned("Stream ended before it completed"))
+        else:
+            self._end(result)
+
+    def _end(self, result=None, error=None):
+        if not self.ended:
+            self.ended = True
+            self.flights.end(self.key, self.flight, result, error)
+
+    def close(self):
+        """Abandon the flight unless it has ended, and close the underlying stream"""
+        self._end(error=FlightAbandoned("Stream closed before it completed"))
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
+
+    def __del__(self):
+        # A response never iterated (its client left first) must not hold the key forever
+        if not self.ended:
+            self._end(error=FlightAbandoned("Stream dropped before it completed"))
@@ -0,0 +1,186 @@
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aws_clients import get_client
+from audio_cache import make_audio_key, synthesize_cached
+
+logger = logging.getLogger(__name__)
+
+# Share of returned texts whose audio is synthesized before anyone asks for it (0 to 1).
+# Sampling is by content hash, so the same text always gets the same decision.
+SPECULATIVE_AUDIO_RATE = float(os.environ.get("SPECULATIVE_AUDIO_RATE", "0"))
+
+# Lambda handlers cannot work after returning: they hand the text to this function
+# (audio_generator) with an asynchronous invoke, and it fills the shared audio cache
+SPECULATIVE_AUDIO_FUNCTION = os.environ.get("SPECULATIVE_AUDIO_FUNCTION")
+
+# Background Polly calls per process; kept small so speculation never crowds out the
+# synthesis users are waiting for
+SPECULATIVE_WORKERS = int(os.environ.get("SPECULATIVE_WORKERS", "2"))
+
+# Speculations remembered for claim(); older ones that were never played count as wasted
+MAX_TRACKED = 1000
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide bounded pool for speculative synthesis"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative-audio")
+    return _executor
+
+
+def sampled(key, rate):
+    """True for the `rate` share of audio keys"""
+    return int(key[:8], 16) < rate * 0x100000000
+
+
+class SpeculativeAudio:
+    """Synthesizes text into the audio cache in the background once it has been returned,
+    so the generate-audio request that follows finds the audio ready.
+
+    claim() is called by that request: it waits for a speculation still in flight instead
+    of calling Polly a second time, and counts the speculation as used. Speculations that
+    are never claimed are the wasted work.
+    """
+
+    def __init__(self, polly, cache, rate=SPECULATIVE_AUDIO_RATE, voice_id="Joanna", engine="neural",
+                 output_format="mp3", sample_rate="24000"):
+        self.polly = polly
+        self.cache = cache
+        self.rate = rate
+        self.voice = {"voice_id": voice_id, "engine": engine, "output_format": output_format,
+                      "sample_rate": sample_rate}
+        # key -> (future, characters), oldest first
+        self.speculations = {}
+        self.counters = {"considered": 0, "speculated": 0, "already_cached": 0, "synthesized": 0,
+                         "failed": 0, "used": 0, "joined_in_flight": 0, "wasted": 0,
+                         "chars_synthesized": 0, "chars_used": 0}
+        self.lock = threading.Lock()
+
+    def key_for(self, text, audio_format=None):
+        if audio_format:
+            return make_audio_key(text, self.voice["voice_id"], self.voice["engine"], *audio_format)
+        return make_audio_key(text, **self.voice)
+
+    def speculate(self, text, audio_format=None):
+        """Start synthesizing text (in the (output_format, sample_rate) its response negotiated)
+        unless it is sampled out or already being synthesized"""
+        if self.cache is None or not text:
+            return None
+        voice = self.voice
+        if audio_format:
+            voice = dict(voice, output_format=audio_format[0], sample_rate=audio_format[1])
+        key = make_audio_key(text, **voice)
+        with self.lock:
+            self.counters["considered"] += 1
+            if not sampled(key, self.rate) or key in self.speculations:
+                return None
+            self.counters["speculated"] += 1
+            future = get_executor().submit(self._synthesize, text, voice)
+            self.speculations[key] = (future, len(text))
+            while len(self.speculations) > MAX_TRACKED:
+                self._forget(next(iter(self.speculations)))
+        return key
+
+    def _synthesize(self, text, voice):
+        try:
+            _, _, cached = synthesize_cached(self.polly, text, self.cache, load=False, **voice)
+        except Exception as e:
+            logger.warning(f"Speculative synthesis failed: {e}")
+            self._count("failed")
+            return False
+        if cached:
+            self._count("already_cached")
+        else:
+            self._count("synthesized")
+            self._count("chars_synthesized", len(text))
+        return not cached
+
+    def _forget(self, key):
+        # Lock held by the caller
+        future, chars = self.speculations.pop(key)
+        if future.done() and not future.exception() and future.result():
+            self.counters["wasted"] += 1
+
+    def claim(self, key, timeout=None):
+        """Called when key's audio is requested: waits for its speculation if still running.
+        True when a speculation produced (or is producing) the audio."""
+        with self.lock:
+            entry = self.speculations.pop(key, None)
+        if entry is None:
+            return False
+        future, chars = entry
+        if not future.done():
+            self._count("joined_in_flight")
+        try:
+            synthesized = future.result(timeout)
+        except Exception:
+            return False
+        if synthesized:
+            self._count("used")
+            self._count("chars_used", chars)
+        return synthesized
+
+    def _count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters, rate=self.rate)
+            unclaimed = sum(1 for future, _ in self.speculations.values()
+                            if future.done() and not future.exception() and future.result())
+        stats["unclaimed"] = unclaimed
+        done = stats["used"] + stats["wasted"]
+        stats["used_ratio"] = round(stats["used"] / done, 3) if done else None
+        return stats
+
+    @classmethod
+    def from_env(cls, polly, cache, **voice):
+        """In-process speculation at SPECULATIVE_AUDIO_RATE (for local_server.py)"""
+        return cls(polly, cache, SPECULATIVE_AUDIO_RATE, **voice)
+
+
+class LambdaSpeculativeAudio:
+    """Speculation from a Lambda handler: an asynchronous (Event) invoke of audio_generator
+    with {"text", "speculative": true}, which synthesizes into the shared S3 audio cache.
+    Use and waste are read from audio_generator's logs, as containers do not share counters."""
+
+    def __init__(self, function_name, rate=SPECULATIVE_AUDIO_RATE, region_name="us-east-1", **voice):
+        self.function_name = function_name
+        self.rate = rate
+        self.voice = {"voice_id": "Joanna", "engine": "neural", "output_format": "mp3", "sample_rate": "24000",
+                      **voice}
+        self.client = get_client("lambda", region_name)
+
+    def speculate(self, text):
+        key = make_audio_key(text, **self.voice)
+        if not text or not sampled(key, self.rate):
+            return None
+        try:
+            self.client.invoke(
+                FunctionName=self.function_name,
+                InvocationType="Event",
+                Payload=json.dumps({"body": json.dumps({"text": text, "speculative": True})})
+            )
+        except Exception as e:
+            logger.warning(f"Speculative synthesis not started: {e}")
+            return None
+        logger.info(f"Speculative synthesis started for {key}")
+        return key
+
+    @classmethod
+    def from_env(cls):
+        """Speculation through SPECULATIVE_AUDIO_FUNCTION, or None when it is not configured"""
+        if not SPECULATIVE_AUDIO_FUNCTION or SPECULATIVE_AUDIO_RATE <= 0:
+            return None
+        return cls(SPECULATIVE_AUDIO_FUNCTION)
@@ -0,0 +1,111 @@
+import os
+import re
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Concurrent Polly calls per process; kept low to stay inside Polly's
+# synthesize_speech transaction rate when several requests overlap
+SPEECH_WORKERS = int(os.environ.get("SPEECH_WORKERS", "3"))
+
+# Sentences shorter than this are merged with the next one: a Polly call per
+# "Yes." costs a round trip for a fraction of a second of audio
+MIN_SENTENCE_CHARS = int(os.environ.get("SPEECH_MIN_SENTENCE_CHARS", "40"))
+
+# Well under Polly's 3000 character limit; longer runs without punctuation
+# are cut at a word boundary
+MAX_SENTENCE_CHARS = 1500
+
+# Sentence end followed by whitespace, or a line break (lists, headings)
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n\s*')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide bounded pool shared by every request's speech pipeline"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=SPEECH_WORKERS, thread_name_prefix="speech")
+    return _executor
+
+
+class SentenceSplitter:
+    """Accumulate streamed text and hand back complete sentences ready for synthesis"""
+
+    def __init__(self, min_chars=MIN_SENTENCE_CHARS, max_chars=MAX_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        """Add streamed text; return the sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            sentence = self.buffer[start:match.start()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+
+        while len(self.buffer) > self.max_chars:
+            cut = self.buffer.rfind(" ", 0, self.max_chars)
+            cut = cut if cut > 0 else self.max_chars
+            sentences.append(self.buffer[:cut].strip())
+            self.buffer = self.buffer[cut:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def _synthesize(synthesize, sentence):
+    try:
+        return synthesize(sentence)
+    except Exception as e:
+        logger.error(f"Sentence synthesis failed: {e}")
+        return None
+
+
+def pipeline_speech(chunks, synthesize, executor=None, splitter=None):
+    """Overlap speech synthesis with text generation.
+
+    Yields ("text", chunk) for every input chunk as it arrives, and ("audio", segment)
+    for each sentence as soon as it and every earlier sentence are synthesized, so
+    segments come out in reading order. A segment is {"index", "text", "result"} where
+    result is synthesize(sentence), or None if it raised.
+    """
+    executor = executor or get_executor()
+    splitter = splitter or SentenceSplitter()
+    pending = deque()
+    submitted = 0
+
+    def submit(sentences):
+        nonlocal submitted
+        for sentence in sentences:
+            pending.append((submitted, sentence, executor.submit(_synthesize, synthesize, sentence)))
+            submitted += 1
+
+    def segment(entry):
+        index, sentence, future = entry
+        return {"index": index, "text": sentence, "result": future.result()}
+
+    for text in chunks:
+        yield "text", text
+        submit(splitter.feed(text))
+        while pending and pending[0][2].done():
+            yield "audio", segment(pending.popleft())
+
+    submit(splitter.flush())
+    while pending:
+        yield "audio", segment(pending.popleft())
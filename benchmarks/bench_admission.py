@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a class asking at once, against a Bedrock quota, with and
+without admission control (admission.py) in front of Bedrock.
+
+--students concurrent requests hit local_server.py's /api/chat. Bedrock is
+simulated: each call takes --bedrock-ms, and calls beyond --quota in flight
+get a ThrottlingException, which BedrockClient then retries on every
+fallback model. Without admission most requests are throttled. Before this
+change they got the canned "unable to access the AI models" text; now
+they get a 429. With admission, requests wait in a bounded queue for a slot
+and only the overflow is turned away with a 429 and Retry-After.
+
+Usage: python benchmarks/bench_admission.py [--students 60] [--quota 6] [--bedrock-ms 600]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from admission import AdmissionController
+from bedrock_client import MODEL_OPTIONS, MODELS_UNAVAILABLE_MESSAGE
+from model_health import ModelHealth
+
+ANSWER = json.dumps({'generation': 'The left ventricle pumps blood to the whole body.'}).encode()
+
+
+class QuotaBedrock:
+    """invoke_model stand-in that throttles calls beyond `quota` in flight"""
+
+    def __init__(self, quota, latency_ms):
+        self.quota = quota
+        self.latency_ms = latency_ms
+        self.in_flight = 0
+        self.calls = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def invoke_model(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            if self.in_flight >= self.quota:
+                self.throttled += 1
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Too many requests'}},
+                                  'InvokeModel')
+            self.in_flight += 1
+        try:
+            time.sleep(self.latency_ms / 1000)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+        return {'body': StreamingBody(io.BytesIO(ANSWER), len(ANSWER))}
+
+
+def ask(number):
+    """(outcome, ms): 'answered', 'canned' or the HTTP status"""
+    start = time.perf_counter()
+    response = local_server.app.test_client().post('/api/chat?audio=lazy', json={
+        'question': f"What does label {number} show?",
+        'original_description': 'A labelled diagram of the human heart.'
+    })
+    ms = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        return response.status_code, ms
+    return ('canned' if response.get_json()['answer'] == MODELS_UNAVAILABLE_MESSAGE else 'answered'), ms
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=60)
+    parser.add_argument('--quota', type=int, default=6, help='Bedrock calls in flight before throttling')
+    parser.add_argument('--bedrock-ms', type=float, default=600)
+    parser.add_argument('--queue-timeout', type=float, default=10)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    logging.disable(logging.ERROR)
+    scenarios = [
+        ('no admission', AdmissionController(max_concurrency=0)),
+        (f'limit {args.quota}, queue 64', AdmissionController(args.quota, 64, args.queue_timeout)),
+        (f'limit {args.quota}, queue 24', AdmissionController(args.quota, 24, args.queue_timeout)),
+        (f'limit {args.quota}, queue 64, 3s', AdmissionController(args.quota, 64, 3))
+    ]
+
+    print(f"🚦 Bedrock admission benchmark ({args.students} students at once, quota {args.quota} in flight, "
+          f"{args.bedrock_ms:g} ms per call)")
+    print("=" * 108)
+    print(f"   {'admission':<24}{'answered':>9}{'canned':>8}{'429':>6}{'throttles':>11}{'answer p50':>12}{'p95':>9}"
+          f"{'429 after':>11}{'peak queue':>12}{'wait p95':>11}")
+    for name, admission in scenarios:
+        bedrock = QuotaBedrock(args.quota, args.bedrock_ms)
+        local_server.bedrock_client.client = bedrock
+        local_server.bedrock_client.health = ModelHealth(MODEL_OPTIONS)
+        local_server.bedrock_client.admission = admission
+        with ThreadPoolExecutor(max_workers=args.students) as pool:
+            results = list(pool.map(ask, range(args.students)))
+        answered = [ms for outcome, ms in results if outcome == 'answered']
+        canned = sum(outcome == 'canned' for outcome, _ in results)
+        rejected = [ms for outcome, ms in results if outcome == 429]
+        stats = admission.stats()
+        wait_p95 = f"{stats['wait_p95_ms']:.0f} ms" if stats['wait_p95_ms'] is not None else '-'
+        print(f"   {name:<24}{len(answered):>9}{canned:>8}{len(rejected):>6}{bedrock.throttled:>11}"
+              f"{percentile(answered, 0.5):>9.0f} ms{percentile(answered, 0.95):>6.0f} ms"
+              f"{percentile(rejected, 0.5):>8.0f} ms{stats['peak_queue_depth']:>12}{wait_p95:>11}")
+    print("\n   canned: the \"unable to access the AI models\" text instead of an answer;"
+          "\n   throttles: ThrottlingExceptions from Bedrock (each a wasted call, fallback models included);"
+          "\n   429 after: median time to the 429; queue-full rejections come back at once, timed-out waits"
+          "\n   after the queue timeout")
+
+
+if __name__ == "__main__":
+    main()
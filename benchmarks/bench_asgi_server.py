@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark: requests per second and latency of follow-up questions
+(/api/chat) at 10, 100 and 500 concurrent students, served by the Flask
+server (local_server.py, werkzeug with a thread per request) and the async
+one (asgi_server.py under uvicorn).
+
+AWS is stubbed with fixed latencies: Bedrock answers after --bedrock-ms and
+Polly synthesizes after --polly-ms; each question is unique, so both are
+called for every request. Each server runs in its own process; the clients
+are asyncio connections in this one, each sending its next request as soon
+as the previous one is answered. Peak threads and RSS of the server process
+are sampled from /proc while the load runs.
+
+Usage: python benchmarks/bench_asgi_server.py [--clients 10 100 500] [--seconds 10] [--bedrock-ms 400]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+SERVERS = ('flask', 'asgi')
+
+
+class SlowBedrock:
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+
+    def invoke_model(self, body, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        # A distinct answer per prompt, so Polly is called for each one
+        prompt = hashlib.sha1(body.encode()).hexdigest()[:12]
+        response = json.dumps({'content': [{'text': f"Here is what the diagram shows ({prompt})."}]}).encode()
+        return {'body': StreamingBody(io.BytesIO(response), len(response))}
+
+
+class SlowPolly:
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+
+    def describe_voices(self, **kwargs):
+        return {'Voices': [{'Id': 'Joanna', 'LanguageCode': 'en-US', 'SupportedEngines': ['neural', 'standard']}]}
+
+    def synthesize_speech(self, Text, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        audio = b'\xff\xf3' * 2048
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio))}
+
+
+def serve(args):
+    """Run one server with stubbed AWS clients on --port (in a child process)"""
+    import logging
+    import local_server
+    from audio_cache import AudioCache, LocalAudioStore
+
+    logging.disable(logging.WARNING)
+    local_server.bedrock_client.client = SlowBedrock(args.bedrock_ms)
+    local_server.polly_client.client = SlowPolly(args.polly_ms)
+    directory = tempfile.mkdtemp()
+    local_server.polly_client.cache = local_server.audio_cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+    if args.serve == 'flask':
+        local_server.app.run(host='127.0.0.1', port=args.port, threaded=True)
+    else:
+        import uvicorn
+        import asgi_server
+        uvicorn.run(asgi_server.app, host='127.0.0.1', port=args.port, log_level='warning', backlog=2048)
+
+
+async def ask(port, number):
+    """One /api/chat request on a fresh connection (the werkzeug server closes it after each response)"""
+    body = json.dumps({
+        'question': f"What does label {number} point to?",
+        'original_description': 'A labelled diagram of the human heart.',
+        'audio_delivery': 'url'
+    }).encode()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(b'POST /api/chat HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                     b'Connection: close\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return response.startswith((b'HTTP/1.1 200', b'HTTP/1.0 200'))
+
+
+async def load(port, clients, seconds):
+    """(latencies in ms, errors) of `clients` concurrent clients asking for `seconds`"""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    counter = iter(range(10 ** 9))
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = await ask(port, next(counter))
+            except OSError:
+                ok = False
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += not ok
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, errors
+
+
+def process_status(pid):
+    """(threads, RSS in MB) of a process, from /proc"""
+    fields = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            fields[name] = value.split()
+    return int(fields['Threads'][0]), int(fields['VmRSS'][0]) / 1024
+
+
+async def sample_status(pid, peak):
+    while True:
+        threads, rss = process_status(pid)
+        peak['threads'] = max(peak['threads'], threads)
+        peak['rss'] = max(peak['rss'], rss)
+        await asyncio.sleep(0.1)
+
+
+async def measure(pid, port, clients, seconds):
+    peak = {'threads': 0, 'rss': 0}
+    sampler = asyncio.ensure_future(sample_status(pid, peak))
+    began = time.perf_counter()
+    latencies, errors = await load(port, clients, seconds)
+    elapsed = time.perf_counter() - began
+    sampler.cancel()
+    return latencies, errors, elapsed, peak
+
+
+def wait_until_listening(port, server):
+    for _ in range(300):
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--seconds', type=float, default=10, help='load duration per concurrency level')
+    parser.add_argument('--bedrock-ms', type=float, default=400)
+    parser.add_argument('--polly-ms', type=float, default=150)
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--serve', choices=SERVERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args)
+
+    print(f"⚡ ASGI serving benchmark (/api/chat, Bedrock {args.bedrock_ms:g} ms + Polly {args.polly_ms:g} ms stubbed, "
+          f"{args.seconds:g} s per level)")
+    print("=" * 84)
+    print(f"   {'server':<8}{'clients':>8}{'req/s':>9}{'p50':>10}{'p95':>10}{'errors':>8}"
+          f"{'peak threads':>14}{'peak RSS':>13}")
+    for name in SERVERS:
+        server = subprocess.Popen(
+            [sys.executable, __file__, '--serve', name, '--port', str(args.port), '--bedrock-ms', str(args.bedrock_ms),
+             '--polly-ms', str(args.polly_ms)],
+            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            wait_until_listening(args.port, server)
+            for clients in args.clients:
+                latencies, errors, elapsed, peak = asyncio.run(measure(server.pid, args.port, clients, args.seconds))
+                print(f"   {name:<8}{clients:>8}{len(latencies) / elapsed:>9.1f}{percentile(latencies, 0.5):>7.0f} ms"
+                      f"{percentile(latencies, 0.95):>7.0f} ms{errors:>8}{peak['threads']:>14}{peak['rss']:>10.0f} MB")
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"\n   floor per request: {args.bedrock_ms + args.polly_ms:g} ms of stubbed AWS latency;"
+          f"\n   flask: one thread per connection; asgi: one event loop, AWS calls on ASGI_AWS_WORKERS threads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Polly calls and latency for on-demand audio with and without the
+content-addressed audio cache.
+
+The workload mixes canned fallback texts (identical for every student) with
+descriptions that are listened to again (--replays extra "Listen" presses per
+description). Requests go through local_server.py's /api/generate-audio with
+Polly simulated (a round trip plus a cost per character) and the cache in a
+temporary directory standing in for S3.
+
+Usage: python benchmarks/bench_audio_cache.py [--requests 150] [--replays 2]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from bench_speech_pipeline import SENTENCE, SimulatedPolly
+
+FALLBACKS = [
+    "I'm sorry, I couldn't analyze this image right now. Please try again in a moment.",
+    "This image appears to contain educational content. Please try uploading it again for a detailed description.",
+    "Thank you for your question. Let me explain this concept in more detail."
+]
+
+
+class CountingPolly(SimulatedPolly):
+    def __init__(self, base_ms, ms_per_char):
+        super().__init__(base_ms, ms_per_char)
+        self.calls = 0
+
+    def synthesize_speech(self, Text, **kwargs):
+        self.calls += 1
+        return super().synthesize_speech(Text, **kwargs)
+
+
+def workload(args):
+    rng = random.Random(3)
+    texts = []
+    while len(texts) < args.requests:
+        if rng.random() < args.fallback_rate:
+            texts.append(rng.choice(FALLBACKS))
+        else:
+            description = f"{SENTENCE} ({len(texts)}). " * 6
+            texts += [description] * (1 + args.replays)
+    return texts[:args.requests]
+
+
+def run(label, args, texts, cache):
+    polly = CountingPolly(args.polly_base_ms, args.polly_ms_per_char)
+    local_server.polly_client.client = polly
+    local_server.polly_client.cache = cache
+    client = local_server.app.test_client()
+
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        response = client.post('/api/generate-audio', json={'text': text})
+        assert response.get_json()['success']
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"   {label:<20}{polly.calls:>12}{sum(latencies) / len(latencies):>11.0f} ms"
+          f"{latencies[len(latencies) // 2]:>11.0f} ms")
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=150)
+    parser.add_argument('--replays', type=int, default=2, help='extra plays of each description')
+    parser.add_argument('--fallback-rate', type=float, default=0.2)
+    parser.add_argument('--polly-base-ms', type=float, default=150)
+    parser.add_argument('--polly-ms-per-char', type=float, default=0.5)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    texts = workload(args)
+
+    print(f"💾 Audio cache benchmark ({args.requests} requests, {len(set(texts))} distinct texts, "
+          f"Polly {args.polly_base_ms:g} ms + {args.polly_ms_per_char:g} ms/char)")
+    print("=" * 64)
+    print(f"   {'':<20}{'Polly calls':>12}{'mean':>14}{'p50':>14}")
+    run("no cache", args, texts, None)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = run("audio cache", args, texts, AudioCache(LocalAudioStore(directory, base_url='/audio')))
+        stats = cache.stats()
+    print()
+    print(f"   hit ratio {stats['hit_ratio']:.1%}, {stats['bytes_served'] / 1024:.0f} KiB served from cache, "
+          f"{stats['bytes_synthesized'] / 1024:.0f} KiB synthesized")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: response size and client-side decode time for audio delivered as
+base64 inside the JSON body against a URL to the stored audio.
+
+Requests go through local_server.py's /api/generate-audio with Polly
+simulated (--bytes-per-char of MP3 per character, roughly 48 kbit/s neural
+speech) and the audio store in a temporary directory. Client decode mirrors
+script.js: base64 mode parses the JSON, then atob() and the per-character copy
+in base64ToBlob; URL mode only parses the JSON and hands the URL to <audio>.
+
+Usage: python benchmarks/bench_audio_delivery.py [--chars 500 1500 3000] [--repeats 5]
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from bench_speech_pipeline import SENTENCE
+
+# Lambda's synchronous response payload limit
+LAMBDA_RESPONSE_LIMIT = 6 * 1024 * 1024
+
+
+class SizedPolly:
+    """Polly stand-in returning audio proportional to the text, without delay"""
+
+    def __init__(self, bytes_per_char):
+        self.bytes_per_char = bytes_per_char
+
+    def synthesize_speech(self, Text, **kwargs):
+        audio = os.urandom(int(len(Text) * self.bytes_per_char))
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio)), 'ContentType': 'audio/mpeg'}
+
+
+def decode_like_browser(payload):
+    result = json.loads(payload)
+    if 'audio_base64' in result:
+        # atob() then base64ToBlob's charCodeAt loop into a byte array
+        characters = base64.b64decode(result['audio_base64']).decode('latin-1')
+        bytearray(ord(character) for character in characters)
+    return result
+
+
+def measure(client, text, delivery):
+    start = time.perf_counter()
+    response = client.post('/api/generate-audio', json={'text': text, 'audio_delivery': delivery})
+    server_ms = (time.perf_counter() - start) * 1000
+    payload = response.get_data()
+    start = time.perf_counter()
+    result = decode_like_browser(payload)
+    decode_ms = (time.perf_counter() - start) * 1000
+    assert result['success'] and ('audio_base64' in result) == (delivery == 'base64')
+    return len(payload), server_ms, decode_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chars', type=int, nargs='+', default=[500, 1500, 3000])
+    parser.add_argument('--bytes-per-char', type=float, default=400)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.polly_client.client = SizedPolly(args.bytes_per_char)
+    client = local_server.app.test_client()
+
+    print(f"🔗 Audio delivery benchmark ({args.bytes_per_char:g} bytes of MP3 per character)")
+    print("=" * 72)
+    print(f"   {'text':<8}{'mode':<10}{'response':>14}{'of 6 MB':>10}{'server':>12}{'client decode':>16}")
+    with tempfile.TemporaryDirectory() as directory:
+        local_server.polly_client.cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+        for chars in args.chars:
+            for delivery in ('base64', 'url'):
+                samples = []
+                for i in range(args.repeats):
+                    # Fresh text every time, so each request synthesizes and stores its audio
+                    text = (f"{SENTENCE} ({delivery} {i}). " * (chars // len(SENTENCE) + 1))[:chars]
+                    samples.append(measure(client, text, delivery))
+                size = statistics.median(s[0] for s in samples)
+                server_ms = statistics.median(s[1] for s in samples)
+                decode_ms = statistics.median(s[2] for s in samples)
+                print(f"   {chars:<8}{delivery:<10}{int(size):>12,} B{size / LAMBDA_RESPONSE_LIMIT:>10.1%}"
+                      f"{server_ms:>9.1f} ms{decode_ms:>13.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
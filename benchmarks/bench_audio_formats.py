@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bytes per minute of speech for each audio tier (audio_profile),
+requested through local_server.py's /api/generate-audio, and what the
+format negotiation picks for typical Accept headers.
+
+Offline, Polly is simulated at the nominal bitrate of each format (about 15
+characters of speech per second); PCM is exact. With --live, the real Polly
+API is called (AWS credentials needed) and the duration is read from the
+audio itself: MP3 frame headers, the last Ogg page's granule position, or
+the PCM sample count.
+
+Usage: python benchmarks/bench_audio_formats.py [--chars 1500] [--live]
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import tempfile
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from audio_formats import PROFILES, negotiate
+from bench_long_speech import PARAGRAPH
+from long_speech import _frame_info, _id3v2_length
+
+# Assumed encoder bitrates (kbit/s) for the offline run; --live measures the real ones
+NOMINAL_KBPS = {
+    ('mp3', '24000'): 48, ('mp3', '22050'): 48, ('mp3', '16000'): 32, ('mp3', '8000'): 16,
+    ('ogg_vorbis', '24000'): 40, ('ogg_vorbis', '22050'): 40, ('ogg_vorbis', '16000'): 24, ('ogg_vorbis', '8000'): 12
+}
+CHARS_PER_SECOND = 15
+
+ACCEPT_EXAMPLES = [
+    ('Firefox/Chrome <audio>', 'audio/webm,audio/ogg,audio/wav,audio/*;q=0.9', 'low'),
+    ('Safari, no Vorbis', 'audio/mpeg, audio/mp4;q=0.9', 'low'),
+    ('native client', 'audio/pcm', None),
+    ('fetch() default', '*/*', None)
+]
+
+
+class NominalPolly:
+    """Polly stand-in returning audio of the format's nominal size for the text's duration"""
+
+    def synthesize_speech(self, Text, OutputFormat, SampleRate, **kwargs):
+        seconds = len(Text) / CHARS_PER_SECOND
+        if OutputFormat == 'pcm':
+            size = int(seconds * int(SampleRate)) * 2
+        else:
+            size = int(seconds * NOMINAL_KBPS[(OutputFormat, SampleRate)] * 125)
+        audio = os.urandom(size)
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio))}
+
+
+def audio_seconds(audio, output_format, sample_rate):
+    """Playing time of real Polly output"""
+    if output_format == 'pcm':
+        return len(audio) / 2 / int(sample_rate)
+    if output_format == 'ogg_vorbis':
+        # The last page's granule position is the stream's total sample count
+        page = audio.rfind(b'OggS')
+        return int.from_bytes(audio[page + 6:page + 14], 'little') / int(sample_rate)
+    position, samples = _id3v2_length(audio), 0
+    while position < len(audio):
+        info = _frame_info(audio, position)
+        if info is None:
+            position += 1
+            continue
+        # MPEG-1 frames hold 1152 samples, MPEG-2/2.5 frames 576
+        samples += 1152 if (audio[position + 1] >> 3) & 0x3 == 3 else 576
+        position += info[0]
+    return samples / int(sample_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chars', type=int, default=1500)
+    parser.add_argument('--live', action='store_true', help='call the real Polly API')
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    if not args.live:
+        local_server.polly_client.client = NominalPolly()
+    client = local_server.app.test_client()
+    text = (PARAGRAPH * (args.chars // len(PARAGRAPH) + 1))[:args.chars]
+
+    print(f"🎚️  Audio tier benchmark ({args.chars} characters, {'live Polly' if args.live else 'nominal bitrates'})")
+    print("=" * 72)
+    print(f"   {'profile':<10}{'format':<12}{'rate':>7}{'kbit/s':>9}{'bytes/min':>13}{'vs standard':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        local_server.polly_client.cache = local_server.audio_cache = AudioCache(LocalAudioStore(directory))
+        standard = None
+        for profile, (output_format, sample_rate) in PROFILES.items():
+            result = client.post('/api/generate-audio', json={
+                'text': text, 'audio_delivery': 'base64', 'audio_profile': profile
+            }).get_json()
+            assert result['success'], result
+            audio = base64.b64decode(result['audio_base64'])
+            seconds = audio_seconds(audio, output_format, sample_rate) if args.live else len(text) / CHARS_PER_SECOND
+            per_minute = len(audio) / seconds * 60
+            standard = standard or per_minute
+            print(f"   {profile:<10}{output_format:<12}{sample_rate:>7}{per_minute * 8 / 60000:>9.0f}"
+                  f"{int(per_minute):>13,}{per_minute / standard:>13.0%}")
+
+    print()
+    print(f"   {'client':<24}{'Accept':<46}{'profile':<9}{'gets':>12}")
+    for name, accept, profile in ACCEPT_EXAMPLES:
+        output_format, sample_rate = negotiate(accept=accept, profile=profile)
+        print(f"   {name:<24}{accept[:44]:<46}{profile or 'default':<9}{output_format + '@' + sample_rate:>12}")
+
+
+if __name__ == "__main__":
+    main()
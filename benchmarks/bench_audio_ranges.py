@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serving cached audio to a student who scrubs back to re-listen,
+with the previous /audio/<key> route (send_from_directory) and the current
+one (strong ETag, Cache-Control: immutable, ranges sliced from a memory map).
+
+Part 1 times random Range requests against a cached file. Part 2 replays a
+listening session: the browser caches the file, and between replays other
+requests find the same audio in the cache (which touches its mtime for LRU
+eviction). It counts the requests and bytes that reach the server. A
+browser cache is simulated: it revalidates responses without max-age and
+never asks again for immutable ones.
+
+Usage: python benchmarks/bench_audio_ranges.py [--minutes 10] [--seeks 2000] [--replays 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from flask import send_from_directory
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore, content_type_for, make_audio_key
+
+SEEK_BYTES = 64 * 1024
+
+
+def previous_route(key):
+    """/audio/<key> as it was: Flask's conditional send_from_directory"""
+    return send_from_directory(local_server.audio_cache.store.directory, key, mimetype=content_type_for(key))
+
+
+def seeks(client, prefix, key, size, count):
+    """Median ms per Range request"""
+    times = []
+    for _ in range(count):
+        start = random.randrange(0, size - SEEK_BYTES)
+        began = time.perf_counter()
+        response = client.get(f'{prefix}/{key}', headers={'Range': f'bytes={start}-{start + SEEK_BYTES - 1}'})
+        assert response.status_code == 206 and len(response.data) == SEEK_BYTES
+        times.append((time.perf_counter() - began) * 1000)
+    return sorted(times)[len(times) // 2]
+
+
+def session(client, prefix, key, replays):
+    """(requests, bytes) reaching the server over a first play and `replays` re-listens"""
+    requests, sent, etag, immutable = 0, 0, None, False
+    for _ in range(replays + 1):
+        if immutable:
+            continue
+        # Another request finds this audio in the cache in the meantime (an LRU touch)
+        time.sleep(0.01)
+        local_server.audio_cache.size(key)
+        response = client.get(f'{prefix}/{key}', headers={'If-None-Match': etag} if etag else {})
+        requests += 1
+        sent += len(response.data)
+        etag = response.headers.get('ETag', etag)
+        immutable = 'immutable' in response.headers.get('Cache-Control', '')
+    return requests, sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=10, help='minutes of 48 kbit/s speech')
+    parser.add_argument('--seeks', type=int, default=2000)
+    parser.add_argument('--replays', type=int, default=20)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.app.add_url_rule('/previous-audio/<key>', 'previous_audio', previous_route)
+    client = local_server.app.test_client()
+    size = int(args.minutes * 60 * 48 * 125)
+
+    with tempfile.TemporaryDirectory() as directory:
+        local_server.audio_cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+        key = make_audio_key('benchmark narration', 'Joanna', 'neural', 'mp3', '24000')
+        local_server.audio_cache.put(key, os.urandom(size))
+
+        print(f"⏩ Cached audio serving benchmark ({size / 1024 / 1024:.1f} MB file, {args.seeks} seeks of "
+              f"{SEEK_BYTES // 1024} KiB, {args.replays} re-listens)")
+        print("=" * 72)
+        print(f"   {'route':<22}{'seek p50':>11}{'requests':>11}{'bytes sent':>14}")
+        for name, prefix in (('send_from_directory', '/previous-audio'), ('immutable + mmap', '/audio')):
+            seek_ms = seeks(client, prefix, key, size, args.seeks)
+            requests, sent = session(client, prefix, key, args.replays)
+            print(f"   {name:<22}{seek_ms:>8.2f} ms{requests:>11}{sent:>14,}")
+    print("\n   requests/bytes: over the first play and the re-listens; the previous ETag includes the"
+          "\n   file's mtime, so an LRU touch makes revalidation download the whole file again")
+
+
+if __name__ == "__main__":
+    main()
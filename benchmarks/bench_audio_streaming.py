@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first audio byte and peak memory when Polly's AudioStream
+is forwarded in chunks (/api/stream-audio) instead of read whole first
+(/api/generate-audio with base64 or URL delivery).
+
+Polly is simulated: its AudioStream starts after a round trip and then
+arrives at a fixed rate, like the real service producing speech faster than
+real time. Each delivery runs in a fresh process so its peak RSS (ru_maxrss)
+is its own; the growth over the idle server is reported.
+
+Usage: python benchmarks/bench_audio_streaming.py [--minutes 20] [--kbps 48] [--mb-per-s 4]
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+from bench_long_speech import PARAGRAPH
+
+CHARS_PER_SECOND = 15
+FRAME_HEADER = b'\xff\xf3\x64\xc4'  # MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono: 144-byte frames
+
+DELIVERIES = {
+    'base64': ('/api/generate-audio', {'audio_delivery': 'base64'}),
+    'url': ('/api/generate-audio', {'audio_delivery': 'url'}),
+    'streamed': ('/api/stream-audio', {})
+}
+
+
+class PacedStream(io.RawIOBase):
+    """An HTTP body that delivers `size` bytes of MP3 frames at `bytes_per_s`"""
+
+    def __init__(self, size, bytes_per_s):
+        self.remaining = size
+        self.bytes_per_s = bytes_per_s
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self.remaining, 16384)
+        if not count:
+            return 0
+        time.sleep(count / self.bytes_per_s)
+        frames = (FRAME_HEADER + bytes(140)) * (count // 144 + 1)
+        buffer[:count] = frames[:count]
+        self.remaining -= count
+        return count
+
+
+class StreamingPolly:
+    def __init__(self, round_trip_ms, kbps, bytes_per_s):
+        self.round_trip_ms = round_trip_ms
+        self.kbps = kbps
+        self.bytes_per_s = bytes_per_s
+
+    def describe_voices(self, **kwargs):
+        return {'Voices': [{'Id': 'Joanna', 'LanguageCode': 'en-US', 'SupportedEngines': ['neural', 'standard']}]}
+
+    def synthesize_speech(self, Text, **kwargs):
+        time.sleep(self.round_trip_ms / 1000)
+        size = int(len(Text) / CHARS_PER_SECOND * self.kbps * 125) // 144 * 144
+        return {'AudioStream': StreamingBody(io.BufferedReader(PacedStream(size, self.bytes_per_s)), size)}
+
+
+def max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def drain(response):
+    """(time of the first body byte, body size, body if it is a JSON reply) of a streamed response"""
+    first_byte, size, pieces = None, 0, []
+    for piece in response.response:
+        first_byte = first_byte or time.perf_counter()
+        size += len(piece)
+        if response.mimetype == 'application/json':
+            pieces.append(piece)
+    response.close()
+    return first_byte, size, b''.join(pieces)
+
+
+def measure(args):
+    """One delivery in this process: prints {"first_byte_ms", "total_ms", "bytes", "rss_growth_mb"}"""
+    import local_server
+    from audio_cache import AudioCache, LocalAudioStore
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.polly_client.client = StreamingPolly(args.round_trip_ms, args.kbps, args.mb_per_s * 1024 * 1024)
+    client = local_server.app.test_client()
+    text = (PARAGRAPH * (int(args.minutes * 60 * CHARS_PER_SECOND) // len(PARAGRAPH) + 1))
+    text = text[:int(args.minutes * 60 * CHARS_PER_SECOND)]
+    path, extra = DELIVERIES[args.measure]
+
+    with tempfile.TemporaryDirectory() as directory:
+        local_server.polly_client.cache = local_server.audio_cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+        baseline = max_rss_mb()
+        start = time.perf_counter()
+        response = client.post(path, json={'text': text, **extra}, buffered=False)
+        first_byte, size, body = drain(response)
+        if args.measure == 'url':
+            # The player then fetches the stored file
+            first_byte, size, _ = drain(client.get(json.loads(body)['audio_url'], buffered=False))
+        print(json.dumps({
+            'first_byte_ms': (first_byte - start) * 1000,
+            'total_ms': (time.perf_counter() - start) * 1000,
+            'bytes': size,
+            'rss_growth_mb': max_rss_mb() - baseline
+        }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=20, help='minutes of speech')
+    parser.add_argument('--kbps', type=int, default=48, help='MP3 bitrate')
+    parser.add_argument('--mb-per-s', type=float, default=4, help='rate Polly streams audio at')
+    parser.add_argument('--round-trip-ms', type=float, default=150)
+    parser.add_argument('--measure', choices=DELIVERIES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        return measure(args)
+
+    size_mb = args.minutes * 60 * args.kbps * 125 / 1024 / 1024
+    print(f"🌊 Audio streaming benchmark ({args.minutes:g} min of speech, {size_mb:.1f} MB MP3, "
+          f"Polly streaming at {args.mb_per_s:g} MB/s)")
+    print("=" * 72)
+    print(f"   {'delivery':<11}{'first byte':>13}{'complete':>12}{'body':>12}{'peak RSS growth':>18}")
+    for delivery, (path, _) in DELIVERIES.items():
+        output = subprocess.run(
+            [sys.executable, __file__, '--measure', delivery, '--minutes', str(args.minutes), '--kbps', str(args.kbps),
+             '--mb-per-s', str(args.mb_per_s), '--round-trip-ms', str(args.round_trip_ms)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"   {delivery:<11}{result['first_byte_ms']:>10.0f} ms{result['total_ms']:>9.0f} ms"
+              f"{result['bytes'] / 1024 / 1024:>9.1f} MB{result['rss_growth_mb']:>15.1f} MB")
+    print("\n   first byte: when the player can start; base64 and url wait for the whole synthesis."
+          "\n   complete: streamed chunks are synthesized one ahead instead of all at once, which only"
+          "\n   has to stay ahead of playback")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-invocation latency of creating AWS clients inside the handler
+versus reusing the process-wide clients from aws_clients.py.
+
+Both paths call a stubbed Bedrock endpoint (botocore Stubber), so no AWS
+credentials or network access are needed. The stub removes the network, which
+means the numbers show client construction cost only (service model loading,
+endpoint resolution, event hooks). Use --handshake-ms to add a modeled TLS
+handshake that the old path pays on every invocation and the new path once.
+
+Usage: python benchmarks/bench_client_registry.py [--invocations 200]
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import boto3
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import aws_clients
+from description_cache import DescriptionCache
+
+RESPONSE = json.dumps({"content": [{"text": "A labelled diagram of the human heart."}]}).encode()
+EVENT = {'body': json.dumps({'image': 'data:image/jpeg;base64,' + 'A' * 1024})}
+
+
+def stub_invoke(stubber):
+    stubber.add_response('invoke_model', {
+        'body': StreamingBody(io.BytesIO(RESPONSE), len(RESPONSE)),
+        'contentType': 'application/json'
+    })
+
+
+def load_handler():
+    """Import the optimized image handler by path (its name clashes with utils/image_processor.py)"""
+    path = os.path.join(ROOT, 'backend', 'lambda_functions', 'image_processor_optimized.py')
+    spec = importlib.util.spec_from_file_location('image_processor_optimized', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def old_invocation(handshake_s):
+    """Previous behaviour: a fresh client for every request"""
+    bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    time.sleep(handshake_s)
+    with Stubber(bedrock) as stubber:
+        stub_invoke(stubber)
+        response = bedrock.invoke_model(
+            modelId="anthropic.claude-3-sonnet-20240229-v1:0",
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps({"messages": []})
+        )
+        json.loads(response["body"].read())
+
+
+def run(label, fn, invocations):
+    samples = []
+    for _ in range(invocations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    print(f"   {label:<28} mean {statistics.mean(samples):7.2f} ms   "
+          f"p50 {samples[len(samples) // 2]:7.2f} ms   "
+          f"p99 {samples[int(len(samples) * 0.99) - 1]:7.2f} ms")
+    return statistics.mean(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--invocations', type=int, default=200)
+    parser.add_argument('--handshake-ms', type=float, default=0.0,
+                        help='modeled TLS handshake cost per new connection')
+    args = parser.parse_args()
+    handshake_s = args.handshake_ms / 1000
+
+    print("⏱️  AWS client registry benchmark")
+    print("=" * 50)
+
+    # Cold start: the first client in a fresh process also loads the service model from disk
+    start = time.perf_counter()
+    aws_clients.reset_clients()
+    handler = load_handler()
+    print(f"   Cold init (import + first client): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Every invocation must reach Bedrock, so run the handler without a description cache
+    handler.description_cache = DescriptionCache([])
+
+    # Warm handler with the shared client stubbed once for the container lifetime
+    stubber = Stubber(handler.bedrock)
+    stubber.activate()
+    first_call = [True]
+
+    def new_invocation():
+        stub_invoke(stubber)
+        if first_call[0]:
+            time.sleep(handshake_s)
+            first_call[0] = False
+        result = handler.lambda_handler(EVENT, None)
+        assert result['statusCode'] == 200, result
+
+    old_mean = run("per-invocation client", lambda: old_invocation(handshake_s), args.invocations)
+    new_mean = run("shared client (registry)", new_invocation, args.invocations)
+
+    print("-" * 50)
+    print(f"   Saved per warm invocation: {old_mean - new_mean:.2f} ms ({old_mean / new_mean:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark: failed requests and latency by engine when Polly's neural engine
+is throttled, with and without the engine policy (engine_policy.py).
+
+Concurrent students request audio through local_server.py's
+/api/generate-audio: short UI utterances and longer descriptions, each text
+unique so the audio cache never answers. Polly is simulated: neural is
+slower than standard and throws ThrottlingException above a concurrency
+limit. Without the policy a throttled call is a 500 ("Audio generation
+failed"); with it the request is retried on the standard engine, and short
+text or an already throttled engine can go to standard first.
+
+Usage: python benchmarks/bench_engine_policy.py [--students 12] [--requests 10] [--neural-limit 4]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import audio_cache as audio_cache_module
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from bench_long_speech import PARAGRAPH
+from engine_policy import EnginePolicy
+
+UTTERANCE = "Image uploaded. Analyzing your diagram now."
+
+# (base ms, ms per character) by engine
+LATENCY = {'neural': (250, 0.6), 'standard': (90, 0.25)}
+
+
+class ThrottlingPolly:
+    """Polly stand-in: neural is slower and throttles above `neural_limit` concurrent calls"""
+
+    def __init__(self, neural_limit):
+        self.neural_limit = neural_limit
+        self.neural_in_flight = 0
+        self.lock = threading.Lock()
+
+    def describe_voices(self, **kwargs):
+        return {'Voices': [{'Id': 'Joanna', 'LanguageCode': 'en-US', 'SupportedEngines': ['neural', 'standard']}]}
+
+    def synthesize_speech(self, Text, Engine, **kwargs):
+        if Engine == 'neural':
+            with self.lock:
+                throttled = self.neural_in_flight >= self.neural_limit
+                if not throttled:
+                    self.neural_in_flight += 1
+            if throttled:
+                time.sleep(0.03)
+                raise ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}},
+                                  'SynthesizeSpeech')
+        base_ms, ms_per_char = LATENCY[Engine]
+        try:
+            time.sleep((base_ms + ms_per_char * len(Text)) / 1000)
+        finally:
+            if Engine == 'neural':
+                with self.lock:
+                    self.neural_in_flight -= 1
+        audio = b'\xff\xfb' * len(Text)
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio))}
+
+
+class NeuralOnly(EnginePolicy):
+    """Today's behaviour: every request on neural, no fallback"""
+
+    def engines_for(self, polly, text, voice_id="Joanna", engine="neural"):
+        return [engine]
+
+
+def student(number, requests):
+    """(kind, ms, ok) for each request one student makes"""
+    results = []
+    for i in range(requests):
+        kind = 'utterance' if i % 2 == 0 else 'description'
+        text = f"{UTTERANCE} ({number}.{i})" if kind == 'utterance' else f"{PARAGRAPH[:600]} ({number}.{i})"
+        start = time.perf_counter()
+        response = local_server.app.test_client().post('/api/generate-audio', json={
+            'text': text, 'audio_delivery': 'url'
+        })
+        results.append((kind, (time.perf_counter() - start) * 1000, response.status_code == 200))
+    return results
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=12)
+    parser.add_argument('--requests', type=int, default=10, help='requests per student')
+    parser.add_argument('--neural-limit', type=int, default=4, help='concurrent neural calls before throttling')
+    parser.add_argument('--short-chars', type=int, default=80, help='POLLY_STANDARD_MAX_CHARS for the tiered run')
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    # Every throttled call logs an error or a fallback warning
+    logging.disable(logging.ERROR)
+    scenarios = [
+        ('neural only', NeuralOnly()),
+        ('fallback', EnginePolicy(standard_max_chars=0, neural_max_in_flight=0, cooldown=0)),
+        ('cooldown', EnginePolicy(standard_max_chars=0, neural_max_in_flight=0, cooldown=2)),
+        ('load', EnginePolicy(standard_max_chars=0, neural_max_in_flight=args.neural_limit, cooldown=0)),
+        ('load + short', EnginePolicy(standard_max_chars=args.short_chars, neural_max_in_flight=args.neural_limit,
+                                      cooldown=0))
+    ]
+
+    total = args.students * args.requests
+    print(f"🎙️  Polly engine policy benchmark ({args.students} students x {args.requests} requests, "
+          f"neural throttled above {args.neural_limit} concurrent calls)")
+    print("=" * 92)
+    print(f"   {'policy':<13}{'failed':>8}{'neural':>8}{'standard':>10}{'throttled':>11}"
+          f"{'utterance p50':>15}{'description p50':>17}{'p95':>9}")
+    for name, policy in scenarios:
+        with tempfile.TemporaryDirectory() as directory:
+            polly = ThrottlingPolly(args.neural_limit)
+            cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+            local_server.polly_client.client = polly
+            local_server.polly_client.cache = local_server.audio_cache = cache
+            audio_cache_module.ENGINE_POLICY = policy
+            with ThreadPoolExecutor(max_workers=args.students) as pool:
+                runs = pool.map(lambda number: student(number, args.requests), range(args.students))
+                results = [result for run in runs for result in run]
+        engines = policy.stats()['engines']
+        failed = sum(1 for _, _, ok in results if not ok)
+        succeeded = {kind: [ms for k, ms, ok in results if k == kind and ok] for kind in ('utterance', 'description')}
+        neural = engines['neural']['calls'] - engines['neural']['failures']
+        standard = engines['standard']['calls'] - engines['standard']['failures']
+        print(f"   {name:<13}{failed:>8}{neural:>8}{standard:>10}{engines['neural']['failures']:>11}"
+              f"{percentile(succeeded['utterance'], 0.5):>12.0f} ms{percentile(succeeded['description'], 0.5):>14.0f} ms"
+              f"{percentile([ms for _, ms, ok in results if ok], 0.95):>6.0f} ms")
+    print(f"\n   failed: 500s out of {total}; neural/standard: successful synthesis calls by engine;"
+          f"\n   throttled: neural calls rejected (each a wasted round trip before the fallback);"
+          f"\n   cooldown: standard first for 2 s after a throttle; load: standard first at {args.neural_limit} neural"
+          f" calls in flight;\n   short: text up to {args.short_chars} characters on standard")
+
+
+if __name__ == "__main__":
+    main()
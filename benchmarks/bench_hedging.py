@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Bedrock latency percentiles and extra load with hedged requests,
+against a stub whose latency is heavy tailed: log-normal around --median-ms,
+with --stall-rate of calls stalling for --stall-factor times longer (the
+occasional very slow response that dominates p99).
+
+Every configuration sends the same number of requests through
+hedged_invoke_model; the stub sleeps scaled-down latencies (--time-scale) and
+results are reported at full scale.
+
+Usage: python benchmarks/bench_hedging.py [--requests 2000] [--stall-rate 0.04]
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+from botocore.response import StreamingBody
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'utils'))
+
+from hedging import HedgeBudget, Hedger, hedged_invoke_model
+
+RESPONSE = json.dumps({"content": [{"text": "A labelled heart diagram."}]}).encode()
+
+
+class HeavyTailBedrock:
+    """invoke_model stand-in with a heavy-tailed latency distribution"""
+
+    def __init__(self, args, seed):
+        self.args = args
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def sample_ms(self):
+        with self.lock:
+            self.calls += 1
+            latency = self.args.median_ms * math.exp(self.rng.gauss(0, 0.3))
+            if self.rng.random() < self.args.stall_rate:
+                latency *= self.args.stall_factor
+            return latency
+
+    def invoke_model(self, **kwargs):
+        time.sleep(self.sample_ms() * self.args.time_scale / 1000)
+        return {'body': StreamingBody(io.BytesIO(RESPONSE), len(RESPONSE))}
+
+
+def run(label, args, hedger):
+    bedrock = HeavyTailBedrock(args, seed=7)
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        hedged_invoke_model(bedrock, "anthropic.claude-3-sonnet-20240229-v1:0", {}, hedger=hedger)
+        latencies.append((time.perf_counter() - start) * 1000 / args.time_scale)
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(int(len(latencies) * p / 100), len(latencies) - 1)]
+    extra = bedrock.calls / args.requests - 1
+    print(f"   {label:<28}{pct(50):>8.0f} ms{pct(95):>8.0f} ms{pct(99):>8.0f} ms{extra * 100:>9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--median-ms', type=float, default=1500)
+    parser.add_argument('--stall-rate', type=float, default=0.04)
+    parser.add_argument('--stall-factor', type=float, default=6.0)
+    parser.add_argument('--time-scale', type=float, default=0.005, help='stub sleeps latency * scale')
+    args = parser.parse_args()
+
+    print(f"🎯 Hedging benchmark ({args.requests} requests, median {args.median_ms:g} ms, "
+          f"{args.stall_rate * 100:g}% stall {args.stall_factor:g}x)")
+    print("=" * 70)
+    print(f"   {'':<28}{'p50':>11}{'p95':>11}{'p99':>11}{'extra load':>11}")
+    initial_delay = args.median_ms * 2
+    run("no hedging", args, Hedger(enabled=False))
+    for percentile, budget in ((95, 0.10), (90, 0.10), (90, 0.15), (85, 0.20)):
+        hedger = Hedger(enabled=True, percentile=percentile, budget=HedgeBudget(budget),
+                        initial_delay_ms=initial_delay * args.time_scale)
+        # The hedger tracks latencies in real (scaled) milliseconds
+        run(f"hedge at p{percentile:g}, budget {budget * 100:g}%", args, hedger)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: wall-clock time of ImageProcessor.process_image_bytes with
+Rekognition and Textract called one after the other, against the concurrent
+mode that runs them side by side on the shared analysis pool.
+
+Both services are real botocore clients answered by Stubber, with a sleep
+before each call standing in for the service round trip. The stall scenario
+makes Textract slower than its deadline: the serial path waits it out, the
+concurrent path returns at the deadline with a partial result.
+
+Usage: python benchmarks/bench_image_fanout.py [--rekognition-ms 450] [--textract-ms 900]
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import time
+
+import boto3
+from botocore.stub import Stubber
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'utils'))
+
+from image_processor import ImageProcessor
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'\x00' * 2048
+LABELS = {'Labels': [{'Name': 'Heart', 'Confidence': 97.5}, {'Name': 'Diagram', 'Confidence': 91.0}]}
+BLOCKS = {'Blocks': [{'BlockType': 'LINE', 'Text': 'Left ventricle'}, {'BlockType': 'LINE', 'Text': 'Aorta'}]}
+
+
+def stubbed_client(service, operation, response, latency_ms):
+    """Client whose every call sleeps latency_ms and returns the stubbed response"""
+    client = boto3.client(service, region_name='us-east-1',
+                          aws_access_key_id='bench', aws_secret_access_key='bench')
+    client.meta.events.register('before-call.*.*', lambda **kwargs: time.sleep(latency_ms / 1000))
+    stubber = Stubber(client)
+    for _ in range(1000):
+        stubber.add_response(operation, response)
+    stubber.activate()
+    return client
+
+
+def run(label, args, concurrent, textract_ms):
+    processor = ImageProcessor(concurrent=concurrent)
+    processor.rekognition = stubbed_client('rekognition', 'detect_labels', LABELS, args.rekognition_ms)
+    processor.textract = stubbed_client('textract', 'detect_document_text', BLOCKS, textract_ms)
+    processor.deadlines['textract'] = args.textract_deadline_ms / 1000
+
+    samples, partial = [], 0
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        result = processor.process_image_bytes(IMAGE)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert result['success']
+        partial += 'partial' in result
+    print(f"   {label:<40}{statistics.median(samples):>9.0f} ms{partial:>6}/{args.repeats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rekognition-ms', type=float, default=450)
+    parser.add_argument('--textract-ms', type=float, default=900)
+    parser.add_argument('--stall-ms', type=float, default=4000, help='Textract latency in the stall scenario')
+    parser.add_argument('--textract-deadline-ms', type=float, default=1500)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    # Missed deadlines would otherwise be logged on every stalled request
+    logging.disable(logging.WARNING)
+
+    print(f"🧩 Image analysis fan-out benchmark (Rekognition {args.rekognition_ms:g} ms, "
+          f"Textract {args.textract_ms:g} ms, deadline {args.textract_deadline_ms:g} ms)")
+    print("=" * 64)
+    print(f"   {'':<40}{'median':>12}{'partial':>9}")
+    run("serial", args, False, args.textract_ms)
+    run("concurrent", args, True, args.textract_ms)
+    run(f"serial, Textract stalls {args.stall_ms:g} ms", args, False, args.stall_ms)
+    run(f"concurrent, Textract stalls {args.stall_ms:g} ms", args, True, args.stall_ms)
+
+
+if __name__ == "__main__":
+    main()
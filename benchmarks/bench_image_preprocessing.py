@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload bytes saved and end-to-end latency change per image from
+downscaling and re-encoding uploads before the Bedrock vision call.
+
+For every image in demo_images/ this times the old path (send the upload as
+is) and the new path (describe_image with prepare_for_vision) against a
+stubbed Bedrock client, so request building and serialization are measured
+for real. Network transfer of the request body is modeled at --bandwidth-mbps
+and added to both paths.
+
+Usage: python benchmarks/bench_image_preprocessing.py [--bandwidth-mbps 50]
+"""
+
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+import boto3
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+from image_analysis import VISION_MODEL_ID, build_vision_body, describe_image
+
+RESPONSE = json.dumps({"content": [{"text": "A labelled educational diagram."}]}).encode()
+
+
+class RecordingStubber(Stubber):
+    """Stubber that remembers the size of each request body it answers"""
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.body_sizes = []
+        self.last_body = None
+        client.meta.events.register('before-call.*.*', self._record, unique_id='record-body')
+
+    def _record(self, params, **kwargs):
+        self.body_sizes.append(len(params['body']))
+        self.last_body = params['body']
+
+    def queue(self):
+        self.add_response('invoke_model', {
+            'body': StreamingBody(io.BytesIO(RESPONSE), len(RESPONSE)),
+            'contentType': 'application/json'
+        })
+
+
+def old_path(bedrock, image_data):
+    image_base64 = base64.b64encode(image_data).decode('utf-8')
+    response = bedrock.invoke_model(
+        modelId=VISION_MODEL_ID,
+        contentType="application/json",
+        accept="application/json",
+        body=json.dumps(build_vision_body(image_base64, "image/jpeg"))
+    )
+    json.loads(response["body"].read())
+
+
+def timed(fn, stubber, repeats):
+    best = None
+    for _ in range(repeats):
+        stubber.queue()
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, stubber.body_sizes[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bandwidth-mbps', type=float, default=50.0,
+                        help='modeled throughput between the handler and Bedrock')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    bytes_per_ms = args.bandwidth_mbps * 1e6 / 8 / 1000
+
+    bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+    stubber = RecordingStubber(bedrock)
+    stubber.activate()
+
+    print(f"🖼️  Vision preprocessing benchmark (transfer modeled at {args.bandwidth_mbps:g} Mbit/s)")
+    print("=" * 104)
+    print(f"   {'image':<22}{'upload':>11}{'old body':>11}{'new body':>11}{'saved':>8}"
+          f"{'old e2e':>11}{'new e2e':>11}{'change':>11}   media type")
+
+    totals = [0, 0]
+    for path in sorted(glob.glob(os.path.join(ROOT, 'demo_images', '*.*'))):
+        if path.endswith('.DS_Store'):
+            continue
+        image_data = open(path, 'rb').read()
+
+        old_ms, old_body = timed(lambda: old_path(bedrock, image_data), stubber, args.repeats)
+        # No cache, so every repeat goes through preprocessing and the stubbed call
+        new_ms, new_body = timed(lambda: describe_image(bedrock, image_data), stubber, args.repeats)
+        media_type = json.loads(stubber.last_body)["messages"][0]["content"][0]["source"]["media_type"]
+
+        old_e2e = old_ms + old_body / bytes_per_ms
+        new_e2e = new_ms + new_body / bytes_per_ms
+        totals[0] += old_body
+        totals[1] += new_body
+        print(f"   {os.path.basename(path)[:21]:<22}{len(image_data) / 1024:>9.0f}KB{old_body / 1024:>9.0f}KB"
+              f"{new_body / 1024:>9.0f}KB{(1 - new_body / old_body) * 100:>7.0f}%"
+              f"{old_e2e:>9.1f}ms{new_e2e:>9.1f}ms{new_e2e - old_e2e:>+9.1f}ms   {media_type}")
+
+    print("-" * 104)
+    print(f"   Request bytes: {totals[0] / 1024:.0f} KB -> {totals[1] / 1024:.0f} KB "
+          f"({(1 - totals[1] / totals[0]) * 100:.0f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local_server.py flooded with large image uploads, with the
+Pillow stages (the perceptual hash's decode and resize) in the request
+threads and on 1..N worker processes (image_workers.py).
+
+Concurrent clients upload copies of a large PNG (demo_images/Heart.png by
+default), each with different trailing bytes so every upload misses the
+exact-match cache and is fingerprinted. AWS is stubbed; after the first
+analysis the near-duplicate index answers. Meanwhile another client polls
+/health, showing how long light requests stall behind the image work.
+Worker counts beyond the machine's cores cannot scale.
+
+Usage: python benchmarks/bench_image_workers.py [--clients 16] [--uploads 64] [--processes 0 1 2 4]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from description_cache import DescriptionCache, MemoryTier
+from image_workers import ImageWorkers
+
+# Trailing bytes that make every upload unique across runs
+UPLOAD_NUMBERS = count()
+
+ANSWER = json.dumps({'content': [{'text': 'A labelled diagram of the human heart.'}]}).encode()
+
+
+class StubAWS:
+    """Rekognition, Textract and Bedrock stand-in answering after latency_ms"""
+
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+
+    def detect_labels(self, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        return {'Labels': [{'Name': 'Diagram', 'Confidence': 95.0}]}
+
+    def detect_document_text(self, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        return {'Blocks': [{'BlockType': 'LINE', 'Text': 'Left ventricle'}]}
+
+    def invoke_model(self, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        return {'body': StreamingBody(io.BytesIO(ANSWER), len(ANSWER))}
+
+
+def upload(image):
+    number = next(UPLOAD_NUMBERS)
+    start = time.perf_counter()
+    response = local_server.app.test_client().post('/api/process-image?audio=lazy', data=image + b'%d' % number,
+                                                   content_type='image/png')
+    assert response.status_code == 200, response.get_json()
+    return (time.perf_counter() - start) * 1000
+
+
+def poll_health(stop, latencies):
+    client = local_server.app.test_client()
+    while not stop.is_set():
+        start = time.perf_counter()
+        client.get('/health')
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.02)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+
+def run(image, processes, args):
+    """(uploads/s, upload p95 ms, /health p95 ms) with `processes` image workers (0: in the request threads)"""
+    workers = ImageWorkers(processes=processes, min_bytes=0)
+    local_server.image_processor.workers = workers
+    if processes:
+        # Start the worker processes before timing
+        with ThreadPoolExecutor(max_workers=processes) as pool:
+            list(pool.map(workers.fingerprint, [image] * processes))
+
+    stop, health = threading.Event(), []
+    poller = threading.Thread(target=poll_health, args=(stop, health))
+    poller.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        latencies = list(pool.map(lambda _: upload(image), range(args.uploads)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    poller.join()
+    workers.shutdown()
+    return args.uploads / elapsed, percentile(latencies, 0.95), percentile(health, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', default=os.path.join(ROOT, 'demo_images', 'Heart.png'))
+    parser.add_argument('--clients', type=int, default=16, help='concurrent uploads')
+    parser.add_argument('--uploads', type=int, default=64)
+    parser.add_argument('--processes', type=int, nargs='+',
+                        default=[0] + [2 ** i for i in range((os.cpu_count() or 1).bit_length())])
+    parser.add_argument('--aws-ms', type=float, default=50, help='stubbed AWS latency')
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    logging.disable(logging.WARNING)
+    # Memory only, so descriptions from an earlier run (in the /tmp tier) cannot answer exact matches
+    local_server.description_cache = DescriptionCache([MemoryTier(4096)])
+    aws = StubAWS(args.aws_ms)
+    local_server.image_processor.rekognition = local_server.image_processor.textract = aws
+    local_server.bedrock_client.client = aws
+    with open(args.image, 'rb') as f:
+        image = f.read()
+
+    print(f"🖼️  Image worker benchmark ({args.uploads} uploads of {os.path.basename(args.image)} "
+          f"({len(image) / 1024 / 1024:.1f} MB), {args.clients} concurrent clients, {os.cpu_count()} cores)")
+    print("=" * 72)
+    print(f"   {'image work':<18}{'uploads/s':>11}{'speedup':>10}{'upload p95':>13}{'/health p95':>14}")
+    baseline = None
+    for processes in args.processes:
+        rate, upload_p95, health_p95 = run(image, processes, args)
+        baseline = baseline or rate
+        name = f"{processes} processes" if processes else 'request threads'
+        print(f"   {name:<18}{rate:>11.1f}{rate / baseline:>9.2f}x{upload_p95:>10.0f} ms{health_p95:>11.0f} ms")
+    print("\n   /health p95: a light request served while the uploads are being fingerprinted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat response latency and Polly usage when every answer is
+synthesized before responding (?audio=url) against lazy audio handles
+(?audio=lazy), where the answer returns at once and Polly only runs for the
+answers a student actually presses "Listen" on.
+
+Runs local_server.py's /api/chat (non-streaming) with Bedrock and Polly
+simulated and the audio store in a temporary directory. A share of the
+answers is then played by fetching audio_url the way <audio> would, twice,
+to show that replays come from the cache.
+
+Usage: python benchmarks/bench_lazy_audio.py [--questions 20] [--listen-share 0.3]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from bench_speech_pipeline import SentenceBedrock, SimulatedPolly
+from bench_token_streaming import QUESTION
+
+
+class NumberedBedrock(SentenceBedrock):
+    """Ends every answer differently, so each one needs its own audio"""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.counter = itertools.count()
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self.tokens[-1] = f"(answer {next(self.counter)})."
+        return super().invoke_model(modelId, body, **kwargs)
+
+
+class CountingPolly(SimulatedPolly):
+    def __init__(self, base_ms, ms_per_char):
+        super().__init__(base_ms, ms_per_char)
+        self.calls = 0
+
+    def synthesize_speech(self, Text, **kwargs):
+        self.calls += 1
+        return super().synthesize_speech(Text, **kwargs)
+
+
+def run(client, delivery, questions, listens):
+    """(median response ms, median ms to first audio byte for played answers, median replay ms)"""
+    responses, first_plays, replays = [], [], []
+    for i in range(questions):
+        start = time.perf_counter()
+        result = client.post('/api/chat', json={**QUESTION, 'audio_delivery': delivery}).get_json()
+        responses.append((time.perf_counter() - start) * 1000)
+        assert result['success'] and result['audio_url']
+        if i >= listens:
+            continue
+        for samples in (first_plays, replays):
+            start = time.perf_counter()
+            audio = client.get(result['audio_url'])
+            assert audio.status_code == 200 and audio.get_data()
+            samples.append((time.perf_counter() - start) * 1000)
+    median = lambda samples: sorted(samples)[len(samples) // 2] if samples else 0
+    return median(responses), median(first_plays), median(replays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--listen-share', type=float, default=0.3, help='share of answers that get played')
+    parser.add_argument('--sentences', type=int, default=4)
+    parser.add_argument('--polly-base-ms', type=float, default=150)
+    parser.add_argument('--polly-ms-per-char', type=float, default=1.2)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.bedrock_client.client = NumberedBedrock(50, args.sentences, 1)
+    client = local_server.app.test_client()
+    listens = round(args.questions * args.listen_share)
+
+    print(f"💤 Lazy audio benchmark ({args.questions} answers, {listens} played, "
+          f"Polly {args.polly_base_ms:g} ms + {args.polly_ms_per_char:g} ms/char)")
+    print("=" * 76)
+    print(f"   {'mode':<12}{'response':>12}{'first play':>14}{'replay':>12}{'Polly calls':>13}")
+    for delivery in ('url', 'lazy'):
+        with tempfile.TemporaryDirectory() as directory:
+            polly = CountingPolly(args.polly_base_ms, args.polly_ms_per_char)
+            local_server.polly_client.client = polly
+            local_server.polly_client.cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+            local_server.audio_cache = local_server.polly_client.cache
+            response_ms, first_ms, replay_ms = run(client, delivery, args.questions, listens)
+            print(f"   {delivery:<12}{response_ms:>9.0f} ms{first_ms:>11.1f} ms{replay_ms:>9.1f} ms{polly.calls:>13}")
+    print("\n   first play: fetching audio_url (a lazy handle is synthesized by this fetch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: synthesis latency for long texts, chunk by chunk in sequence
+against the concurrent chunked synthesis in long_speech.py, and a check that
+the joined MP3 holds exactly the audio frames of every chunk.
+
+Polly is simulated: each call takes a round trip plus a cost per character
+and returns a real-shaped MP3 (ID3v2 tag, Xing header frame, then 48 kbit/s
+24 kHz MPEG-2 Layer III frames in proportion to the text).
+
+Usage: python benchmarks/bench_long_speech.py [--chars 3000 6000 10000] [--polly-ms-per-char 0.6]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+from botocore.response import StreamingBody
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'utils'))
+
+import long_speech
+from long_speech import POLLY_MAX_CHARS, mp3_frames, split_text, synthesize_long
+
+# MPEG-2 Layer III, 48 kbit/s, 24 kHz, mono: 144-byte frames of 24 ms
+FRAME_HEADER = b'\xff\xf3\x64\xc0'
+FRAME_BYTES = 144
+ID3_TAG = b'ID3\x04\x00\x00\x00\x00\x00\x16' + b'\x00' * 0x16
+XING_FRAME = FRAME_HEADER + b'\x00' * 9 + b'Xing' + b'\x00' * (FRAME_BYTES - 17)
+PARAGRAPH = ("The heart has four chambers. The right atrium receives blood from the body and "
+             "passes it to the right ventricle, which pumps it to the lungs. ") * 4
+
+
+class SimulatedPolly:
+    def __init__(self, base_ms, ms_per_char):
+        self.base_ms = base_ms
+        self.ms_per_char = ms_per_char
+
+    def synthesize_speech(self, Text, **kwargs):
+        time.sleep((self.base_ms + self.ms_per_char * len(Text)) / 1000)
+        # About 15 characters of speech per second: one 24 ms frame per 0.36 characters
+        frames = b''.join(FRAME_HEADER + bytes([i % 256]) * (FRAME_BYTES - 4) for i in range(int(len(Text) / 0.36)))
+        audio = ID3_TAG + XING_FRAME + frames
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio)), 'ContentType': 'audio/mpeg'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chars', type=int, nargs='+', default=[3000, 6000, 10000])
+    parser.add_argument('--polly-base-ms', type=float, default=150)
+    parser.add_argument('--polly-ms-per-char', type=float, default=0.6)
+    args = parser.parse_args()
+
+    polly = SimulatedPolly(args.polly_base_ms, args.polly_ms_per_char)
+
+    def synthesize(chunk):
+        return polly.synthesize_speech(Text=chunk)['AudioStream'].read()
+
+    print(f"📚 Long text synthesis benchmark (Polly {args.polly_base_ms:g} ms + {args.polly_ms_per_char:g} ms/char, "
+          f"{long_speech.LONG_SPEECH_WORKERS} workers)")
+    print("=" * 76)
+    print(f"   {'text':<8}{'chunks':>7}{'longest':>9}{'in sequence':>14}{'concurrent':>13}{'frames ok':>11}"
+          f"{'old cut':>10}")
+    for chars in args.chars:
+        text = "\n\n".join([PARAGRAPH] * (chars // len(PARAGRAPH) + 1))[:chars]
+        chunks = split_text(text)
+
+        start = time.perf_counter()
+        parts = [synthesize(chunk) for chunk in chunks]
+        sequential_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        audio = synthesize_long(synthesize, text)
+        concurrent_ms = (time.perf_counter() - start) * 1000
+
+        # The joined stream is every chunk's audio frames, in order, and nothing else
+        frames_ok = audio == b''.join(mp3_frames(part) for part in parts) and b'Xing' not in audio \
+            and len(audio) % FRAME_BYTES == 0
+        voiced = min(chars, POLLY_MAX_CHARS) / chars
+        print(f"   {chars:<8}{len(chunks):>7}{max(map(len, chunks)):>9}{sequential_ms:>11.0f} ms"
+              f"{concurrent_ms:>10.0f} ms{'yes' if frames_ok else 'NO':>11}{voiced:>9.0%}")
+    print("\n   old cut: share of the text the previous text[:2900] truncation voiced")
+
+
+if __name__ == "__main__":
+    main()
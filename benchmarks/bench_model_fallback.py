@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: failed Bedrock round trips and latency per request with the model
+health table, compared with walking BedrockClient's model list from the top
+on every call.
+
+The account is simulated: only the last --working models of the fallback list
+are enabled, and the preferred one is throttled for part of the run (a
+transient outage). Time is simulated too (each request is --interval-s apart,
+each round trip costs its modeled latency), so cool-downs and half-open probes
+play out without waiting.
+
+Usage: python benchmarks/bench_model_fallback.py [--requests 200] [--fail-ms 120]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+
+from botocore.exceptions import ClientError
+from botocore.response import StreamingBody
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'utils'))
+
+from bedrock_client import BedrockClient, MODEL_OPTIONS
+from model_health import ModelHealth
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SimulatedAccount:
+    """bedrock-runtime stand-in: some models not enabled, one sometimes throttled"""
+
+    def __init__(self, clock, working, fail_ms, ok_ms):
+        self.clock = clock
+        self.working = working
+        self.fail_ms = fail_ms
+        self.ok_ms = ok_ms
+        self.throttled = set()
+        self.calls = 0
+        self.failed_calls = 0
+
+    def invoke_model(self, modelId, body, **kwargs):
+        self.calls += 1
+        if modelId not in self.working or modelId in self.throttled:
+            self.failed_calls += 1
+            self.clock.now += self.fail_ms / 1000
+            code = 'ThrottlingException' if modelId in self.throttled else 'AccessDeniedException'
+            raise ClientError({'Error': {'Code': code, 'Message': 'simulated'}}, 'InvokeModel')
+        self.clock.now += self.ok_ms[modelId] / 1000
+        data = json.dumps({'generation': 'An answer.'}).encode()
+        return {'body': StreamingBody(io.BytesIO(data), len(data))}
+
+
+def run(label, args, fresh_table_per_request):
+    clock = SimulatedClock()
+    working = MODEL_OPTIONS[-args.working:]
+    # The first enabled model is the fast one; later ones are progressively slower
+    ok_ms = {model_id: args.ok_ms * (1 + i) for i, model_id in enumerate(working)}
+    account = SimulatedAccount(clock, set(working), args.fail_ms, ok_ms)
+    client = BedrockClient()
+    client.client = account
+    client.health = ModelHealth(MODEL_OPTIONS, cooldown=args.cooldown_s, clock=clock)
+
+    outage = range(args.requests // 3, args.requests // 3 + args.outage_requests)
+    latencies = []
+    for i in range(args.requests):
+        account.throttled = {working[0]} if i in outage else set()
+        if fresh_table_per_request:
+            client.health = ModelHealth(MODEL_OPTIONS, cooldown=args.cooldown_s, clock=clock)
+        start = clock.now
+        client.generate_educational_description("A labelled heart diagram.")
+        latencies.append((clock.now - start) * 1000)
+        clock.now += args.interval_s
+
+    latencies.sort()
+    print(f"   {label:<30}{account.failed_calls / args.requests:>10.2f}"
+          f"{sum(latencies) / len(latencies):>11.0f} ms{latencies[int(len(latencies) * 0.99) - 1]:>11.0f} ms")
+    return client.health
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--working', type=int, default=3, help='enabled models, counted from the end of the list')
+    parser.add_argument('--fail-ms', type=float, default=120, help='round trip of a rejected call')
+    parser.add_argument('--ok-ms', type=float, default=900, help='latency of the fastest enabled model')
+    parser.add_argument('--interval-s', type=float, default=2.0)
+    parser.add_argument('--outage-requests', type=int, default=30)
+    parser.add_argument('--cooldown-s', type=float, default=5.0)
+    args = parser.parse_args()
+    # Every simulated failure would otherwise be logged
+    logging.disable(logging.WARNING)
+
+    print(f"🩺 Model fallback benchmark ({args.requests} requests, {len(MODEL_OPTIONS) - args.working} of "
+          f"{len(MODEL_OPTIONS)} models not enabled, {args.outage_requests}-request throttling outage)")
+    print("=" * 64)
+    print(f"   {'':<30}{'failed/req':>10}{'mean':>14}{'p99':>14}")
+    run("walk the list every call", args, fresh_table_per_request=True)
+    health = run("model health table", args, fresh_table_per_request=False)
+
+    print()
+    for model_id, stats in health.stats()['models'].items():
+        print(f"   {model_id:<42}{stats['state']:<10}{stats['successes']:>5} ok{stats['failures']:>5} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: narrating a long document synchronously (the request holds until
+the audio exists) against the narration job API (submit returns at once,
+then the client long-polls), and deduplication of repeated submissions.
+
+Runs local_server.py's /api/generate-audio and /api/narrations with the
+offline stand-in for Polly's synthesis tasks and a simulated Polly (a round
+trip plus a cost per character).
+
+Usage: python benchmarks/bench_narration_jobs.py [--chars 20000] [--clients 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from bench_long_speech import PARAGRAPH, SimulatedPolly
+from narration_jobs import LocalJobTable, LocalSpeechTasks, NarrationJobs
+
+# API Gateway's integration timeout
+API_GATEWAY_LIMIT_MS = 29000
+
+
+class CountingPolly(SimulatedPolly):
+    def __init__(self, base_ms, ms_per_char):
+        super().__init__(base_ms, ms_per_char)
+        self.calls = 0
+
+    def synthesize_speech(self, Text, **kwargs):
+        self.calls += 1
+        return super().synthesize_speech(Text, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chars', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=8, help='students submitting the same page at once')
+    parser.add_argument('--polly-base-ms', type=float, default=150)
+    parser.add_argument('--polly-ms-per-char', type=float, default=0.6)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    text = "\n\n".join([PARAGRAPH] * (args.chars // len(PARAGRAPH) + 1))[:args.chars]
+    client = local_server.app.test_client()
+
+    print(f"📖 Narration job benchmark ({args.chars} characters, {args.clients} identical submissions, "
+          f"Polly {args.polly_base_ms:g} ms + {args.polly_ms_per_char:g} ms/char)")
+    print("=" * 72)
+    print(f"   {'':<34}{'response':>12}{'audio ready':>14}{'Polly calls':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        store = LocalAudioStore(directory, base_url='/audio')
+
+        polly = CountingPolly(args.polly_base_ms, args.polly_ms_per_char)
+        local_server.polly_client.client = polly
+        local_server.polly_client.cache = AudioCache(store)
+        start = time.perf_counter()
+        assert client.post('/api/generate-audio', json={'text': text}).get_json()['success']
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"   {'synchronous request':<34}{elapsed:>9.0f} ms{elapsed:>11.0f} ms{polly.calls:>12}")
+
+        polly = CountingPolly(args.polly_base_ms, args.polly_ms_per_char)
+        local_server.narrations = NarrationJobs(LocalSpeechTasks(polly, store), LocalJobTable())
+        start = time.perf_counter()
+
+        def submit(_):
+            response = client.post('/api/narrations', json={'text': text})
+            return (time.perf_counter() - start) * 1000, response.get_json()['job_id']
+
+        with ThreadPoolExecutor(args.clients) as pool:
+            submissions = list(pool.map(submit, range(args.clients)))
+        job_id = submissions[0][1]
+        while client.get(f'/api/narrations/{job_id}?wait=25').get_json()['status'] == 'pending':
+            pass
+        ready = (time.perf_counter() - start) * 1000
+        slowest_submit = max(s[0] for s in submissions)
+        print(f"   {'narration job (submit, long-poll)':<34}{slowest_submit:>9.0f} ms{ready:>11.0f} ms{polly.calls:>12}")
+
+    stats = local_server.narrations.stats()
+    print()
+    print(f"   {stats['submitted']} submissions, {stats['deduplicated']} deduplicated, "
+          f"{stats['tasks_started']} synthesis task started; API Gateway cuts requests at "
+          f"{API_GATEWAY_LIMIT_MS / 1000:g} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lookup cost of the near-duplicate index (multi-index hashing over
+64-bit dHash fingerprints) at 1M indexed images, compared with a linear scan.
+
+Indexed fingerprints are uniformly random. Real dHashes cluster more, which
+puts more candidates in each band bucket, so treat these numbers as a lower
+bound and re-run with --size matching production.
+
+Usage: python benchmarks/bench_near_duplicate_index.py [--size 1000000] [--threshold 8]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend', 'utils'))
+
+from perceptual_hash import MultiIndexHashIndex, hamming_distance
+
+
+def perturb(fingerprint, bits, rng):
+    for bit in rng.sample(range(64), bits):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def time_queries(label, fn, queries):
+    samples = []
+    found = 0
+    for query in queries:
+        start = time.perf_counter()
+        if fn(query) is not None:
+            found += 1
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    print(f"   {label:<34} mean {statistics.mean(samples):9.1f} µs   "
+          f"p99 {samples[int(len(samples) * 0.99) - 1]:9.1f} µs   found {found}/{len(queries)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--threshold', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--scan-queries', type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    print(f"🔎 Near-duplicate index benchmark ({args.size:,} images, threshold {args.threshold})")
+    print("=" * 60)
+
+    fingerprints = [rng.getrandbits(64) for _ in range(args.size)]
+    index = MultiIndexHashIndex()
+    start = time.perf_counter()
+    for i, fingerprint in enumerate(fingerprints):
+        index.add(fingerprint, i)
+    print(f"   Build: {time.perf_counter() - start:.1f} s")
+
+    near = [perturb(rng.choice(fingerprints), rng.randint(0, args.threshold), rng) for _ in range(args.queries)]
+    unseen = [rng.getrandbits(64) for _ in range(args.queries)]
+
+    time_queries("index, near-duplicate queries", lambda q: index.nearest(q, args.threshold), near)
+    time_queries("index, unseen images", lambda q: index.nearest(q, args.threshold), unseen)
+
+    def linear_scan(query):
+        best = min(fingerprints, key=lambda f: hamming_distance(f, query))
+        return best if hamming_distance(best, query) <= args.threshold else None
+
+    time_queries("linear scan, near-duplicate queries", linear_scan, near[:args.scan_queries])
+
+
+if __name__ == "__main__":
+    main()
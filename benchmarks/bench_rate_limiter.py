@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark (simulation): goodput against a Bedrock quota under rising load,
+with no client-side limit, with an adaptive limiter (rate_limiter.py) in
+each server process, and with one budget shared by all of them (what
+AWS_RATE_LIMIT_REDIS_URL provides across hosts).
+
+Time is simulated, so a run takes seconds. --workers server processes
+share the account's quota of --quota calls/s. Requests arrive at random, at
+a multiple of the quota, and each makes up to three attempts with
+botocore's jittered backoff. The quota counts every call it receives over
+the last second, throttled calls included, as an increment-then-check
+limiter does. Callers that keep retrying into it therefore keep it full,
+and without a limit goodput collapses once the offered load passes the
+quota. Goodput is requests answered within --deadline seconds.
+
+Usage: python benchmarks/bench_rate_limiter.py [--quota 8] [--workers 4] [--load 0.5 1 2 4 8]
+"""
+
+import argparse
+import heapq
+import os
+import random
+import sys
+from collections import deque
+from itertools import count
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+from rate_limiter import AdaptiveRateLimiter, LocalRateStore, RateLimited
+
+KEY = 'bedrock-runtime:us-east-1:anthropic.claude-3-sonnet-20240229-v1:0'
+ATTEMPTS = 3
+MAX_BACKOFF = 20
+
+
+class Simulation:
+    """Discrete events in simulated seconds"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.events = []
+        self.order = count()
+
+    def clock(self):
+        return self.now
+
+    def at(self, delay, callback, *args):
+        heapq.heappush(self.events, (self.now + delay, next(self.order), callback, args))
+
+    def run(self, until):
+        while self.events and self.events[0][0] <= until:
+            self.now, _, callback, args = heapq.heappop(self.events)
+            callback(*args)
+
+
+class SlidingWindowQuota:
+    """Account quota: a call is throttled when the calls received in the last second
+    (weighted: throttled ones count throttled_weight) already reach the quota"""
+
+    def __init__(self, sim, quota, throttled_weight):
+        self.sim = sim
+        self.quota = quota
+        self.throttled_weight = throttled_weight
+        self.window = deque()
+        self.total = 0.0
+        self.calls = 0
+        self.throttled = 0
+
+    def call(self):
+        while self.window and self.window[0][0] <= self.sim.now - 1.0:
+            self.total -= self.window.popleft()[1]
+        self.calls += 1
+        throttled = self.total >= self.quota
+        weight = self.throttled_weight if throttled else 1.0
+        self.window.append((self.sim.now, weight))
+        self.total += weight
+        self.throttled += throttled
+        return throttled
+
+
+def simulate(load, limiters, args, seed):
+    """(goodput/s, share of calls throttled, share of requests failed) with one limiter (or
+    None) per worker"""
+    sim = Simulation()
+    rng = random.Random(seed)
+    quota = SlidingWindowQuota(sim, args.quota, args.throttled_weight)
+    for limiter in limiters:
+        if limiter is not None:
+            limiter.store.clock = sim.clock
+    outcome = {'good': 0, 'late': 0, 'failed': 0}
+
+    def attempt(limiter, started, number, waited_for=0.0):
+        if limiter is None:
+            send(limiter, started, number, False)
+            return
+        try:
+            wait = limiter.try_acquire(KEY, 'InvokeModel', waited_for)
+        except RateLimited:
+            finish(started, False)
+            return
+        if wait:
+            sim.at(wait, attempt, limiter, started, number, waited_for + wait)
+        else:
+            send(limiter, started, number, waited_for > 0)
+
+    def send(limiter, started, number, waited):
+        throttled = quota.call()
+        sim.at(args.throttle_ms / 1000 if throttled else args.call_ms / 1000,
+               answered, limiter, started, number, waited, throttled)
+
+    def answered(limiter, started, number, waited, throttled):
+        if limiter is not None:
+            limiter.record(KEY, throttled, waited)
+        if not throttled:
+            finish(started, True)
+        elif number < ATTEMPTS:
+            # botocore standard retries: full jitter on an exponential base
+            sim.at(min(rng.random() * 2 ** number, MAX_BACKOFF), attempt, limiter, started, number + 1)
+        else:
+            finish(started, False)
+
+    def finish(started, succeeded):
+        if sim.now < args.warmup:
+            return
+        if not succeeded:
+            outcome['failed'] += 1
+        else:
+            outcome['good' if sim.now - started <= args.deadline else 'late'] += 1
+
+    def arrive(limiter, rate):
+        attempt(limiter, sim.now, 1)
+        sim.at(rng.expovariate(rate), arrive, limiter, rate)
+
+    for limiter in limiters:
+        sim.at(0, arrive, limiter, load * args.quota / len(limiters))
+    sim.run(args.warmup + args.seconds)
+    requests = sum(outcome.values())
+    return (outcome['good'] / args.seconds, quota.throttled / max(quota.calls, 1),
+            outcome['failed'] / max(requests, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quota', type=float, default=8, help='account quota, calls/s')
+    parser.add_argument('--workers', type=int, default=4, help='server processes sharing the quota')
+    parser.add_argument('--load', type=float, nargs='+', default=[0.5, 1, 2, 4, 8],
+                        help='offered load as multiples of the quota')
+    parser.add_argument('--call-ms', type=float, default=600, help='answered call latency')
+    parser.add_argument('--throttle-ms', type=float, default=50, help='throttled call latency')
+    parser.add_argument('--throttled-weight', type=float, default=1.0,
+                        help='how much a throttled call counts against the quota (0: not at all)')
+    parser.add_argument('--deadline', type=float, default=10, help='seconds a student waits for an answer')
+    parser.add_argument('--seconds', type=float, default=300, help='simulated seconds measured')
+    parser.add_argument('--warmup', type=float, default=30)
+    args = parser.parse_args()
+
+    modes = [
+        ('no limit', lambda: [None] * args.workers),
+        ('per process', lambda: [AdaptiveRateLimiter(LocalRateStore()) for _ in range(args.workers)]),
+        ('shared', lambda: [AdaptiveRateLimiter(LocalRateStore())] * args.workers)
+    ]
+
+    print(f"🚥 Adaptive rate limiter simulation (quota {args.quota:g} calls/s, {args.workers} server processes, "
+          f"{args.seconds:g} s per point)")
+    print("=" * 84)
+    print(f"   {'offered':<10}" + ''.join(f"{name:>24}" for name, _ in modes))
+    print(f"   {'':<10}" + f"{'goodput  thr%  fail%':>24}" * len(modes))
+    for load in args.load:
+        cells = []
+        for _, make in modes:
+            # Same arrivals and backoffs for every mode
+            goodput, throttled, failed = simulate(load, make(), args, seed=1)
+            cells.append(f"{goodput:>15.1f}/s{throttled * 100:>5.0f}{failed * 100:>7.0f}")
+        print(f"   {f'{load:g}x':<10}" + ''.join(f"{cell:>24}" for cell in cells))
+    print("\n   goodput: requests answered within the deadline, per second; thr%: calls throttled;"
+          "\n   fail%: requests that ran out of attempts or found no token within the limiter's wait")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark: a class submitting the same image within a second, with and
+without single-flight coalescing (single_flight.py).
+
+1. local_server.py: --students concurrent uploads of the same image to
+   /api/process-image, then the same text to /api/generate-audio. Without
+   coalescing every upload runs its own Rekognition, Textract and Bedrock
+   calls; with it one analysis serves them all.
+2. Lambda containers (image_analysis.describe_image): --containers
+   containers, each handling one of the uploads, sharing a description
+   cache tier. A lease table (the in-memory stand-in for the DynamoDB one)
+   lets one container call Bedrock while the others poll the shared cache.
+
+AWS is simulated, with caches in memory or a temporary directory so every
+run starts cold. Admission control is off so that only coalescing differs.
+
+Usage: python benchmarks/bench_single_flight.py [--students 40] [--containers 8] [--aws-ms 800]
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from admission import AdmissionController
+from audio_cache import AudioCache, LocalAudioStore
+from description_cache import DescriptionCache, LocalSharedTier, MemoryTier
+from image_analysis import describe_image
+from image_workers import ImageWorkers
+from single_flight import Flight, LocalLeaseTable, SingleFlight
+
+ANSWER = json.dumps({'content': [{'text': 'A labelled diagram of the human heart and its four chambers.'}]}).encode()
+
+
+class CountingAWS:
+    """Rekognition, Textract, Bedrock and Polly stand-in counting calls, answering after latency_ms"""
+
+    def __init__(self, latency_ms):
+        self.latency_ms = latency_ms
+        self.calls = {'rekognition': 0, 'textract': 0, 'bedrock': 0, 'polly': 0}
+        self.lock = threading.Lock()
+
+    def _call(self, service):
+        with self.lock:
+            self.calls[service] += 1
+        time.sleep(self.latency_ms / 1000)
+
+    def detect_labels(self, **kwargs):
+        self._call('rekognition')
+        return {'Labels': [{'Name': 'Diagram', 'Confidence': 95.0}]}
+
+    def detect_document_text(self, **kwargs):
+        self._call('textract')
+        return {'Blocks': [{'BlockType': 'LINE', 'Text': 'Left ventricle'}]}
+
+    def invoke_model(self, **kwargs):
+        self._call('bedrock')
+        return {'body': StreamingBody(io.BytesIO(ANSWER), len(ANSWER))}
+
+    def describe_voices(self, **kwargs):
+        return {'Voices': [{'Id': 'Joanna', 'LanguageCode': 'en-US', 'SupportedEngines': ['neural', 'standard']}]}
+
+    def synthesize_speech(self, Text, **kwargs):
+        self._call('polly')
+        audio = b'\xff\xfb' * len(Text)
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio))}
+
+
+class Uncoalesced(SingleFlight):
+    """Every caller leads: the behaviour before coalescing"""
+
+    def begin(self, key, lookup=None):
+        return None, Flight()
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+
+def at_once(count, function):
+    """ms taken by each of `count` concurrent function() calls"""
+    def timed(_):
+        start = time.perf_counter()
+        function()
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(timed, range(count)))
+
+
+def local_server_run(image, flights, args):
+    """(uploads: (aws calls, ms), generate-audio: (polly calls, ms)) with flights coalescing both"""
+    aws = CountingAWS(args.aws_ms)
+    local_server.image_processor.rekognition = local_server.image_processor.textract = aws
+    local_server.bedrock_client.client = local_server.polly_client.client = aws
+    local_server.description_cache = DescriptionCache([MemoryTier(4096)])
+    local_server.image_analyses = flights('image-analysis')
+    audio_flights = flights('audio')
+    # Unique per run, so nothing is answered from an earlier run's cache
+    upload = image + uuid.uuid4().bytes
+    text = f"The left ventricle pumps oxygenated blood to the body. ({uuid.uuid4().hex})"
+    client = local_server.app.test_client()
+
+    def process_image():
+        response = client.post('/api/process-image?audio=lazy', data=upload, content_type='image/png')
+        assert response.status_code == 200, response.get_json()
+
+    def generate_audio():
+        response = client.post('/api/generate-audio', json={'text': text})
+        assert response.status_code == 200, response.get_json()
+
+    upload_ms = at_once(args.students, process_image)
+    upload_calls = dict(aws.calls)
+    import audio_cache
+    audio_cache.AUDIO_SYNTHESES = audio_flights
+    audio_ms = at_once(args.students, generate_audio)
+    return (upload_calls, upload_ms), (aws.calls['polly'], audio_ms)
+
+
+def containers_run(image, leases, args):
+    """(Bedrock calls, ms per upload) for one upload per container, all at once"""
+    aws = CountingAWS(args.aws_ms)
+    shared = LocalSharedTier()
+    upload = image + uuid.uuid4().bytes
+
+    def container():
+        # Each container: its own memory tier and flights, the shared tier and lease table in common
+        cache = DescriptionCache([MemoryTier(256), shared])
+        flights = SingleFlight('image-analysis', leases)
+        return lambda: describe_image(aws, upload, cache=cache, flights=flights)
+
+    handlers = [container() for _ in range(args.containers)]
+    handler_of = iter(handlers)
+    lock = threading.Lock()
+
+    def one_upload():
+        with lock:
+            handler = next(handler_of)
+        handler()
+
+    ms = at_once(args.containers, one_upload)
+    return aws.calls['bedrock'], ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', default=os.path.join(ROOT, 'demo_images', 'Study.png'))
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--containers', type=int, default=8)
+    parser.add_argument('--aws-ms', type=float, default=800, help='simulated latency of each AWS call')
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    logging.disable(logging.WARNING)
+    local_server.bedrock_client.admission = AdmissionController(max_concurrency=0)
+    local_server.image_processor.workers = ImageWorkers(processes=0)
+    local_server.audio_cache = local_server.polly_client.cache = AudioCache(LocalAudioStore(tempfile.mkdtemp()))
+    with open(args.image, 'rb') as f:
+        image = f.read()
+
+    print(f"🛫 Single-flight benchmark ({args.students} students, same image and text at once, "
+          f"AWS calls take {args.aws_ms:g} ms)")
+    print("=" * 84)
+    print(f"   {'local_server.py':<22}{'Bedrock':>9}{'Rekognition':>13}{'Textract':>10}{'Polly':>7}"
+          f"{'upload p95':>12}{'audio p95':>11}")
+    for name, flights in [('no coalescing', lambda namespace: Uncoalesced(namespace)),
+                          ('single flight', lambda namespace: SingleFlight(namespace))]:
+        (calls, upload_ms), (polly_calls, audio_ms) = local_server_run(image, flights, args)
+        print(f"   {name:<22}{calls['bedrock']:>9}{calls['rekognition']:>13}{calls['textract']:>10}{polly_calls:>7}"
+              f"{percentile(upload_ms, 0.95):>9.0f} ms{percentile(audio_ms, 0.95):>8.0f} ms")
+
+    print(f"\n   {f'{args.containers} Lambda containers':<22}{'Bedrock':>9}{'p50':>13}{'p95':>10}")
+    for name, leases in [('no lease table', None), ('lease table', LocalLeaseTable())]:
+        bedrock_calls, ms = containers_run(image, leases, args)
+        print(f"   {name:<22}{bedrock_calls:>9}{percentile(ms, 0.5):>10.0f} ms{percentile(ms, 0.95):>7.0f} ms")
+    print("\n   Containers waiting on another's lease poll the shared cache every SINGLE_FLIGHT_POLL_SECONDS"
+          "\n   (0.25 s), which bounds the extra latency they see")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: how long "Listen" takes, and how much Polly work is spent, when
+answers returned without audio are synthesized speculatively in the
+background for a share of requests (SPECULATIVE_AUDIO_RATE).
+
+Runs local_server.py's /api/chat with ?audio=lazy, then, after a think time,
+/api/generate-audio for the share of answers a student listens to. Bedrock
+and Polly are simulated; the audio store is a temporary directory.
+Speculations that finish but are never played are the wasted work.
+
+Usage: python benchmarks/bench_speculative_audio.py [--rates 0 0.5 1] [--listen-share 0.5] [--think-ms 400]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from audio_cache import AudioCache, LocalAudioStore
+from bench_lazy_audio import CountingPolly, NumberedBedrock
+from bench_token_streaming import QUESTION
+from speculative_audio import SpeculativeAudio
+
+
+def run(client, questions, listen_share, think_ms):
+    """Median ms from pressing Listen to having the audio URL"""
+    listens = []
+    for i in range(questions):
+        answer = client.post('/api/chat', json={**QUESTION, 'audio_delivery': 'lazy'}).get_json()['answer']
+        if int((i + 1) * listen_share) == int(i * listen_share):
+            continue
+        time.sleep(think_ms / 1000)
+        start = time.perf_counter()
+        result = client.post('/api/generate-audio', json={'text': answer, 'audio_delivery': 'url'}).get_json()
+        assert result['success']
+        listens.append((time.perf_counter() - start) * 1000)
+    return sorted(listens)[len(listens) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=float, nargs='+', default=[0, 0.5, 1])
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--listen-share', type=float, default=0.5, help='share of answers that get played')
+    parser.add_argument('--think-ms', type=float, default=400, help='time before Listen is pressed')
+    parser.add_argument('--polly-base-ms', type=float, default=150)
+    parser.add_argument('--polly-ms-per-char', type=float, default=1.2)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.bedrock_client.client = NumberedBedrock(50, 4, 1)
+    client = local_server.app.test_client()
+
+    print(f"🔮 Speculative audio benchmark ({args.questions} answers, {args.listen_share:.0%} played "
+          f"{args.think_ms:g} ms after the text, Polly {args.polly_base_ms:g} ms + {args.polly_ms_per_char:g} ms/char)")
+    print("=" * 76)
+    print(f"   {'rate':<8}{'Listen':>11}{'Polly calls':>13}{'used':>7}{'joined':>8}{'wasted':>8}{'used chars':>12}")
+    for rate in args.rates:
+        with tempfile.TemporaryDirectory() as directory:
+            polly = CountingPolly(args.polly_base_ms, args.polly_ms_per_char)
+            cache = AudioCache(LocalAudioStore(directory, base_url='/audio'))
+            local_server.polly_client.client = polly
+            local_server.polly_client.cache = local_server.audio_cache = cache
+            local_server.speculative_audio = speculative = SpeculativeAudio(polly, cache, rate)
+            listen_ms = run(client, args.questions, args.listen_share, args.think_ms)
+            # Let the last speculations finish before counting them
+            while any(not future.done() for future, _ in list(speculative.speculations.values())):
+                time.sleep(0.01)
+            stats = speculative.stats()
+            wasted = stats['wasted'] + stats['unclaimed']
+            share = stats['chars_used'] / stats['chars_synthesized'] if stats['chars_synthesized'] else 0
+            print(f"   {rate:<8g}{listen_ms:>8.0f} ms{polly.calls:>13}{stats['used']:>7}{stats['joined_in_flight']:>8}"
+                  f"{wasted:>8}{share:>12.0%}")
+    print("\n   joined: Listen pressed while the speculation was still running (it waits, no second call)")
+
+
+if __name__ == "__main__":
+    main()
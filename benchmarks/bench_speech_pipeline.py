@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first audio for a description, serial (generate the whole
+text, then synthesize it in one Polly call) against the sentence pipeline
+(stream tokens, synthesize each sentence on a bounded pool while generation
+continues).
+
+Bedrock and Polly are simulated: Bedrock with a delay before the first token
+and a steady per-token interval, Polly with a fixed round trip plus a cost
+per character. Both paths run through local_server.py's /api/chat.
+
+Usage: python benchmarks/bench_speech_pipeline.py [--polly-base-ms 150] [--polly-ms-per-char 1.2]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+from botocore.response import StreamingBody
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+from bench_token_streaming import QUESTION, SimulatedBedrock
+
+SENTENCE = "The left ventricle pumps oxygen rich blood through the aorta to the body"
+
+
+class SimulatedPolly:
+    """Stands in for the Polly client: a round trip plus time proportional to the text"""
+
+    def __init__(self, base_ms, ms_per_char):
+        self.base_ms = base_ms
+        self.ms_per_char = ms_per_char
+
+    def synthesize_speech(self, Text, **kwargs):
+        time.sleep((self.base_ms + self.ms_per_char * len(Text)) / 1000)
+        audio = b'\xff\xfb' * len(Text)
+        return {'AudioStream': StreamingBody(io.BytesIO(audio), len(audio)), 'ContentType': 'audio/mpeg'}
+
+
+class SentenceBedrock(SimulatedBedrock):
+    """Simulated model output made of sentences, so the pipeline has boundaries to split on"""
+
+    def __init__(self, first_token_ms, sentences, token_ms):
+        super().__init__(first_token_ms, 0, token_ms)
+        words = []
+        for i in range(sentences):
+            words += [f"{word} " for word in f"{SENTENCE} ({i}).".split()]
+        self.tokens = words
+
+
+def serial(client):
+    start = time.perf_counter()
+    response = client.post('/api/chat', json=QUESTION)
+    assert response.get_json()['success']
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, elapsed
+
+
+def pipelined(client):
+    start = time.perf_counter()
+    response = client.post('/api/chat?speech=sentences', json=QUESTION,
+                           headers={'Accept': 'text/event-stream'}, buffered=False)
+    first_audio = None
+    for data in response.response:
+        if first_audio is None and b'event: audio' in data:
+            first_audio = (time.perf_counter() - start) * 1000
+    total = (time.perf_counter() - start) * 1000
+    response.close()
+    return first_audio, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--first-token-ms', type=float, default=600)
+    parser.add_argument('--sentences', type=int, default=8)
+    parser.add_argument('--token-ms', type=float, default=15)
+    parser.add_argument('--polly-base-ms', type=float, default=150)
+    parser.add_argument('--polly-ms-per-char', type=float, default=1.2)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.bedrock_client.client = SentenceBedrock(args.first_token_ms, args.sentences, args.token_ms)
+    local_server.polly_client.client = SimulatedPolly(args.polly_base_ms, args.polly_ms_per_char)
+    client = local_server.app.test_client()
+
+    print(f"🔊 Speech pipeline benchmark ({args.sentences} sentences, first token after "
+          f"{args.first_token_ms:g} ms, Polly {args.polly_base_ms:g} ms + {args.polly_ms_per_char:g} ms/char)")
+    print("=" * 72)
+    print(f"   {'path':<40}{'first audio':>14}{'all audio':>14}")
+    for label, run in (("serial (generate, then synthesize)", serial),
+                       ("sentence pipeline", pipelined)):
+        samples = [run(client) for _ in range(args.repeats)]
+        first = sorted(s[0] for s in samples)[len(samples) // 2]
+        total = sorted(s[1] for s in samples)[len(samples) // 2]
+        print(f"   {label:<40}{first:>11.0f} ms{total:>11.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
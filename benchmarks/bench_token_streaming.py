@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first token versus total latency for a Q&A answer, blocking
+(invoke_model, JSON response) against token streaming
+(invoke_model_with_response_stream, Server-Sent Events).
+
+Bedrock is simulated with a fixed delay before the first token and a steady
+per-token interval, so the numbers isolate what streaming changes for the
+student: when text starts appearing. Measured through local_server.py's
+/api/chat (Polly stubbed) and the buffered q_chat_optimized Lambda handler.
+
+Usage: python benchmarks/bench_token_streaming.py [--first-token-ms 600] [--tokens 120] [--token-ms 15]
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+
+from botocore.response import StreamingBody
+from botocore.stub import Stubber
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+import local_server
+
+QUESTION = {'question': 'What does the left ventricle do?', 'original_description': 'A labelled heart diagram.'}
+
+
+class SimulatedBedrock:
+    """Stands in for bedrock-runtime with a model-like latency profile"""
+
+    def __init__(self, first_token_ms, tokens, token_ms):
+        self.first_token_ms = first_token_ms
+        self.tokens = [f"word{i} " for i in range(tokens)]
+        self.token_ms = token_ms
+
+    def invoke_model(self, modelId, body, **kwargs):
+        time.sleep((self.first_token_ms + self.token_ms * len(self.tokens)) / 1000)
+        text = ''.join(self.tokens)
+        if modelId.startswith('anthropic.claude-3'):
+            payload = {'content': [{'text': text}]}
+        else:
+            payload = {'generation': text}
+        data = json.dumps(payload).encode()
+        return {'body': StreamingBody(io.BytesIO(data), len(data))}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        def events():
+            time.sleep(self.first_token_ms / 1000)
+            for i, token in enumerate(self.tokens):
+                if i:
+                    time.sleep(self.token_ms / 1000)
+                if modelId.startswith('anthropic.claude-3'):
+                    payload = {'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': token}}
+                else:
+                    payload = {'generation': token}
+                yield {'chunk': {'bytes': json.dumps(payload).encode()}}
+        return {'body': events()}
+
+
+def load_handler(name):
+    path = os.path.join(ROOT, 'backend', 'lambda_functions', f'{name}.py')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def flask_request(client, stubber, streaming):
+    stubber.add_response('synthesize_speech', {
+        'AudioStream': StreamingBody(io.BytesIO(b'ID3'), 3),
+        'ContentType': 'audio/mpeg'
+    })
+    headers = {'Accept': 'text/event-stream'} if streaming else {}
+    start = time.perf_counter()
+    response = client.post('/api/chat', json=QUESTION, headers=headers, buffered=False)
+    first = None
+    for data in response.response:
+        if first is None and (not streaming or b'event: token' in data):
+            first = time.perf_counter()
+    end = time.perf_counter()
+    response.close()
+    return (first - start) * 1000, (end - start) * 1000
+
+
+def lambda_request(handler, streaming):
+    event = {'httpMethod': 'POST', 'body': json.dumps(QUESTION),
+             'headers': {'Accept': 'text/event-stream'} if streaming else {}}
+    start = time.perf_counter()
+    response = handler.lambda_handler(event, None)
+    total = (time.perf_counter() - start) * 1000
+    if not streaming:
+        return total, total, None
+    done = response['body'].rsplit('event: done\ndata: ', 1)[1]
+    return total, total, json.loads(done)['metrics']['ttft_ms']
+
+
+def report(label, samples, server_ttft=None):
+    first = sorted(s[0] for s in samples)[len(samples) // 2]
+    total = sorted(s[1] for s in samples)[len(samples) // 2]
+    line = f"   {label:<40}{first:>10.0f} ms{total:>10.0f} ms"
+    if server_ttft is not None:
+        line += f"   (server TTFT {server_ttft:.0f} ms)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--first-token-ms', type=float, default=600)
+    parser.add_argument('--tokens', type=int, default=120)
+    parser.add_argument('--token-ms', type=float, default=15)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    simulated = SimulatedBedrock(args.first_token_ms, args.tokens, args.token_ms)
+
+    local_server.app.logger.setLevel('WARNING')
+    local_server.bedrock_client.client = simulated
+    stubber = Stubber(local_server.polly_client.client)
+    stubber.activate()
+    client = local_server.app.test_client()
+
+    handler = load_handler('q_chat_optimized')
+    handler.bedrock = simulated
+
+    print(f"⚡ Token streaming benchmark (first token after {args.first_token_ms:g} ms, "
+          f"{args.tokens} tokens every {args.token_ms:g} ms)")
+    print("=" * 72)
+    print(f"   {'path':<40}{'first text':>13}{'total':>13}")
+    for streaming in (False, True):
+        samples = [flask_request(client, stubber, streaming) for _ in range(args.repeats)]
+        report(f"local_server /api/chat, {'SSE' if streaming else 'JSON'}", samples)
+
+    for streaming in (False, True):
+        results = [lambda_request(handler, streaming) for _ in range(args.repeats)]
+        server_ttft = results[-1][2]
+        report(f"q_chat_optimized Lambda, {'buffered SSE' if streaming else 'JSON'}",
+               [r[:2] for r in results], server_ttft)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and latency of the JSON data-URL upload path versus raw
+image/* and multipart uploads, for the Lambda event parser
+(request_parsing.image_from_event) and local_server.py's Flask endpoint.
+
+Each row reports bytes on the wire, parse time (best of --repeats) and the
+tracemalloc peak of the parse step for Heart.png and a 10 MB upload (the
+frontend's size limit).
+
+Usage: python benchmarks/bench_upload_paths.py [--repeats 5]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'backend', 'utils'))
+
+from request_parsing import image_from_event
+import local_server
+
+BOUNDARY = 'seewrite-boundary'
+
+
+def multipart_body(image_data):
+    return (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="page.png"\r\n'
+            f'Content-Type: image/png\r\n\r\n').encode() + image_data + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def measure(fn, repeats):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def lambda_cases(image_data):
+    data_url = 'data:image/png;base64,' + base64.b64encode(image_data).decode()
+    multipart = multipart_body(image_data)
+    return [
+        ('JSON data URL', len(json.dumps({'image': data_url})),
+         {'headers': {'Content-Type': 'application/json'}, 'body': json.dumps({'image': data_url})}),
+        # API Gateway base64-encodes binary bodies for Lambda; the wire carries raw bytes
+        ('raw image/png', len(image_data),
+         {'headers': {'Content-Type': 'image/png'}, 'isBase64Encoded': True,
+          'body': base64.b64encode(image_data).decode()}),
+        ('multipart/form-data', len(multipart),
+         {'headers': {'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}, 'isBase64Encoded': True,
+          'body': base64.b64encode(multipart).decode()})
+    ]
+
+
+def flask_cases(image_data):
+    data_url = 'data:image/png;base64,' + base64.b64encode(image_data).decode()
+    multipart = multipart_body(image_data)
+    return [
+        ('JSON data URL', json.dumps({'image': data_url}).encode(), 'application/json'),
+        ('raw image/png', image_data, 'image/png'),
+        ('multipart/form-data', multipart, f'multipart/form-data; boundary={BOUNDARY}')
+    ]
+
+
+def report(label, wire_bytes, ms, peak, image_data, result):
+    assert result == image_data, f'{label} returned the wrong bytes'
+    print(f"     {label:<22}{wire_bytes / 1e6:>8.2f} MB{ms:>10.1f} ms{peak / 1e6:>11.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    uploads = [
+        ('Heart.png', open(os.path.join(ROOT, 'demo_images', 'Heart.png'), 'rb').read()),
+        ('10 MB upload', b'\x89PNG\r\n\x1a\n' + os.urandom(10 * 1024 * 1024 - 8))
+    ]
+
+    print("📤 Upload path benchmark")
+    print("=" * 62)
+    for name, image_data in uploads:
+        print(f"   {name} ({len(image_data) / 1e6:.2f} MB)")
+        print(f"     {'':<22}{'on wire':>11}{'parse':>13}{'peak alloc':>14}")
+        print("     Lambda (image_from_event)")
+        for label, wire_bytes, event in lambda_cases(image_data):
+            ms, peak, result = measure(lambda: image_from_event(event)[0], args.repeats)
+            report(label, wire_bytes, ms, peak, image_data, result)
+
+        print("     local_server.py (read_uploaded_image)")
+        for label, body, content_type in flask_cases(image_data):
+            def parse():
+                with local_server.app.test_request_context(
+                        '/api/process-image', method='POST', data=body, content_type=content_type):
+                    return local_server.read_uploaded_image()
+            ms, peak, result = measure(parse, args.repeats)
+            report(label, len(body), ms, peak, image_data, result)
+        print()
+
+
+if __name__ == "__main__":
+    main()
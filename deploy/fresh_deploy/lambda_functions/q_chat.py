@@ -8,6 +8,10 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 from bedrock_client import BedrockClient
 from polly_client import PollyClient
 
+# Created once per container and reused across warm invocations
+bedrock_client = BedrockClient()
+polly_client = PollyClient()
+
 def lambda_handler(event, context):
     """
     Lambda function to handle follow-up questions about the content
@@ -31,10 +35,6 @@ def lambda_handler(event, context):
                 })
             }
         
-        # Initialize clients
-        bedrock_client = BedrockClient()
-        polly_client = PollyClient()
-        
         # Generate answer using Bedrock
         answer = bedrock_client.answer_followup_question(
             original_description, 
@@ -9,6 +9,11 @@ from bedrock_client import BedrockClient
 from polly_client import PollyClient
 from image_processor import ImageProcessor
 
+# Created once per container and reused across warm invocations
+image_processor = ImageProcessor()
+bedrock_client = BedrockClient()
+polly_client = PollyClient()
+
 def lambda_handler(event, context):
     """
     Lambda function to process uploaded images and generate audio descriptions
@@ -31,11 +36,6 @@ def lambda_handler(event, context):
                 })
             }
         
-        # Initialize clients
-        image_processor = ImageProcessor()
-        bedrock_client = BedrockClient()
-        polly_client = PollyClient()
-        
         # Process the image
         image_result = image_processor.process_image_base64(image_base64)
         
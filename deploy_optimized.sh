@@ -11,6 +11,7 @@ mkdir -p deploy/optimized
 cp backend/lambda_functions/image_processor_optimized.py deploy/optimized/
 cp backend/lambda_functions/q_chat_optimized.py deploy/optimized/
 cp backend/lambda_functions/audio_generator.py deploy/optimized/
+cp backend/lambda_functions/narration_api.py deploy/optimized/
 
 # Copy utilities
 cp -r backend/utils deploy/optimized/
@@ -28,6 +29,10 @@ zip -r q_chat_optimized.zip q_chat_optimized.py utils/
 echo "📦 Packaging audio generator..."
 zip -r audio_generator.zip audio_generator.py utils/
 
+# Package narration jobs (needs NARRATION_BUCKET, optionally NARRATION_TABLE)
+echo "📦 Packaging narration jobs..."
+zip -r narration_api.zip narration_api.py utils/
+
 # Package optimized frontend
 echo "📦 Packaging optimized frontend..."
 cd ../../frontend
@@ -39,6 +44,7 @@ echo "✅ Optimized packages created:"
 echo "   - image_processor_optimized.zip (fast text response)"
 echo "   - q_chat_optimized.zip (fast Q&A response)"
 echo "   - audio_generator.zip (on-demand audio)"
+echo "   - narration_api.zip (async narration of long documents)"
 echo "   - frontend_optimized.zip (streaming UI)"
 
 echo ""
@@ -2,7 +2,29 @@
 const API_CONFIG = {
     IMAGE_PROCESSOR_URL: 'https://jr9ip82s08.execute-api.us-east-1.amazonaws.com/prod/process-image',
     CHAT_URL: 'https://jr9ip82s08.execute-api.us-east-1.amazonaws.com/prod/chat',
-    AUDIO_URL: 'https://jr9ip82s08.execute-api.us-east-1.amazonaws.com/prod/generate-audio'
+    AUDIO_URL: 'https://jr9ip82s08.execute-api.us-east-1.amazonaws.com/prod/generate-audio',
+    // 'json' sends the base64 data URL; 'raw' posts the file bytes as-is, for local_server.py
+    // or a stage redeployed with backend/deploy.sh (image/* as a binary media type). An
+    // existing stage without those binary media types rejects raw bodies with a 400.
+    UPLOAD_MODE: 'json',
+    // Ask for Server-Sent Events and render tokens as they are generated. 'auto' streams
+    // only from local_server.py/asgi_server.py: the Lambda handlers buffer the events, so
+    // through API Gateway streaming brings no earlier first token
+    STREAMING: 'auto',
+    // With streaming, ask for audio sentence by sentence so playback can start after the
+    // first one (served by local_server.py; other backends ignore it)
+    SENTENCE_AUDIO: true,
+    // 'url' asks for a link to the stored audio, which <audio> streams natively, instead of
+    // base64 inside the JSON (backends without an audio store still send base64)
+    AUDIO_DELIVERY: 'url',
+    // Ask for the text only, with an audio handle that is synthesized when first played
+    // (sentence audio still streams during generation). Needs local_server.py, or Lambda
+    // with AUDIO_CACHE_BUCKET and AUDIO_ENDPOINT_URL set; without the bucket the handlers
+    // answer with URL/base64 audio instead
+    LAZY_AUDIO: false,
+    // Audio tier: 'standard' (MP3 24 kHz), 'low' (Ogg Vorbis 16 kHz), 'minimal' (MP3 8 kHz),
+    // or 'auto' for 'low' when the browser reports Save-Data or a slow connection
+    AUDIO_PROFILE: 'auto'
 };
 
 // Global variables
@@ -107,22 +129,24 @@ async function processImage() {
     hideResults();
 
     try {
-        const base64Image = await fileToBase64(file);
-        
-        const response = await fetch(API_CONFIG.IMAGE_PROCESSOR_URL, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                image: base64Image
-            })
-        });
+        const requestStart = performance.now();
+        const response = await fetchWithRetry(imageProcessorUrl(), await buildImageUploadRequest(file));
 
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
+        if (isEventStream(response)) {
+            const sentenceAudio = new SentenceAudioQueue(audioPlayer);
+            const result = await streamDescription(response, requestStart, sentenceAudio);
+            if (sentenceAudio.segments.length) {
+                sentenceAudio.finish();
+            } else {
+                setupOnDemandAudio(result.description, result.audio_url);
+            }
+            return;
+        }
+
         const result = await response.json();
         
         if (result.success) {
@@ -139,6 +163,31 @@ async function processImage() {
     }
 }
 
+async function streamDescription(response, requestStart, sentenceAudio) {
+    currentDescription = '';
+    resultsSection.classList.remove('hidden');
+    descriptionText.innerHTML = '';
+    chatHistory.innerHTML = '';
+    
+    const result = await readTokenStream(response, requestStart, (text) => {
+        hideProcessing();
+        currentDescription += text;
+        descriptionText.textContent = currentDescription;
+    }, (segment) => {
+        if (!sentenceAudio.segments.length) {
+            // First sentence is ready: playback can start while the rest is generated
+            audioPlayer.src = '';
+            playBtn.onclick = () => sentenceAudio.start();
+            playBtn.classList.remove('hidden');
+            pauseBtn.classList.add('hidden');
+        }
+        sentenceAudio.add(segment);
+    });
+    
+    currentDescription = result.description;
+    return result;
+}
+
 function displayResultsOptimized(result) {
     currentDescription = result.description;
     
@@ -157,7 +206,7 @@ function displayResultsOptimized(result) {
         }
     }, 100);
     
-    setupOnDemandAudio(result.description);
+    setupOnDemandAudio(result.description, result.audio_url);
 }
 
 function streamTextPremium(text, element) {
@@ -192,9 +241,9 @@ function streamTextPremium(text, element) {
     addNextWord();
 }
 
-function setupOnDemandAudio(text) {
+function setupOnDemandAudio(text, audioUrl = null) {
     audioPlayer.src = '';
-    playBtn.onclick = () => generateAndPlayAudio(text);
+    playBtn.onclick = () => generateAndPlayAudio(text, audioUrl);
     playBtn.classList.remove('hidden');
     pauseBtn.classList.add('hidden');
 }
@@ -214,14 +263,18 @@ async function askQuestion() {
     const loadingId = addChatMessage('✨ Analyzing your question...', 'assistant', true);
 
     try {
-        const response = await fetch(API_CONFIG.CHAT_URL, {
+        const requestStart = performance.now();
+        const response = await fetchWithRetry(API_CONFIG.CHAT_URL, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
+                ...streamingHeaders()
             },
             body: JSON.stringify({
                 question: question,
-                original_description: currentDescription
+                original_description: currentDescription,
+                audio_delivery: requestedAudioDelivery(),
+                ...audioFormatFields()
             })
         });
 
@@ -229,24 +282,51 @@ async function askQuestion() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
+        if (isEventStream(response)) {
+            const { messageId, answer, audioUrl } = await streamChatAnswer(response, requestStart, loadingId);
+            addOnDemandAudioToMessage(messageId, answer, audioUrl);
+            return;
+        }
+
         const result = await response.json();
         
         document.getElementById(loadingId).remove();
         
         if (result.success) {
             const messageId = addChatMessageStreaming(result.answer, 'assistant');
-            addOnDemandAudioToMessage(messageId, result.answer);
+            addOnDemandAudioToMessage(messageId, result.answer, result.audio_url);
         } else {
             throw new Error(result.error || 'Failed to get answer');
         }
 
     } catch (error) {
         console.error('Error asking question:', error);
-        document.getElementById(loadingId).remove();
+        document.getElementById(loadingId)?.remove();
         addChatMessage('Sorry, I encountered an error. Please try again.', 'assistant');
     }
 }
 
+async function streamChatAnswer(response, requestStart, loadingId) {
+    let contentDiv = null;
+    let messageId = null;
+    
+    const result = await readTokenStream(response, requestStart, (text) => {
+        if (!contentDiv) {
+            document.getElementById(loadingId).remove();
+            messageId = addChatMessage('', 'assistant');
+            contentDiv = document.getElementById(messageId).querySelector('.message-bubble');
+        }
+        contentDiv.textContent += text;
+        chatHistory.scrollTop = chatHistory.scrollHeight;
+    });
+    
+    if (!messageId) {
+        document.getElementById(loadingId).remove();
+        messageId = addChatMessage(result.answer, 'assistant');
+    }
+    return { messageId, answer: result.answer, audioUrl: result.audio_url };
+}
+
 function addChatMessage(message, sender, isLoading = false) {
     const messageId = 'msg-' + Date.now();
     const messageDiv = document.createElement('div');
@@ -327,7 +407,7 @@ function typeTextPremium(text, element) {
     addNextChar();
 }
 
-function addOnDemandAudioToMessage(messageId, text) {
+function addOnDemandAudioToMessage(messageId, text, audioUrl = null) {
     setTimeout(() => {
         const messageDiv = document.getElementById(messageId);
         if (!messageDiv) return;
@@ -344,7 +424,7 @@ function addOnDemandAudioToMessage(messageId, text) {
         playButton.innerHTML = '<i class="fas fa-headphones" aria-hidden="true"></i><span>Listen to Response</span>';
         playButton.setAttribute('aria-label', 'Generate and play audio version of this response');
         
-        playButton.onclick = () => generateChatAudioPremium(text, audioContainer);
+        playButton.onclick = () => generateChatAudioPremium(text, audioContainer, audioUrl);
         
         audioContainer.appendChild(playButton);
         contentDiv.appendChild(audioContainer);
@@ -366,49 +446,28 @@ function addOnDemandAudioToMessage(messageId, text) {
     }, 3000);
 }
 
-async function generateChatAudioPremium(text, container) {
+async function generateChatAudioPremium(text, container, audioUrl = null) {
     const button = container.querySelector('.premium-audio-btn');
     
     try {
         button.innerHTML = '<i class="fas fa-spinner fa-spin"></i><span>Creating...</span>';
         button.disabled = true;
+
+        const audioElement = document.createElement('audio');
+        audioElement.src = await onDemandAudioSource(audioElement, text, audioUrl);
+        audioElement.controls = true;
+        audioElement.className = 'w-full mt-2';
         
-        const response = await fetch(API_CONFIG.AUDIO_URL, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ text: text })
-        });
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
+        allAudioElements.push(audioElement);
+        audioElement.addEventListener('play', stopOtherAudio);
         
-        const result = await response.json();
+        container.innerHTML = '';
+        container.appendChild(audioElement);
         
-        if (result.success) {
-            const audioBlob = base64ToBlob(result.audio_base64, 'audio/mp3');
-            const audioUrl = URL.createObjectURL(audioBlob);
-            
-            const audioElement = document.createElement('audio');
-            audioElement.src = audioUrl;
-            audioElement.controls = true;
-            audioElement.className = 'w-full mt-2';
-            
-            allAudioElements.push(audioElement);
-            audioElement.addEventListener('play', stopOtherAudio);
-            
-            container.innerHTML = '';
-            container.appendChild(audioElement);
-            
-            setTimeout(() => {
-                audioElement.play().catch(e => console.log('Auto-play prevented:', e));
-            }, 300);
-            
-        } else {
-            throw new Error(result.error || 'Audio generation failed');
-        }
+        setTimeout(() => {
+            audioElement.play().catch(e => console.log('Auto-play prevented:', e));
+        }, 300);
+
     } catch (error) {
         console.error('Error generating audio:', error);
         button.innerHTML = '<i class="fas fa-exclamation-triangle"></i><span>Retry</span>';
@@ -420,7 +479,7 @@ async function generateChatAudioPremium(text, container) {
     }
 }
 
-async function generateAndPlayAudio(text) {
+async function generateAndPlayAudio(text, audioUrl = null) {
     try {
         playBtn.innerHTML = '<i class="fas fa-magic fa-spin"></i>';
         playBtn.disabled = true;
@@ -436,42 +495,22 @@ async function generateAndPlayAudio(text) {
             progressBar.querySelector('.progress-fill').style.width = '100%';
         }, 100);
         
-        const response = await fetch(API_CONFIG.AUDIO_URL, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({ text: text })
-        });
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+        audioPlayer.src = await onDemandAudioSource(audioPlayer, text, audioUrl);
+
+        if (!allAudioElements.includes(audioPlayer)) {
+            allAudioElements.push(audioPlayer);
         }
         
-        const result = await response.json();
+        audioPlayer.addEventListener('play', stopOtherAudio);
         
-        if (result.success) {
-            const audioBlob = base64ToBlob(result.audio_base64, 'audio/mp3');
-            const audioUrl = URL.createObjectURL(audioBlob);
-            audioPlayer.src = audioUrl;
-            
-            if (!allAudioElements.includes(audioPlayer)) {
-                allAudioElements.push(audioPlayer);
-            }
-            
-            audioPlayer.addEventListener('play', stopOtherAudio);
-            
-            // Success animation
-            progressBar.remove();
-            playBtn.innerHTML = '<i class="fas fa-check"></i>';
-            playBtn.style.background = 'linear-gradient(135deg, #10b981 0%, #059669 100%)';
-            
-            setTimeout(() => {
-                audioPlayer.play();
-            }, 300);
-        } else {
-            throw new Error(result.error || 'Audio generation failed');
-        }
+        // Success animation
+        progressBar.remove();
+        playBtn.innerHTML = '<i class="fas fa-check"></i>';
+        playBtn.style.background = 'linear-gradient(135deg, #10b981 0%, #059669 100%)';
+        
+        setTimeout(() => {
+            audioPlayer.play();
+        }, 300);
     } catch (error) {
         console.error('Error generating audio:', error);
         
@@ -533,6 +572,185 @@ function hideError() {
     errorDisplay.classList.add('hidden');
 }
 
+// Plays audio segments in order on one <audio> element, waiting for segments that
+// have not arrived yet instead of stopping
+class SentenceAudioQueue {
+    constructor(player) {
+        this.player = player;
+        this.segments = [];
+        this.position = 0;
+        this.playing = false;
+        this.waiting = false;
+        this.complete = false;
+        this.onEnded = () => this.playNext();
+    }
+    
+    add(segment) {
+        this.segments[segment.index] = segment;
+        if (this.waiting && segment.index === this.position) {
+            this.playNext();
+        }
+    }
+    
+    finish() {
+        this.complete = true;
+    }
+    
+    start() {
+        // Once started, the play button's playAudio handler resumes after a pause
+        if (this.playing) return;
+        this.player.removeEventListener('ended', this.onEnded);
+        this.player.addEventListener('ended', this.onEnded);
+        this.position = 0;
+        this.playing = true;
+        this.playNext();
+    }
+    
+    playNext() {
+        const segment = this.segments[this.position];
+        if (!segment) {
+            // Not synthesized yet, or the end of the description
+            this.waiting = !this.complete;
+            if (!this.waiting) {
+                this.playing = false;
+                this.player.removeEventListener('ended', this.onEnded);
+            }
+            return;
+        }
+        this.waiting = false;
+        this.position++;
+        if (!segment.success) {
+            this.playNext();
+            return;
+        }
+        this.player.src = audioSource(segment);
+        this.player.play();
+    }
+}
+
+function imageProcessorUrl() {
+    const params = new URLSearchParams();
+    if (streamingEnabled() && API_CONFIG.SENTENCE_AUDIO) {
+        params.set('speech', 'sentences');
+    }
+    if (requestedAudioDelivery() !== 'base64') {
+        params.set('audio', requestedAudioDelivery());
+    }
+    for (const [name, value] of Object.entries(audioFormatFields())) {
+        params.set(name, value);
+    }
+    const query = params.toString();
+    return query ? `${API_CONFIG.IMAGE_PROCESSOR_URL}?${query}` : API_CONFIG.IMAGE_PROCESSOR_URL;
+}
+
+// Whether to ask for Server-Sent Events: STREAMING 'auto' means only when the backend is
+// not an API Gateway (Lambda) endpoint
+function streamingEnabled() {
+    if (API_CONFIG.STREAMING === 'auto') {
+        return !new URL(API_CONFIG.IMAGE_PROCESSOR_URL, window.location.href).hostname.includes('.execute-api.');
+    }
+    return Boolean(API_CONFIG.STREAMING);
+}
+
+function streamingHeaders() {
+    return streamingEnabled() ? { 'Accept': 'text/event-stream' } : {};
+}
+
+function isEventStream(response) {
+    return (response.headers.get('Content-Type') || '').startsWith('text/event-stream');
+}
+
+// fetch() that retries a 429 (the server's Bedrock queue is full) after its Retry-After,
+// so a class pressing "Analyze" at once is spread out instead of failing
+const BUSY_RETRIES = 2;
+const BUSY_MAX_WAIT_S = 30;
+
+async function fetchWithRetry(url, options) {
+    for (let attempt = 0; ; attempt++) {
+        const response = await fetch(url, options);
+        if (response.status !== 429 || attempt >= BUSY_RETRIES) {
+            return response;
+        }
+        const retryAfter = Number(response.headers.get('Retry-After')) || 2;
+        console.log(`Server busy, retrying in ${retryAfter}s`);
+        await new Promise((resolve) => setTimeout(resolve, Math.min(retryAfter, BUSY_MAX_WAIT_S) * 1000));
+    }
+}
+
+// Reads a Server-Sent Events response: calls onToken for each token event (and onAudio
+// for each sentence audio event) and resolves with the done event's payload. Time to
+// first token is logged apart from total latency.
+async function readTokenStream(response, requestStart, onToken, onAudio = null) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let firstTokenMs = null;
+    let result = null;
+    
+    while (result === null) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) event = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            const payload = JSON.parse(data);
+            
+            if (event === 'token') {
+                if (firstTokenMs === null) firstTokenMs = performance.now() - requestStart;
+                onToken(payload.text);
+            } else if (event === 'audio') {
+                if (onAudio) onAudio(payload);
+            } else if (event === 'done') {
+                result = payload;
+            } else if (event === 'error') {
+                throw new Error(payload.error || 'Streaming failed');
+            }
+        }
+    }
+    
+    if (result === null) {
+        throw new Error('Stream ended before completion');
+    }
+    console.log(`⏱️ First token ${Math.round(firstTokenMs)} ms, total ${Math.round(performance.now() - requestStart)} ms`, result.metrics);
+    return result;
+}
+
+async function buildImageUploadRequest(file) {
+    if (API_CONFIG.UPLOAD_MODE === 'raw') {
+        // The browser streams the File straight from disk: no base64 copy, 25% fewer bytes
+        return {
+            method: 'POST',
+            headers: {
+                'Content-Type': file.type,
+                ...streamingHeaders()
+            },
+            body: file
+        };
+    }
+    
+    const base64Image = await fileToBase64(file);
+    return {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            ...streamingHeaders()
+        },
+        body: JSON.stringify({
+            image: base64Image
+        })
+    };
+}
+
 function fileToBase64(file) {
     return new Promise((resolve, reject) => {
         const reader = new FileReader();
@@ -542,6 +760,72 @@ function fileToBase64(file) {
     });
 }
 
+// Audio mode for responses that carry text: 'lazy' defers synthesis until "Listen" is pressed
+function requestedAudioDelivery() {
+    return API_CONFIG.LAZY_AUDIO ? 'lazy' : API_CONFIG.AUDIO_DELIVERY;
+}
+
+// Audio tier and format for requests: the configured profile, kept in MP3 when this browser
+// cannot play the profile's Ogg Vorbis
+function audioFormatFields() {
+    let profile = API_CONFIG.AUDIO_PROFILE;
+    if (profile === 'auto') {
+        const connection = navigator.connection || {};
+        const slow = ['slow-2g', '2g', '3g'].includes(connection.effectiveType);
+        profile = connection.saveData || slow ? 'low' : 'standard';
+    }
+    const fields = { audio_profile: profile };
+    if (profile === 'low' && !document.createElement('audio').canPlayType('audio/ogg; codecs="vorbis"')) {
+        fields.audio_format = 'mp3';
+    }
+    return fields;
+}
+
+// Posts text to AUDIO_URL and resolves with the audio result
+async function requestAudio(text) {
+    const response = await fetch(API_CONFIG.AUDIO_URL, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ text: text, audio_delivery: API_CONFIG.AUDIO_DELIVERY, ...audioFormatFields() })
+    });
+    
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    
+    const result = await response.json();
+    if (!result.success) {
+        throw new Error(result.error || 'Audio generation failed');
+    }
+    return result;
+}
+
+// src for on-demand audio: the response's audio_url when it has one (stored audio, or a lazy
+// handle the server synthesizes on first fetch), else audio requested for the text. If the
+// URL cannot be played (an expired handle), the element falls back to requesting the text.
+async function onDemandAudioSource(element, text, audioUrl) {
+    if (!audioUrl) {
+        element.onerror = null;
+        return audioSource(await requestAudio(text));
+    }
+    element.onerror = async () => {
+        element.onerror = null;
+        element.src = audioSource(await requestAudio(text));
+        element.play().catch(e => console.log('Auto-play prevented:', e));
+    };
+    return audioUrl;
+}
+
+// Playable src for an audio result: its URL when the server sent one, else a blob of the base64
+function audioSource(result) {
+    if (result.audio_url) {
+        return result.audio_url;
+    }
+    return URL.createObjectURL(base64ToBlob(result.audio_base64, result.content_type || 'audio/mpeg'));
+}
+
 function base64ToBlob(base64, mimeType) {
     const byteCharacters = atob(base64);
     const byteNumbers = new Array(byteCharacters.length);
@@ -1,10 +1,21 @@
 import json
-import boto3
+import sys
+import os
 import logging
 
+# Shared helpers: utils/ packaged next to the handler, backend/utils in the repository
+sys.path.append(os.path.join(os.path.dirname(__file__), 'utils'))
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend', 'utils'))
+
+from aws_clients import get_client
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Created once per container and reused across warm invocations, with the shared
+# connection, timeout and retry settings (aws_clients.py)
+bedrock = get_client('bedrock-runtime')
+
 def lambda_handler(event, context):
     try:
         # Parse request
@@ -23,9 +34,6 @@ def lambda_handler(event, context):
                 'body': json.dumps({'success': False, 'error': 'Question required'})
             }
         
-        # Use Amazon Bedrock for educational Q&A (simulating Amazon Q functionality)
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        
         # Educational and supportive prompt for Q&A
         prompt = f"""You are a supportive educational AI assistant. Every question is valid and important. Based on this image analysis:
 {image_context}
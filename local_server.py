@@ -4,27 +4,71 @@ Local development server for SeeWrite AI
 This allows testing the frontend without deploying to AWS Lambda
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, redirect, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 import sys
 import os
+import time
 import base64
 import json
+from functools import partial
 
 # Add backend utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend', 'utils'))
 
-from bedrock_client import BedrockClient
+from bedrock_client import BedrockClient, MODELS_UNAVAILABLE_MESSAGE
 from polly_client import PollyClient
+from audio_cache import AUDIO_DELIVERY, AUDIO_KEY, AUDIO_SYNTHESES, AudioCache, content_type_for
+from audio_formats import negotiate
+from engine_policy import ENGINE_POLICY
+from admission import Overloaded, retry_after_header
+from rate_limiter import RATE_LIMITER
+from http_ranges import IMMUTABLE, byte_range, content_range, etag_for, etag_matches, read_range
+from speculative_audio import SpeculativeAudio
 from image_processor import ImageProcessor
+from image_workers import in_image_worker
+from description_cache import DescriptionCache, make_cache_key
+from perceptual_hash import NearDuplicateIndex
+from request_parsing import decode_data_url
+from bedrock_streaming import TimedStream, sse_event
+from speech_pipeline import pipeline_speech
+from narration_jobs import NarrationJobs
+from single_flight import FlightAbandoned, SingleFlight, lease_table_from_env
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize clients
-bedrock_client = BedrockClient()
-polly_client = PollyClient()
-image_processor = ImageProcessor()
+# Image workers re-run this script on start (spawn imports the parent's main module);
+# they only run image stages, so the clients, caches and pools are built here alone
+if not in_image_worker():
+    # Initialize clients
+    bedrock_client = BedrockClient()
+    # Synthesized speech is cached by content hash and served from /audio/<key>
+    audio_cache = AudioCache.from_env(base_url='/audio')
+    # Lazy handles (?audio=lazy) are fetched from /audio/<key>, which synthesizes on first use
+    polly_client = PollyClient(cache=audio_cache, handle_url=lambda key: f'/audio/{key}')
+    # Text returned without audio (?audio=lazy) is synthesized in the background for a share
+    # of requests (SPECULATIVE_AUDIO_RATE), so "Listen" usually finds it cached
+    speculative_audio = SpeculativeAudio.from_env(
+        polly_client.client, audio_cache,
+        voice_id=polly_client.voice_id,
+        engine=polly_client.engine,
+        output_format=polly_client.output_format,
+        sample_rate=polly_client.sample_rate
+    )
+    # Long-document narration jobs; offline stand-in for Polly's synthesis tasks unless NARRATION_BUCKET is set
+    narrations = NarrationJobs.from_env(polly_client.client, local_store=audio_cache.store)
+    image_processor = ImageProcessor(concurrent=True)
+    description_cache = DescriptionCache.from_env()
+    near_duplicates = NearDuplicateIndex.for_cache(description_cache)
+    # Concurrent uploads of the same image share one Rekognition/Textract/Bedrock analysis
+    # (across server processes too with SINGLE_FLIGHT_TABLE; SINGLE_FLIGHT_SHARED=local is an
+    # in-memory stand-in for testing the lease path within this one process)
+    image_analyses = SingleFlight('image-analysis', lease_table_from_env())
+
+# Cache key version for the Rekognition/Textract -> Bedrock text pipeline below;
+# bump it when the pipeline or BedrockClient prompts change
+PIPELINE_VERSION = "local-pipeline-v1"
 
 @app.route('/')
 def index():
@@ -36,49 +80,284 @@ def serve_static(filename):
     """Serve static files from frontend directory"""
     return send_from_directory('frontend', filename)
 
+def read_uploaded_image():
+    """Image bytes from a raw image/* body, a multipart upload, or the JSON data URL form"""
+    if request.mimetype.startswith('image/'):
+        return request.get_data()
+    if 'image' in request.files:
+        return request.files['image'].read()
+    data = request.get_json(silent=True) or {}
+    image_base64 = data.get('image')
+    return decode_data_url(image_base64) if image_base64 else None
+
+def wants_event_stream():
+    """True when the client asked for token streaming (Accept: text/event-stream)"""
+    return 'text/event-stream' in request.headers.get('Accept', '')
+
+def wants_sentence_audio():
+    """True when a streaming client asked for audio per sentence (?speech=sentences)"""
+    return wants_event_stream() and request.args.get('speech') == 'sentences'
+
+def audio_delivery():
+    """'url' or 'lazy' when the client asked for it (?audio=url or "audio_delivery": "url"), else 'base64'"""
+    data = request.get_json(silent=True) or {}
+    delivery = request.args.get('audio') or data.get('audio_delivery') or AUDIO_DELIVERY
+    return delivery if delivery in ('url', 'lazy') else 'base64'
+
+def audio_format():
+    """(output_format, sample_rate) for the client: ?audio_profile= or "audio_profile" ("low" for
+    mobile data), explicit audio_format/audio_sample_rate, and Accept (or "audio_accept").
+    Raises ValueError for unsupported choices."""
+    data = request.get_json(silent=True) or {}
+    return negotiate(
+        accept=data.get('audio_accept') or request.headers.get('Accept'),
+        profile=request.args.get('audio_profile') or data.get('audio_profile'),
+        output_format=request.args.get('audio_format') or data.get('audio_format'),
+        sample_rate=request.args.get('audio_sample_rate') or data.get('audio_sample_rate')
+    )
+
+def audio_fields(audio_result):
+    """The audio part of a PollyClient result, for a response body or audio event"""
+    return {name: audio_result[name] for name in ('audio_base64', 'audio_url', 'audio_id', 'content_type')
+            if name in audio_result}
+
+class StartedStream:
+    """chunks with the first one already generated; close() closes them, so a Bedrock
+    stream closed early (the client left) gives back its admission slot"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        first = next(self.chunks, None)
+        self.first = [] if first is None else [first]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.first:
+            return self.first.pop()
+        return next(self.chunks)
+
+    def close(self):
+        self.first = []
+        if hasattr(self.chunks, 'close'):
+            self.chunks.close()
+
+def started(chunks):
+    """chunks with the first one already generated: a Bedrock stream takes its admission
+    slot then, so Overloaded is raised (and answered with a 429) before the response starts"""
+    return StartedStream(chunks)
+
+def overloaded_body(error):
+    """429 body for a request Bedrock admission turned away (its Retry-After goes in the headers)"""
+    return {'error': 'Too many requests right now, please try again shortly', 'retry_after': error.retry_after}
+
+def sse_events(chunks, start, finish, synthesize, sentence_audio=False):
+    """The body of an event_stream response, shared with asgi_server.py"""
+    timed = TimedStream(chunks, start)
+    first_audio_ms = None
+    try:
+        if sentence_audio:
+            stages = pipeline_speech(timed, synthesize)
+        else:
+            stages = (('text', text) for text in timed)
+        for kind, item in stages:
+            if kind == 'text':
+                yield sse_event('token', {'text': item})
+                continue
+            result = item['result'] or {'success': False}
+            if first_audio_ms is None and result['success']:
+                first_audio_ms = round((time.perf_counter() - start) * 1000, 1)
+            yield sse_event('audio', {
+                'index': item['index'],
+                'text': item['text'],
+                'success': result['success'],
+                **audio_fields(result)
+            })
+        body, status = finish(timed.text, not sentence_audio)
+        if status != 200:
+            yield sse_event('error', body)
+            return
+        body['metrics'] = timed.metrics()
+        if sentence_audio:
+            body['metrics']['ttfa_ms'] = first_audio_ms
+        app.logger.info(f"Streamed response: {body['metrics']}")
+        yield sse_event('done', body)
+    except Exception as e:
+        yield sse_event('error', {'error': f'Internal server error: {str(e)}'})
+
+def sentence_synthesizer(delivery, audio):
+    """synthesize(text) for sentence audio events; sentence audio is wanted now, so a lazy
+    request gets it by URL"""
+    return partial(polly_client.synthesize_speech, delivery='url' if delivery == 'lazy' else delivery,
+                   audio_format=audio)
+
+def event_stream(chunks, start, finish, sentence_audio=False):
+    """Server-Sent Events response: a token event per text chunk as Bedrock generates it,
+    then a done event with finish(text, with_audio)'s body plus time-to-first-token/total metrics.
+
+    With sentence_audio, each sentence is synthesized by Polly while generation continues
+    and sent as an audio event (in reading order), so playback can start after the first
+    sentence; the done event then carries no whole-text audio.
+    """
+    synthesize = sentence_synthesizer(audio_delivery(), audio_format())
+    response = Response(stream_with_context(sse_events(chunks, start, finish, synthesize, sentence_audio)),
+                        mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # A client gone before the stream completes abandons it, and the analysis others wait on
+    if hasattr(chunks, 'close'):
+        response.call_on_close(chunks.close)
+    return response
+
+def find_cached_analysis(image_data):
+    """(cache_key, cached image_result or None, fingerprint) for an upload: an identical
+    upload, or a recompressed or re-photographed copy of an analyzed page"""
+    # Identical uploads reuse the stored analysis instead of calling AWS again
+    cache_key = make_cache_key(image_data, PIPELINE_VERSION, bedrock_client.model_id)
+    image_result = description_cache.get(cache_key)
+    fingerprint = None
+    
+    if not image_result and near_duplicates.enabled:
+        fingerprint = image_processor.compute_fingerprint(image_data)
+        similar_key = near_duplicates.find(fingerprint)
+        image_result = description_cache.get(similar_key) if similar_key else None
+        if image_result:
+            description_cache.put(cache_key, image_result)
+    
+    if image_result:
+        near_duplicates.add(image_result.get('fingerprint'), cache_key)
+    return cache_key, image_result, fingerprint
+
+def remember_description(image_result, cache_key, fingerprint, detailed_description):
+    """Cache a fresh analysis; returns it as (image_result, description)"""
+    # Partial analyses (a service timed out) are not cached, so the next upload retries
+    if detailed_description != MODELS_UNAVAILABLE_MESSAGE and not image_result.get('partial'):
+        description_cache.put(cache_key, {
+            'description': detailed_description,
+            'objects': image_result.get('objects', []),
+            'text': image_result.get('text', ''),
+            'fingerprint': fingerprint
+        })
+        near_duplicates.add(fingerprint, cache_key, share=True)
+    return image_result, detailed_description
+
+def stored_analysis(cache_key):
+    """(image_result, description) another server process has cached, for image_analyses"""
+    image_result = description_cache.get(cache_key)
+    return (image_result, image_result['description']) if image_result else None
+
+def analyze_upload(image_data, cache_key, fingerprint, streaming=False):
+    """(image_result, description chunks) for an upload missing from the cache; chunks is
+    None when the image could not be processed. An image already being analyzed for another
+    request is not analyzed again: its description arrives as one chunk when ready."""
+    analysis, flight = image_analyses.begin(cache_key, partial(stored_analysis, cache_key))
+    if flight is None:
+        image_result, description = analysis
+        return image_result, [description]
+    
+    try:
+        # Process the image
+        image_result = image_processor.process_image_bytes(image_data)
+        if not image_result['success']:
+            image_analyses.end(cache_key, flight, error=FlightAbandoned(image_result.get('error')))
+            return image_result, None
+        
+        # Generate detailed description using Bedrock, token by token when streaming
+        remember = partial(remember_description, image_result, cache_key, fingerprint)
+        if streaming:
+            stream = bedrock_client.stream_educational_description(image_result['description'])
+            chunks = started(stream)
+            # A stream broken midway is neither cached nor handed to waiting uploads
+            return image_result, image_analyses.stream(
+                cache_key, flight, chunks, lambda text: remember(text) if stream.complete else None)
+        analysis = remember(bedrock_client.generate_educational_description(image_result['description']))
+    except BaseException as e:
+        image_analyses.end(cache_key, flight, error=e)
+        raise
+    image_analyses.end(cache_key, flight, analysis)
+    return image_result, [analysis[1]]
+
+def finish_description(image_result, cached, delivery, audio, detailed_description, with_audio=True):
+    """(body, status) of a process-image response once the description is complete"""
+    body = {
+        'success': True,
+        'description': detailed_description,
+        'detected_objects': image_result.get('objects', []),
+        'extracted_text': image_result.get('text', ''),
+        'cached': cached
+    }
+    if not with_audio:
+        return body, 200
+    
+    # Convert to speech using Polly
+    audio_result = polly_client.synthesize_speech(detailed_description, delivery=delivery, audio_format=audio)
+    
+    if not audio_result['success']:
+        return {'error': 'Audio generation failed'}, 500
+    if 'audio_id' in audio_result:
+        speculative_audio.speculate(detailed_description, audio)
+    
+    body.update(audio_fields(audio_result))
+    return body, 200
+
+def finish_answer(delivery, audio, answer, with_audio=True):
+    """(body, status) of a chat response once the answer is complete"""
+    if not with_audio:
+        return {'success': True, 'answer': answer}, 200
+    
+    # Convert answer to speech using Polly
+    audio_result = polly_client.synthesize_speech(answer, delivery=delivery, audio_format=audio)
+    
+    if not audio_result['success']:
+        return {'error': 'Audio generation failed'}, 500
+    if 'audio_id' in audio_result:
+        speculative_audio.speculate(answer, audio)
+    
+    return {
+        'success': True,
+        'answer': answer,
+        **audio_fields(audio_result)
+    }, 200
+
 @app.route('/api/process-image', methods=['POST'])
 def process_image():
     """Process uploaded image and generate audio description"""
+    start = time.perf_counter()
     try:
-        data = request.get_json()
-        image_base64 = data.get('image')
+        image_data = read_uploaded_image()
         
-        if not image_base64:
+        if not image_data:
             return jsonify({'error': 'No image provided'}), 400
         
-        # Process the image
-        image_result = image_processor.process_image_base64(image_base64)
-        
-        if not image_result['success']:
-            return jsonify({'error': image_result.get('error', 'Image processing failed')}), 500
+        try:
+            audio = audio_format()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Generate detailed description using Bedrock
-        detailed_description = bedrock_client.generate_educational_description(
-            image_result['description']
-        )
+        cache_key, image_result, fingerprint = find_cached_analysis(image_data)
+        cached = bool(image_result)
+        if cached:
+            description_chunks = [image_result['description']]
+        else:
+            image_result, description_chunks = analyze_upload(image_data, cache_key, fingerprint, wants_event_stream())
+            if description_chunks is None:
+                return jsonify({'error': image_result.get('error', 'Image processing failed')}), 500
         
-        # Convert to speech using Polly
-        audio_result = polly_client.synthesize_speech(detailed_description)
+        finish = partial(finish_description, image_result, cached, audio_delivery(), audio)
+        if wants_event_stream():
+            return event_stream(description_chunks, start, finish, sentence_audio=wants_sentence_audio())
         
-        if not audio_result['success']:
-            return jsonify({'error': 'Audio generation failed'}), 500
-        
-        # Return successful response
-        return jsonify({
-            'success': True,
-            'description': detailed_description,
-            'audio_base64': audio_result['audio_base64'],
-            'content_type': audio_result['content_type'],
-            'detected_objects': image_result.get('objects', []),
-            'extracted_text': image_result.get('text', '')
-        })
+        body, status = finish(''.join(description_chunks))
+        return jsonify(body), status
         
+    except Overloaded as e:
+        return jsonify(overloaded_body(e)), 429, retry_after_header(e)
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle follow-up questions about the content"""
+    start = time.perf_counter()
     try:
         data = request.get_json()
         question = data.get('question')
@@ -87,33 +366,190 @@ def chat():
         if not question:
             return jsonify({'error': 'No question provided'}), 400
         
-        # Generate answer using Bedrock
-        answer = bedrock_client.answer_followup_question(
-            original_description, 
-            question
-        )
+        try:
+            audio = audio_format()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Generate answer using Bedrock, token by token when streaming
+        if wants_event_stream():
+            answer_chunks = started(bedrock_client.stream_followup_answer(original_description, question))
+        else:
+            answer_chunks = [bedrock_client.answer_followup_question(original_description, question)]
+        
+        finish = partial(finish_answer, audio_delivery(), audio)
+        
+        if wants_event_stream():
+            return event_stream(answer_chunks, start, finish, sentence_audio=wants_sentence_audio())
+        
+        body, status = finish(''.join(answer_chunks))
+        return jsonify(body), status
+        
+    except Overloaded as e:
+        return jsonify(overloaded_body(e)), 429, retry_after_header(e)
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@app.route('/api/generate-audio', methods=['POST'])
+def generate_audio():
+    """On-demand audio for a text or a lazy response's audio_id (the frontend's AUDIO_URL),
+    served from the audio cache when possible"""
+    try:
+        data = request.get_json()
+        text = data.get('text')
+        audio_id = data.get('audio_id')
+        
+        if not text and not audio_id:
+            return jsonify({'error': 'No text provided'}), 400
+        
+        try:
+            audio = audio_format()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Convert answer to speech using Polly
-        audio_result = polly_client.synthesize_speech(answer)
+        delivery = 'url' if audio_delivery() == 'lazy' else audio_delivery()
+        # A background synthesis of this text may be running: wait for it rather than call Polly
+        speculative_audio.claim(speculative_audio.key_for(text, audio) if text else audio_id)
+        if text:
+            audio_result = polly_client.synthesize_speech(text, delivery=delivery, audio_format=audio)
+        else:
+            audio_result = polly_client.synthesize_handle(audio_id, delivery=delivery)
+            if audio_result is None:
+                return jsonify({'error': 'Unknown audio_id; send the text instead'}), 404
         
         if not audio_result['success']:
             return jsonify({'error': 'Audio generation failed'}), 500
         
-        # Return successful response
-        return jsonify({
-            'success': True,
-            'answer': answer,
-            'audio_base64': audio_result['audio_base64'],
-            'content_type': audio_result['content_type']
-        })
+        return jsonify(audio_result)
         
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/api/narrations', methods=['POST'])
+def submit_narration():
+    """Start narrating a long text in the background; identical text returns the same job"""
+    try:
+        data = request.get_json()
+        job = narrations.submit(data.get('text'), voice_id=data.get('voice_id'))
+        return jsonify({'success': job['status'] != 'failed', **job}), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@app.route('/api/narrations/<job_id>', methods=['GET'])
+def narration_status(job_id):
+    """A narration job's status; ?wait=20 holds the request until it finishes (or 20 s pass)"""
+    job = narrations.status(job_id, wait=request.args.get('wait', 0, type=float))
+    if job is None:
+        return jsonify({'error': 'Unknown narration job'}), 404
+    return jsonify({'success': True, **job})
+
+def streamed_audio(text, audio):
+    """Chunked response forwarding Polly's audio as it arrives (stored in the cache once
+    complete); a redirect to /audio/<key> when it is already cached"""
+    try:
+        key, pieces = polly_client.stream_speech(text, audio_format=audio)
+    except Exception as e:
+        app.logger.error(f"Error streaming speech: {e}")
+        return jsonify({'error': 'Audio generation failed'}), 500
+    if pieces is None:
+        return redirect(f'/audio/{key}')
+    # No Content-Length: the development server sends it with Transfer-Encoding: chunked
+    return Response(stream_with_context(pieces), mimetype=content_type_for(key),
+                    headers={'X-Audio-Id': key, 'Cache-Control': 'no-store'})
+
+@app.route('/api/stream-audio', methods=['GET', 'POST'])
+def stream_audio():
+    """Audio streamed while Polly synthesizes it, so playback starts on the first bytes:
+    POST {"text"}, or GET ?text= or ?id=<audio_id> for use as an <audio> src"""
+    data = request.get_json(silent=True) or {}
+    text = data.get('text') or request.args.get('text')
+    audio_id = data.get('audio_id') or request.args.get('id')
+    
+    if not text and not audio_id:
+        return jsonify({'error': 'No text provided'}), 400
+    
+    try:
+        audio = audio_format()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not text:
+        manifest = audio_cache.pending(audio_id)
+        if manifest is None:
+            return jsonify({'error': 'Unknown audio_id; send the text instead'}), 404
+        text, audio = manifest['text'], (manifest['output_format'], manifest['sample_rate'])
+    speculative_audio.claim(speculative_audio.key_for(text, audio))
+    return streamed_audio(text, audio)
+
+@app.route('/audio/<key>', methods=['GET'])
+def cached_audio(key):
+    """Audio from the audio cache (S3-backed caches redirect to a presigned URL); a lazy
+    handle's first fetch streams its audio while Polly synthesizes it"""
+    if not AUDIO_KEY.match(key):
+        return jsonify({'error': 'Unknown audio'}), 404
+    speculative_audio.claim(key)
+    if audio_cache.store.size(key) is None:
+        manifest = audio_cache.pending(key)
+        if manifest is None:
+            return jsonify({'error': 'Unknown audio'}), 404
+        return streamed_audio(manifest['text'], (manifest['output_format'], manifest['sample_rate']))
+    directory = getattr(audio_cache.store, 'directory', None)
+    if directory is None:
+        return redirect(audio_cache.url(key))
+    return send_cached_audio(directory, key)
+
+def send_cached_audio(directory, key):
+    """A cached audio file for <audio> players: strong ETag, immutable caching and byte
+    ranges, since students scrub back to re-listen. Whole files go out through the server's
+    file wrapper (sendfile where the WSGI server supports it); ranges are sliced from a
+    memory map of the file."""
+    path = os.path.join(directory, key)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return jsonify({'error': 'Unknown audio'}), 404
+    etag = etag_for(key)
+    headers = {'ETag': etag, 'Cache-Control': IMMUTABLE, 'Accept-Ranges': 'bytes'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=304, headers=headers)
+    try:
+        requested = byte_range(request.headers.get('Range'), size, request.headers.get('If-Range'), etag)
+    except ValueError:
+        return Response(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+    if requested is None:
+        response = send_file(path, mimetype=content_type_for(key), conditional=False, etag=False)
+        response.headers.update(headers)
+        return response
+    start, end = requested
+    return Response(read_range(path, start, end), status=206, mimetype=content_type_for(key), headers={
+        **headers, 'Content-Range': content_range(start, end, size), 'Content-Length': str(end - start + 1)
+    })
+
+def health_status():
+    """Cache, job, engine, model, rate limit and coalescing statistics for /health (both serving modes)"""
+    return {
+        'status': 'healthy',
+        'message': 'SeeWrite AI local server is running',
+        'description_cache': description_cache.stats(),
+        'audio_cache': audio_cache.stats(),
+        'narrations': narrations.stats(),
+        'speculative_audio': speculative_audio.stats(),
+        'polly_engines': ENGINE_POLICY.stats(),
+        'near_duplicates': near_duplicates.stats(),
+        'image_workers': image_processor.workers.stats(),
+        'models': bedrock_client.health.stats(),
+        'hedging': bedrock_client.hedger.stats(),
+        'bedrock_admission': bedrock_client.admission.stats(),
+        'rate_limits': RATE_LIMITER.stats(),
+        'single_flight': {'image_analyses': image_analyses.stats(), 'audio': AUDIO_SYNTHESES.stats()}
+    }
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'SeeWrite AI local server is running'})
+    return jsonify(health_status())
 
 if __name__ == '__main__':
     print("🚀 Starting SeeWrite AI Local Development Server")
@@ -122,6 +558,9 @@ if __name__ == '__main__':
     print("API Endpoints:")
     print("  - POST /api/process-image")
     print("  - POST /api/chat")
+    print("  - POST /api/generate-audio")
+    print("  - GET/POST /api/stream-audio")
+    print("  - POST /api/narrations, GET /api/narrations/<job_id>")
     print("  - GET /health")
     print("=" * 50)
     
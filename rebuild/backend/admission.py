@@ -0,0 +1 @@
+../../backend/utils/admission.py
\ No newline at end of file
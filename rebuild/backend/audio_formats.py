@@ -0,0 +1 @@
+../../backend/utils/audio_formats.py
\ No newline at end of file
@@ -1,12 +1,22 @@
 import json
-import boto3
 import base64
 import logging
 from botocore.exceptions import ClientError
 
+# Shipped next to this handler (see deploy.sh)
+from audio_formats import content_type, negotiate
+from aws_clients import get_client
+from engine_policy import ENGINE_POLICY, VOICES
+from long_speech import synthesize_long
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Clients are created once per container and reused across warm invocations, with the
+# shared connection, timeout and retry settings; Bedrock and Polly calls wait for an
+# adaptive per-model/operation budget (aws_clients.py, rate_limiter.py)
+polly = get_client('polly')
+
 def lambda_handler(event, context):
     """
     Generate audio from text using Amazon Polly Neural TTS
@@ -26,20 +36,29 @@ def lambda_handler(event, context):
         if not text:
             return error_response('No text provided', 400)
         
-        # Validate and truncate text length (Polly has limits)
-        if len(text) > 2900:
-            text = text[:2900] + "..."
-        
-        # Initialize Polly client
-        polly = boto3.client('polly', region_name='us-east-1')
+        # Format tier: "audio_profile" ("low" is Ogg Vorbis at 16 kHz for mobile data),
+        # explicit "audio_format"/"audio_sample_rate", or the Accept header
+        headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+        try:
+            output_format, sample_rate = negotiate(
+                accept=body.get('audio_accept') or headers.get('accept'),
+                profile=body.get('audio_profile'),
+                output_format=body.get('audio_format'),
+                sample_rate=body.get('audio_sample_rate')
+            )
+        except ValueError as e:
+            return error_response(str(e), 400)
         
-        # Generate audio using Polly Neural TTS
-        audio_base64 = generate_neural_audio(polly, text, voice_id)
+        # Generate audio using Polly Neural TTS (standard when the engine policy picks it)
+        audio_base64, engine = generate_neural_audio(polly, text, voice_id, output_format, sample_rate)
         
         return success_response({
             'audio_base64': audio_base64,
-            'content_type': 'audio/mp3',
+            'content_type': content_type(output_format),
+            'output_format': output_format,
+            'sample_rate': sample_rate,
             'voice_id': voice_id,
+            'engine': engine,
             'text_length': len(text)
         })
         
@@ -47,32 +66,36 @@ def lambda_handler(event, context):
         logger.error(f"Error generating audio: {str(e)}")
         return error_response(f'Audio generation failed: {str(e)}', 500)
 
-def generate_neural_audio(polly, text, voice_id):
-    """Generate high-quality audio using Amazon Polly Neural TTS"""
+def generate_neural_audio(polly, text, voice_id, output_format='mp3', sample_rate='24000'):
+    """Generate high-quality audio using Amazon Polly Neural TTS: (base64 audio, engine used)"""
     try:
-        # Validate voice ID
-        valid_neural_voices = [
-            'Joanna', 'Matthew', 'Amy', 'Emma', 'Brian', 'Olivia', 
-            'Aria', 'Ayanda', 'Ivy', 'Kendra', 'Kimberly', 'Salli', 
-            'Joey', 'Justin', 'Kevin', 'Ruth'
-        ]
-        
-        if voice_id not in valid_neural_voices:
+        # Validate voice ID against describe_voices (cached per container)
+        if VOICES.engines(polly, voice_id) == ():
             voice_id = 'Joanna'  # Default fallback
         
         # Synthesize speech with optimal settings for educational content
-        response = polly.synthesize_speech(
-            Text=text,
-            OutputFormat='mp3',
-            VoiceId=voice_id,
-            Engine='neural',
-            TextType='text',
-            SampleRate='24000'  # High quality for educational content
-        )
+        def synthesize_on(engine):
+            def synthesize(chunk):
+                response = polly.synthesize_speech(
+                    Text=chunk,
+                    OutputFormat=output_format,
+                    VoiceId=voice_id,
+                    Engine=engine,
+                    TextType='text',
+                    SampleRate=sample_rate
+                )
+                return response['AudioStream'].read()
+            
+            # Text over Polly's 3000 character limit is synthesized in concurrent chunks
+            # and joined, instead of being cut off
+            return synthesize_long(synthesize, text, output_format)
+        
+        # Neural unless the text is short or neural is throttled; a throttled or timed-out
+        # neural call is retried on standard instead of failing
+        audio_data, engine = ENGINE_POLICY.run(synthesize_on, ENGINE_POLICY.engines_for(polly, text, voice_id))
         
-        # Read audio stream and encode to base64
-        audio_data = response['AudioStream'].read()
-        return base64.b64encode(audio_data).decode('utf-8')
+        # Encode to base64
+        return base64.b64encode(audio_data).decode('utf-8'), engine
         
     except ClientError as e:
         error_code = e.response['Error']['Code']
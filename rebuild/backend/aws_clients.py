@@ -0,0 +1 @@
+../../backend/utils/aws_clients.py
\ No newline at end of file
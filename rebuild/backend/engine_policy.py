@@ -0,0 +1 @@
+../../backend/utils/engine_policy.py
\ No newline at end of file
@@ -1,12 +1,23 @@
 import json
-import boto3
 import base64
 import logging
 from botocore.exceptions import ClientError
 
+# Shipped next to this handler (see deploy.sh)
+from admission import BEDROCK_ADMISSION, Overloaded, is_throttling, retry_after_header
+from aws_clients import get_client
+from engine_policy import ENGINE_POLICY
+from long_speech import synthesize_long
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Clients are created once per container and reused across warm invocations, with the
+# shared connection, timeout and retry settings; Bedrock and Polly calls wait for an
+# adaptive per-model/operation budget (aws_clients.py, rate_limiter.py)
+bedrock = get_client('bedrock-runtime')
+polly = get_client('polly')
+
 def lambda_handler(event, context):
     """
     Process educational images using AWS Bedrock Claude 3 Sonnet
@@ -25,16 +36,15 @@ def lambda_handler(event, context):
         if not image_base64:
             return error_response('No image provided', 400)
         
-        # Clean base64 data
+        # Clean base64 data, keeping the media type the browser reported
+        media_type = 'image/jpeg'
         if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
-        # Initialize AWS clients
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        polly = boto3.client('polly', region_name='us-east-1')
+            header, image_base64 = image_base64.split(',', 1)
+            if header.startswith('data:image/'):
+                media_type = header[len('data:'):].split(';')[0]
         
         # Generate educational description using Claude 3 Sonnet
-        description = analyze_educational_image(bedrock, image_base64)
+        description = analyze_educational_image(bedrock, image_base64, media_type)
         
         # Generate audio using Polly
         audio_base64 = generate_audio(polly, description)
@@ -45,11 +55,14 @@ def lambda_handler(event, context):
             'content_type': 'audio/mp3'
         })
         
+    except Overloaded as e:
+        # Bedrock is throttling: tell the client when to retry instead of sending a canned description
+        return error_response('Too many requests right now, please try again shortly', 429, retry_after_header(e))
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         return error_response(f'Processing failed: {str(e)}', 500)
 
-def analyze_educational_image(bedrock, image_base64):
+def analyze_educational_image(bedrock, image_base64, media_type='image/jpeg'):
     """Analyze educational image using Claude 3 Sonnet"""
     try:
         prompt = """You are an expert educator helping visually impaired students understand educational content. 
@@ -81,7 +94,7 @@ Make your description engaging, clear, and optimized for audio consumption. Use
                             "type": "image",
                             "source": {
                                 "type": "base64",
-                                "media_type": "image/jpeg",
+                                "media_type": media_type,
                                 "data": image_base64
                             }
                         },
@@ -106,6 +119,8 @@ Make your description engaging, clear, and optimized for audio consumption. Use
         
     except ClientError as e:
         logger.error(f"Bedrock error: {e}")
+        if is_throttling(e):
+            raise BEDROCK_ADMISSION.throttled()
         return "I can see this is an educational image with important visual content. The AI vision system is processing the visual elements to provide you with a comprehensive educational analysis."
     except Exception as e:
         logger.error(f"Unexpected error in image analysis: {e}")
@@ -114,19 +129,23 @@ Make your description engaging, clear, and optimized for audio consumption. Use
 def generate_audio(polly, text):
     """Generate audio using Amazon Polly Neural TTS"""
     try:
-        # Truncate text if too long for Polly (3000 char limit)
-        if len(text) > 2900:
-            text = text[:2900] + "..."
+        def synthesize_on(engine):
+            def synthesize(chunk):
+                response = polly.synthesize_speech(
+                    Text=chunk,
+                    OutputFormat='mp3',
+                    VoiceId='Joanna',
+                    Engine=engine,
+                    TextType='text'
+                )
+                return response['AudioStream'].read()
+            
+            # Text over Polly's 3000 character limit is synthesized in concurrent chunks
+            # and joined, instead of being cut off
+            return synthesize_long(synthesize, text)
         
-        response = polly.synthesize_speech(
-            Text=text,
-            OutputFormat='mp3',
-            VoiceId='Joanna',
-            Engine='neural',
-            TextType='text'
-        )
-        
-        audio_data = response['AudioStream'].read()
+        # Neural falls back to standard when throttled or timed out
+        audio_data, _ = ENGINE_POLICY.run(synthesize_on, ENGINE_POLICY.engines_for(polly, text, 'Joanna'))
         return base64.b64encode(audio_data).decode('utf-8')
         
     except ClientError as e:
@@ -164,7 +183,7 @@ def success_response(data):
         })
     }
 
-def error_response(message, status_code):
+def error_response(message, status_code, headers=None):
     """Return error response with CORS headers"""
     return {
         'statusCode': status_code,
@@ -172,7 +191,8 @@ def error_response(message, status_code):
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
             'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            **(headers or {})
         },
         'body': json.dumps({
             'success': False,
@@ -0,0 +1 @@
+../../backend/utils/long_speech.py
\ No newline at end of file
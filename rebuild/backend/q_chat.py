@@ -1,12 +1,23 @@
 import json
-import boto3
 import base64
 import logging
 from botocore.exceptions import ClientError
 
+# Shipped next to this handler (see deploy.sh)
+from admission import BEDROCK_ADMISSION, Overloaded, is_throttling, retry_after_header
+from aws_clients import get_client
+from engine_policy import ENGINE_POLICY
+from long_speech import synthesize_long
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Clients are created once per container and reused across warm invocations, with the
+# shared connection, timeout and retry settings; Bedrock and Polly calls wait for an
+# adaptive per-model/operation budget (aws_clients.py, rate_limiter.py)
+bedrock = get_client('bedrock-runtime')
+polly = get_client('polly')
+
 def lambda_handler(event, context):
     """
     Handle interactive Q&A about educational content using AWS Bedrock
@@ -26,10 +37,6 @@ def lambda_handler(event, context):
         if not question:
             return error_response('No question provided', 400)
         
-        # Initialize AWS clients
-        bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
-        polly = boto3.client('polly', region_name='us-east-1')
-        
         # Generate contextual answer using Claude 3 Sonnet
         answer = generate_educational_answer(bedrock, question, original_description)
         
@@ -42,6 +49,9 @@ def lambda_handler(event, context):
             'content_type': 'audio/mp3'
         })
         
+    except Overloaded as e:
+        # Bedrock is throttling: tell the client when to retry instead of sending a canned answer
+        return error_response('Too many requests right now, please try again shortly', 429, retry_after_header(e))
     except Exception as e:
         logger.error(f"Error in Q&A processing: {str(e)}")
         return error_response(f'Q&A processing failed: {str(e)}', 500)
@@ -91,6 +101,8 @@ Be supportive, encouraging, and focus on helping the student build understanding
         
     except ClientError as e:
         logger.error(f"Bedrock error in Q&A: {e}")
+        if is_throttling(e):
+            raise BEDROCK_ADMISSION.throttled()
         return f"Thank you for your question about '{question}'. Based on the educational content we've been discussing, I can help explain this concept in more detail. Let me provide you with a comprehensive answer that builds on what we've already covered."
     except Exception as e:
         logger.error(f"Unexpected error in answer generation: {e}")
@@ -99,19 +111,23 @@ Be supportive, encouraging, and focus on helping the student build understanding
 def generate_audio(polly, text):
     """Generate audio using Amazon Polly Neural TTS"""
     try:
-        # Truncate text if too long for Polly (3000 char limit)
-        if len(text) > 2900:
-            text = text[:2900] + "..."
+        def synthesize_on(engine):
+            def synthesize(chunk):
+                response = polly.synthesize_speech(
+                    Text=chunk,
+                    OutputFormat='mp3',
+                    VoiceId='Joanna',
+                    Engine=engine,
+                    TextType='text'
+                )
+                return response['AudioStream'].read()
+            
+            # Text over Polly's 3000 character limit is synthesized in concurrent chunks
+            # and joined, instead of being cut off
+            return synthesize_long(synthesize, text)
         
-        response = polly.synthesize_speech(
-            Text=text,
-            OutputFormat='mp3',
-            VoiceId='Joanna',
-            Engine='neural',
-            TextType='text'
-        )
-        
-        audio_data = response['AudioStream'].read()
+        # Neural falls back to standard when throttled or timed out
+        audio_data, _ = ENGINE_POLICY.run(synthesize_on, ENGINE_POLICY.engines_for(polly, text, 'Joanna'))
         return base64.b64encode(audio_data).decode('utf-8')
         
     except ClientError as e:
@@ -149,7 +165,7 @@ def success_response(data):
         })
     }
 
-def error_response(message, status_code):
+def error_response(message, status_code, headers=None):
     """Return error response with CORS headers"""
     return {
         'statusCode': status_code,
@@ -157,7 +173,8 @@ def error_response(message, status_code):
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
             'Access-Control-Allow-Methods': 'GET,POST,OPTIONS',
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            **(headers or {})
         },
         'body': json.dumps({
             'success': False,
@@ -0,0 +1 @@
+../../backend/utils/rate_limiter.py
\ No newline at end of file
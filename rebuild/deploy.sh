@@ -70,19 +70,19 @@ package_lambda_functions() {
     # Package Image Processor
     log_info "Packaging Image Processor function..."
     cd backend
-    zip -r ../deployment/lambda-packages/image-processor.zip image_processor.py
+    zip -r ../deployment/lambda-packages/image-processor.zip image_processor.py long_speech.py engine_policy.py admission.py rate_limiter.py aws_clients.py
     cd ..
     
     # Package Q&A Chat
     log_info "Packaging Q&A Chat function..."
     cd backend
-    zip -r ../deployment/lambda-packages/q-chat.zip q_chat.py
+    zip -r ../deployment/lambda-packages/q-chat.zip q_chat.py long_speech.py engine_policy.py admission.py rate_limiter.py aws_clients.py
     cd ..
     
     # Package Audio Generator
     log_info "Packaging Audio Generator function..."
     cd backend
-    zip -r ../deployment/lambda-packages/audio-generator.zip audio_generator.py
+    zip -r ../deployment/lambda-packages/audio-generator.zip audio_generator.py long_speech.py audio_formats.py engine_policy.py admission.py rate_limiter.py aws_clients.py
     cd ..
     
     log_success "Lambda functions packaged successfully"
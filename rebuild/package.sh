@@ -137,9 +137,9 @@ create_deployment_guide() {
    ```bash
    # Package each function
    cd lambda_functions
-   zip image-processor.zip image_processor.py
-   zip q-chat.zip q_chat.py
-   zip audio-generator.zip audio_generator.py
+   zip image-processor.zip image_processor.py long_speech.py engine_policy.py admission.py rate_limiter.py aws_clients.py
+   zip q-chat.zip q_chat.py long_speech.py engine_policy.py admission.py rate_limiter.py aws_clients.py
+   zip audio-generator.zip audio_generator.py long_speech.py audio_formats.py engine_policy.py admission.py rate_limiter.py aws_clients.py
    
    # Deploy to Lambda
    aws lambda update-function-code --function-name seewrite-ai-image-processor-prod --zip-file fileb://image-processor.zip